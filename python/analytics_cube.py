@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import sys
+import threading
+from itertools import combinations
+import numpy as np
+import pandas as pd
+import normalize
+
+# 汇总库与快照放在同一目录下: snapshots/analytics_cube.sqlite
+CUBE_FILENAME = 'analytics_cube.sqlite'
+
+# 汇总的维度，汇总掉的维度取值为 ALL
+DIMENSIONS = ('seller', 'interface', 'form_factor', 'capacity_bucket')
+ALL = '*'
+UNKNOWN = 'Unknown'
+METRICS = ('count', 'mean_price', 'mean_price_per_tb', 'min_price_per_tb', 'max_price_per_tb', 'median_price_per_tb')
+
+# 容量分段（TB）
+CAPACITY_EDGES = [1, 2, 4, 8, 12, 16, 20]
+CAPACITY_LABELS = ['<1TB', '1-2TB', '2-4TB', '4-8TB', '8-12TB', '12-16TB', '16-20TB', '20TB+']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cube (
+    snapshot TEXT NOT NULL,
+    scraped_at TEXT,
+    seller TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    form_factor TEXT NOT NULL,
+    capacity_bucket TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    mean_price REAL,
+    mean_price_per_tb REAL,
+    min_price_per_tb REAL,
+    max_price_per_tb REAL,
+    median_price_per_tb REAL,
+    PRIMARY KEY (snapshot, seller, interface, form_factor, capacity_bucket)
+);
+CREATE INDEX IF NOT EXISTS cube_scraped_at ON cube (scraped_at);
+"""
+
+def dimension_labels(values):
+    """维度取值统一为去掉首尾空白的文本，缺失值和空字符串归入 Unknown
+
+    历史分析（history_analysis）使用同样的规则，两边的分组数量和总数一致。
+    """
+    values = pd.Series(values).astype(object)
+    return values.where(values.notna(), UNKNOWN).astype(str).str.strip().replace('', UNKNOWN)
+
+def capacity_bucket(capacity_tb):
+    """把容量（TB）划分到 CAPACITY_LABELS 中的区间，缺失值为 Unknown"""
+    values = np.asarray(capacity_tb, dtype=float)
+    labels = np.array(CAPACITY_LABELS, dtype=object)[np.digitize(np.nan_to_num(values, nan=0.0), CAPACITY_EDGES)]
+    labels[np.isnan(values)] = UNKNOWN
+    return labels
+
+def build_cube(df):
+    """计算一次快照的所有汇总组合（2^4 个维度组合）的数量、平均价格和每TB价格的平均/最低/最高/中位数
+
+    df 可以是快照（已有 price_value 等数值列）或只有文本列的简化数据，缺少的数值列会在这里解析。
+    """
+    if not {'price_value', 'price_per_tb_value', 'capacity_tb'} <= set(df.columns):
+        df = normalize.normalize_frame(df)
+    frame = pd.DataFrame({
+        column: dimension_labels(df[column]) if column in df.columns else UNKNOWN
+        for column in DIMENSIONS[:3]
+    }, index=df.index)
+    frame['capacity_bucket'] = capacity_bucket(df['capacity_tb'])
+    frame['price'] = df['price_value'].astype(float).to_numpy()
+    frame['price_per_tb'] = df['price_per_tb_value'].astype(float).to_numpy()
+
+    cubes = []
+    for size in range(len(DIMENSIONS) + 1):
+        for dims in combinations(DIMENSIONS, size):
+            rolled = frame.assign(**{dim: ALL for dim in DIMENSIONS if dim not in dims})
+            cubes.append(rolled.groupby(list(DIMENSIONS), sort=False).agg(
+                count=('price_per_tb', 'size'),
+                mean_price=('price', 'mean'),
+                mean_price_per_tb=('price_per_tb', 'mean'),
+                min_price_per_tb=('price_per_tb', 'min'),
+                max_price_per_tb=('price_per_tb', 'max'),
+                median_price_per_tb=('price_per_tb', 'median'),
+            ).reset_index())
+    return pd.concat(cubes, ignore_index=True)
+
+def rollup(cube, group_by=(), filters=None):
+    """从汇总中取出按 group_by 分组的结果，filters 为 {维度: 取值} 的等值筛选"""
+    filters = filters or {}
+    grouped = set(group_by) | set(filters)
+    mask = np.ones(len(cube), dtype=bool)
+    for dim in DIMENSIONS:
+        if dim in grouped:
+            mask &= (cube[dim] != ALL).to_numpy()
+        else:
+            mask &= (cube[dim] == ALL).to_numpy()
+    for dim, value in filters.items():
+        mask &= (cube[dim] == value).to_numpy()
+    result = cube[mask]
+    return result[list(group_by) + list(METRICS)].sort_values('count', ascending=False).reset_index(drop=True)
+
+class CubeStore:
+    """按快照保存汇总结果：写入快照时追加一次，查询时按维度组合直接读取对应的行"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def add(self, snapshot, cube, scraped_at=None):
+        """保存一次快照的汇总，已存在时覆盖"""
+        scraped_at = scraped_at.strftime('%Y-%m-%d %H:%M:%S') if scraped_at is not None else None
+        rows = cube[list(DIMENSIONS) + list(METRICS)].astype(object)
+        rows = rows.where(rows.notna(), None).itertuples(index=False, name=None)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cube WHERE snapshot = ?", (snapshot,))
+            self._conn.executemany(
+                f"INSERT INTO cube (snapshot, scraped_at, {', '.join(DIMENSIONS + METRICS)}) "
+                f"VALUES ({', '.join(['?'] * (2 + len(DIMENSIONS) + len(METRICS)))})",
+                [(snapshot, scraped_at) + tuple(row) for row in rows]
+            )
+
+    def has(self, snapshot):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM cube WHERE snapshot = ? LIMIT 1", (snapshot,)).fetchone() is not None
+
+    def latest_snapshot(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT snapshot FROM cube ORDER BY scraped_at DESC, snapshot DESC LIMIT 1"
+            ).fetchone()
+        return row['snapshot'] if row is not None else None
+
+    def query(self, snapshot, group_by=(), filters=None):
+        """读取一个快照按 group_by 分组的汇总，filters 为 {维度: 取值}"""
+        filters = filters or {}
+        grouped = set(group_by) | set(filters)
+        conditions = ["snapshot = ?"]
+        params = [snapshot]
+        for dim in DIMENSIONS:
+            if dim in filters:
+                conditions.append(f"{dim} = ?")
+                params.append(filters[dim])
+            elif dim in grouped:
+                conditions.append(f"{dim} != ?")
+                params.append(ALL)
+            else:
+                conditions.append(f"{dim} = ?")
+                params.append(ALL)
+        sql = (f"SELECT {', '.join(list(group_by) + list(METRICS))} FROM cube "
+               f"WHERE {' AND '.join(conditions)} ORDER BY count DESC")
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def main():
+    # 用法: python analytics_cube.py <快照或数据文件> [维度,维度]
+    if len(sys.argv) < 2:
+        print(f"用法: python analytics_cube.py <快照或数据文件> [{','.join(DIMENSIONS)}]")
+        return
+    from diskprices_analysis import load_data
+
+    group_by = sys.argv[2].split(',') if len(sys.argv) > 2 else ['seller']
+    cube = build_cube(load_data(sys.argv[1]))
+    print(f"汇总共 {len(cube)} 行")
+    print(rollup(cube, group_by).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import pandas as pd
+import numpy as np
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
+import functools
 import glob
+import gzip
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = FastAPI(title="DiskPrices API")
 
@@ -20,117 +40,646 @@ app.add_middleware(
 
 # 设置数据文件路径 - 根据实际情况调整
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "")
+# 爬虫写入的列式快照目录，按爬取日期分区
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+SNAPSHOT_EXTENSIONS = (".parquet", ".arrow")
 
-@app.get("/api/latest")
-async def get_latest_data():
-    """获取最新的爬虫数据"""
-    try:
-        # 查找所有Excel文件
-        excel_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.xlsx"))
-        if not excel_files:
-            # 尝试查找CSV文件
-            csv_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.csv"))
-            if not csv_files:
-                raise HTTPException(status_code=404, detail="没有找到数据文件")
-            latest_file = max(csv_files)
-            df = pd.read_csv(latest_file)
+# 与爬虫共用的模块位于上一级目录
+if DATA_DIR not in sys.path:
+    sys.path.append(DATA_DIR)
+import analytics_cube
+import data_catalog
+import normalize
+import price_history
+import snapshot_store
+
+# 数据文件目录，爬虫写入快照时登记；旧版 Excel/CSV 文件在启动时扫描登记
+CATALOG_PATH = os.path.join(SNAPSHOT_DIR, data_catalog.CATALOG_FILENAME)
+catalog = data_catalog.DataCatalog(CATALOG_PATH)
+# 历史价格库，同样由爬虫写入快照时追加
+history_store = price_history.PriceHistory(os.path.join(SNAPSHOT_DIR, price_history.HISTORY_FILENAME))
+# 每个快照预先计算的 卖家 x 接口 x 形态 x 容量区间 汇总
+cube_store = analytics_cube.CubeStore(os.path.join(SNAPSHOT_DIR, analytics_cube.CUBE_FILENAME))
+
+# 简化数据的中文列名到前端期望的英文列名
+COLUMN_MAPPING = {
+    "产品名称": "product_name",
+    "容量": "capacity",
+    "价格": "price",
+    "每TB价格": "price_per_tb",
+    "接口": "interface",
+    "硬盘形态": "form_factor",
+    "卖家": "seller",
+    "评分": "rating",
+    "产品链接": "product_url",
+    "卖家链接": "seller_url",
+    "爬取时间": "date_scraped"
+}
+
+def find_snapshot_files():
+    """查找所有列式快照文件"""
+    files = []
+    for extension in SNAPSHOT_EXTENSIONS:
+        files.extend(glob.glob(os.path.join(SNAPSHOT_DIR, "scrape_date=*", f"diskprices_data_*{extension}")))
+    return files
+
+def scan_data_files():
+    """扫描磁盘上的所有数据文件，只在同步目录时使用"""
+    excel_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.xlsx"))
+    csv_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.csv"))
+    return excel_files + csv_files + find_snapshot_files()
+
+def inspect_data_file(file_path):
+    """快照只读取元数据得到行数和时间范围；旧版文件在第一次被 API 读取时补充"""
+    if file_path.endswith(SNAPSHOT_EXTENSIONS):
+        return snapshot_store.snapshot_info(file_path)
+    return {}
+
+def refresh_catalog():
+    """同步目录与磁盘上的文件"""
+    start = datetime.now()
+    updated, removed = catalog.reconcile(scan_data_files(), inspect_data_file)
+    elapsed = (datetime.now() - start).total_seconds() * 1000
+    print(f"数据目录已同步: 新增/更新 {updated} 个，删除 {removed} 个，耗时 {elapsed:.0f} ms")
+
+def resolve_data_file(filename):
+    """根据文件名在目录中找到数据文件路径；目录中没有时检查数据目录并补登记"""
+    if os.path.basename(filename) != filename:
+        return None
+    entry = catalog.find(filename)
+    if entry is not None:
+        if os.path.exists(entry["path"]):
+            return entry["path"]
+        catalog.remove(entry["path"])
+        return None
+    file_path = os.path.join(DATA_DIR, filename)
+    if filename.startswith("diskprices_data_") and filename.endswith((".xlsx", ".csv")) and os.path.exists(file_path):
+        catalog.register(file_path)
+        return file_path
+    return None
+
+def read_data_file(file_path, columns=None):
+    """读取数据文件并统一为英文列名；快照文件只读取 columns 指定的列"""
+    if file_path.endswith(".parquet"):
+        df = pd.read_parquet(file_path, columns=columns)
+    elif file_path.endswith(".arrow"):
+        df = pd.read_feather(file_path, columns=columns)
+    elif file_path.endswith(".xlsx"):
+        df = pd.read_excel(file_path, sheet_name="简化数据")
+    else:
+        df = pd.read_csv(file_path)
+    return normalize_frame(df, file_path)
+
+def normalize_frame(df, file_path):
+    """统一为英文列名，并把快照的类型转换为可以直接序列化的值"""
+    # 如果列名是中文，进行重命名
+    if "产品名称" in df.columns:
+        df = df.rename(columns=COLUMN_MAPPING)
+    # 快照中的时间列转换为字符串，与旧版文件保持一致
+    if "date_scraped" in df.columns and pd.api.types.is_datetime64_any_dtype(df["date_scraped"]):
+        df["date_scraped"] = df["date_scraped"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    if file_path.endswith(SNAPSHOT_EXTENSIONS):
+        # 快照使用 pandas 的可空类型，缺失值统一转换为 None 以便序列化
+        df = df.astype(object).where(df.notna(), None)
+    return df
+
+def iter_file_chunks(file_path, chunksize):
+    """分块读取数据文件，每次只在内存中保留 chunksize 行"""
+    if file_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize):
+            yield normalize_frame(batch.to_pandas(), file_path)
+    elif file_path.endswith(".arrow"):
+        import pyarrow.ipc as ipc
+        reader = ipc.open_file(file_path)
+        for i in range(reader.num_record_batches):
+            yield normalize_frame(reader.get_batch(i).to_pandas(), file_path)
+    elif file_path.endswith(".xlsx"):
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook["简化数据"] if "简化数据" in workbook.sheetnames else workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunksize:
+                    yield normalize_frame(pd.DataFrame(batch, columns=header), file_path)
+                    batch = []
+            if batch:
+                yield normalize_frame(pd.DataFrame(batch, columns=header), file_path)
+        finally:
+            workbook.close()
+    else:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            yield normalize_frame(chunk, file_path)
+
+def iter_ndjson(chunks):
+    """每行一个JSON对象"""
+    for chunk in chunks:
+        if orjson is not None:
+            yield b"".join(orjson.dumps(record, default=str) + b"\n" for record in frame_records(chunk))
         else:
-            latest_file = max(excel_files)
-            df = pd.read_excel(latest_file, sheet_name="简化数据")
+            yield chunk.to_json(orient="records", lines=True, force_ascii=False, date_format="iso").encode("utf-8")
+
+def iter_csv(chunks):
+    """CSV，只有第一块输出表头"""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+# 每个数据集缓存的响应体数量（不同查询条件和压缩方式）
+MAX_CACHED_BODIES = 64
+
+# 可按取值筛选的列和可排序的列
+CATEGORY_FILTERS = ("interface", "form_factor", "seller")
+NUMERIC_SORT_KEYS = ("price", "price_per_tb", "capacity")
+TEXT_SORT_KEYS = ("product_name", "seller", "interface", "form_factor")
+
+class DatasetIndex:
+    """数据集的内存索引：分类列的取值 -> 行号，数值列的解析结果和缓存的排序"""
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.categories = {}
+        for column in CATEGORY_FILTERS:
+            if column in df.columns:
+                values = df[column].astype(str).str.strip().str.lower()
+                self.categories[column] = {
+                    value: np.asarray(positions) for value, positions in values.groupby(values).indices.items()
+                }
+        self.numeric = {}
+        if "price" in df.columns:
+            self.numeric["price"] = normalize.parse_price(df["price"])
+        if "price_per_tb" in df.columns:
+            self.numeric["price_per_tb"] = normalize.parse_price(df["price_per_tb"])
+        if "capacity" in df.columns:
+            self.numeric["capacity"] = normalize.parse_capacity_tb(df["capacity"])
+        self._text = {column: df[column].astype(str).str.lower().to_numpy()
+                      for column in TEXT_SORT_KEYS if column in df.columns}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def sort_order(self, key):
+        """返回按 key 升序的行号（缺失值排在最后），结果会被缓存"""
+        with self._lock:
+            order = self._orders.get(key)
+        if order is None:
+            if key in self.numeric:
+                # argsort 把 NaN 排在最后
+                order = np.argsort(self.numeric[key], kind="stable")
+            elif key in self._text:
+                order = np.argsort(self._text[key], kind="stable")
+            else:
+                order = np.arange(self.size)
+            with self._lock:
+                self._orders[key] = order
+        return order
+
+    def select(self, query):
+        """根据查询条件返回符合条件的行号（已排序）"""
+        mask = np.ones(self.size, dtype=bool)
+        for column in CATEGORY_FILTERS:
+            values = query.get(column)
+            if not values:
+                continue
+            index = self.categories.get(column, {})
+            column_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                positions = index.get(value.strip().lower())
+                if positions is not None:
+                    column_mask[positions] = True
+            mask &= column_mask
         
-        print(f"正在读取文件: {latest_file}")
+        for key, column in (("capacity", "capacity"), ("price_per_tb", "price_per_tb")):
+            low, high = query.get(f"{key}_min"), query.get(f"{key}_max")
+            if low is None and high is None:
+                continue
+            values = self.numeric.get(column)
+            if values is None:
+                mask[:] = False
+                continue
+            # NaN 与任何范围比较都为 False，会被过滤掉
+            with np.errstate(invalid="ignore"):
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
         
-        # 获取列名并重命名为前端期望的格式
-        columns = df.columns.tolist()
-        column_mapping = {
-            "产品名称": "product_name",
-            "容量": "capacity",
-            "价格": "price",
-            "每TB价格": "price_per_tb",
-            "接口": "interface",
-            "硬盘形态": "form_factor",
-            "卖家": "seller",
-            "评分": "rating",
-            "产品链接": "product_url",
-            "卖家链接": "seller_url",
-            "爬取时间": "date_scraped"
-        }
+        sort = query.get("sort")
+        if sort:
+            key = sort.lstrip("-")
+            order = self.sort_order(key)
+            if sort.startswith("-"):
+                if key in self.numeric:
+                    # 降序时缺失值仍排在最后
+                    valid = ~np.isnan(self.numeric[key][order])
+                    order = np.concatenate([order[valid][::-1], order[~valid]])
+                else:
+                    order = order[::-1]
+            return order[mask[order]]
+        return np.flatnonzero(mask)
+
+def serialize_records(df):
+    """按列把 DataFrame 直接序列化为 JSON 数组字节；有 orjson 时使用 orjson"""
+    if orjson is None:
+        return df.to_json(orient="records", force_ascii=False, date_format="iso").encode("utf-8")
+    # orjson 把 NaN 序列化为 null
+    return orjson.dumps(frame_records(df), default=str)
+
+def frame_records(df):
+    """按列转换为 Python 对象再组装成字典列表，避免逐行构造 Series"""
+    columns = [str(column) for column in df.columns]
+    values = [df[column].tolist() for column in df.columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+def choose_encoding(accept_encoding, size):
+    """根据 Accept-Encoding 选择压缩方式，较小的响应不压缩"""
+    if size < MIN_COMPRESS_SIZE:
+        return None
+    accepted = {item.split(";")[0].strip().lower() for item in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class DatasetEntry:
+    """缓存的数据集：解析后的 DataFrame、预先序列化的 JSON 和压缩后的响应体"""
+
+    def __init__(self, signature, df):
+        self.signature = signature
+        self.df = df
+        self._json_body = None
+        self._index = None
+        self._bodies = OrderedDict()  # (查询条件, None) -> (总行数, JSON)；(查询条件, 压缩方式) -> 压缩后的响应体
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        """数据集的内存索引，第一次查询时建立"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = DatasetIndex(self.df)
+        return self._index
+
+    def query_json(self, query):
+        """按筛选、排序和分页条件返回 (总行数, 当前页的JSON字节)"""
+        positions = self.index.select(query)
+        total = len(positions)
+        offset = query.get("offset") or 0
+        limit = query.get("limit")
+        page = positions[offset:offset + limit] if limit is not None else positions[offset:]
+        return total, serialize_records(self.df.iloc[page])
+
+    @property
+    def json_body(self):
+        """序列化后的 JSON 字节，第一次访问时生成"""
+        if self._json_body is None:
+            with self._lock:
+                if self._json_body is None:
+                    self._json_body = serialize_records(self.df)
+        return self._json_body
+
+    def etag(self, query_key):
+        """同一快照文件和查询条件对应同一个 ETag"""
+        digest = hashlib.sha1(repr((self.signature, query_key)).encode("utf-8")).hexdigest()
+        return f'W/"{digest[:20]}"'
+
+    def body(self, query, query_key, accept_encoding):
+        """返回 (总行数, 响应体, 压缩方式)，序列化和压缩结果按查询条件和压缩方式缓存"""
+        raw = self._cached_body((query_key, None))
+        if raw is None:
+            raw = (len(self.df), self.json_body) if query is None else self.query_json(query)
+            self._store_body((query_key, None), raw)
         
-        # 如果列名是中文，进行重命名
-        if "产品名称" in columns:
-            df = df.rename(columns=column_mapping)
+        total, body = raw
+        encoding = choose_encoding(accept_encoding, len(body))
+        if encoding is None:
+            return total, body, None
+        compressed = self._cached_body((query_key, encoding))
+        if compressed is None:
+            compressed = compress_body(body, encoding)
+            self._store_body((query_key, encoding), compressed)
+        return total, compressed, encoding
+
+    def _cached_body(self, key):
+        with self._lock:
+            value = self._bodies.get(key)
+            if value is not None:
+                self._bodies.move_to_end(key)
+            return value
+
+    def _store_body(self, key, value):
+        with self._lock:
+            self._bodies[key] = value
+            while len(self._bodies) > MAX_CACHED_BODIES:
+                self._bodies.popitem(last=False)
+
+# 按文件路径缓存数据集，文件的 mtime 或大小变化时重新解析
+MAX_CACHED_DATASETS = 8
+_dataset_cache = OrderedDict()
+_dataset_cache_lock = threading.Lock()
+
+def file_signature(file_path):
+    """文件路径 + mtime + 大小，用于判断缓存是否失效"""
+    stat = os.stat(file_path)
+    return (file_path, stat.st_mtime_ns, stat.st_size)
+
+def load_dataset(file_path):
+    """读取数据文件，命中缓存时直接返回已解析的数据"""
+    signature = file_signature(file_path)
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(file_path)
+        if entry is not None and entry.signature == signature:
+            _dataset_cache.move_to_end(file_path)
+            return entry
+    
+    print(f"正在读取文件: {file_path}")
+    # 快照只读取 API 需要的列
+    columns = list(COLUMN_MAPPING.values()) if file_path.endswith(SNAPSHOT_EXTENSIONS) else None
+    entry = DatasetEntry(signature, read_data_file(file_path, columns=columns))
+    if not file_path.endswith(SNAPSHOT_EXTENSIONS):
+        # 旧版文件登记时没有行数和时间范围，解析后补充
+        scraped = entry.df["date_scraped"].dropna().astype(str) if "date_scraped" in entry.df.columns else []
+        catalog.update_stats(file_path, len(entry.df),
+                             min(scraped) if len(scraped) else None, max(scraped) if len(scraped) else None)
+    with _dataset_cache_lock:
+        _dataset_cache[file_path] = entry
+        _dataset_cache.move_to_end(file_path)
+        while len(_dataset_cache) > MAX_CACHED_DATASETS:
+            _dataset_cache.popitem(last=False)
+    return entry
+
+def _split_values(value):
+    return [item for item in value.split(",") if item.strip()] if value else None
+
+def dataset_query(
+    interface: Optional[str] = Query(None, description="接口类型，多个值用逗号分隔"),
+    form_factor: Optional[str] = Query(None, description="硬盘形态，多个值用逗号分隔"),
+    seller: Optional[str] = Query(None, description="卖家，多个值用逗号分隔"),
+    capacity_min: Optional[float] = Query(None, ge=0, description="最小容量 (TB)"),
+    capacity_max: Optional[float] = Query(None, ge=0, description="最大容量 (TB)"),
+    price_per_tb_min: Optional[float] = Query(None, ge=0),
+    price_per_tb_max: Optional[float] = Query(None, ge=0),
+    sort: Optional[str] = Query(None, description="排序字段，前缀 - 表示降序，例如 -price_per_tb"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+):
+    """数据查询参数；没有任何参数时返回 None，表示返回完整数据集"""
+    if sort and sort.lstrip("-") not in NUMERIC_SORT_KEYS + TEXT_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"不支持的排序字段: {sort}")
+    query = {
+        "interface": _split_values(interface),
+        "form_factor": _split_values(form_factor),
+        "seller": _split_values(seller),
+        "capacity_min": capacity_min,
+        "capacity_max": capacity_max,
+        "price_per_tb_min": price_per_tb_min,
+        "price_per_tb_max": price_per_tb_max,
+        "sort": sort,
+        "limit": limit,
+        "offset": offset,
+    }
+    if offset == 0 and all(value is None for key, value in query.items() if key != "offset"):
+        return None
+    return query
+
+def query_cache_key(query):
+    if query is None:
+        return None
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value) for key, value in query.items()))
+
+# 读取文件、解析和序列化等阻塞操作在有限的线程池中执行，不占用事件循环
+LOADER_WORKERS = int(os.environ.get("DISKPRICES_API_WORKERS", "4"))
+_loader_executor = ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="dataset-loader")
+# 正在进行的加载任务，相同 key 的并发请求共享同一个结果
+_inflight = {}
+
+async def run_blocking(func, *args):
+    """在加载线程池中执行阻塞函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_loader_executor, functools.partial(func, *args))
+
+async def run_coalesced(key, func, *args):
+    """与 run_blocking 相同，但同一个 key 同时只执行一次，其他请求等待同一个结果"""
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(run_blocking(func, *args))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: 某个请求被取消时不影响其他等待同一结果的请求
+    return await asyncio.shield(future)
+
+async def dataset_response(request, entry, query):
+    """返回完整数据集或筛选后的当前页；支持 ETag/If-None-Match 和 gzip/br 压缩，总行数放在 X-Total-Count 头中"""
+    query_key = query_cache_key(query)
+    etag = entry.etag(query_key)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    accept_encoding = request.headers.get("accept-encoding", "")
+    total, body, encoding = await run_coalesced(
+        ("body", entry.signature, query_key, accept_encoding),
+        entry.body, query, query_key, accept_encoding
+    )
+    headers["X-Total-Count"] = str(total)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def find_latest_file():
+    """返回最新的数据文件：优先列式快照，其次Excel文件，最后CSV文件"""
+    entry = catalog.find_latest()
+    if entry is not None and not os.path.exists(entry["path"]):
+        # 文件已被删除，重新同步目录
+        refresh_catalog()
+        entry = catalog.find_latest()
+    return entry["path"] if entry is not None else None
+
+def list_data_files(limit, offset):
+    """从目录中按修改时间从新到旧分页列出数据文件，返回 (总数, 当前页)"""
+    files_info = []
+    for entry in catalog.list_files(limit=limit, offset=offset):
+        files_info.append({
+            "name": entry["name"],
+            "size": entry["size"],
+            "date": datetime.fromtimestamp(entry["mtime_ns"] / 1e9).strftime("%Y-%m-%d %H:%M:%S"),
+            "path": entry["path"],
+            "rows": entry["row_count"],
+            "schema_version": entry["schema_version"],
+            "scraped_from": entry["min_scraped"],
+            "scraped_to": entry["max_scraped"]
+        })
+    return catalog.count(), files_info
+
+@app.on_event("startup")
+async def sync_catalog():
+    """启动时补登记目录中没有的文件（旧版文件或目录创建之前写入的快照）"""
+    await run_blocking(refresh_catalog)
+
+@app.get("/api/latest")
+async def get_latest_data(request: Request, query: Optional[dict] = Depends(dataset_query)):
+    """获取最新的爬虫数据，支持按接口、形态、卖家、容量和每TB价格筛选，以及排序和分页"""
+    try:
+        latest_file = await run_coalesced("latest", find_latest_file)
+        if latest_file is None:
+            raise HTTPException(status_code=404, detail="没有找到数据文件")
         
-        # 转换为JSON格式
-        return df.to_dict(orient="records")
+        # 返回缓存中预先序列化的JSON，或在索引上筛选后的当前页
+        entry = await run_coalesced(("load", latest_file), load_dataset, latest_file)
+        return await dataset_response(request, entry, query)
     except Exception as e:
         print(f"获取数据出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/files")
-async def get_data_files():
-    """获取所有可用的数据文件"""
+async def get_data_files(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    refresh: bool = Query(False, description="重新扫描磁盘同步目录"),
+):
+    """分页获取可用的数据文件，总数放在 X-Total-Count 头中"""
     try:
-        # 查找所有Excel和CSV文件
-        excel_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.xlsx"))
-        csv_files = glob.glob(os.path.join(DATA_DIR, "diskprices_data_*.csv"))
-        
-        all_files = excel_files + csv_files
-        files_info = []
-        
-        for file in all_files:
-            filename = os.path.basename(file)
-            file_size = os.path.getsize(file)
-            file_date = os.path.getmtime(file)
-            
-            files_info.append({
-                "name": filename,
-                "size": file_size,
-                "date": datetime.fromtimestamp(file_date).strftime("%Y-%m-%d %H:%M:%S"),
-                "path": file
-            })
-        
-        return sorted(files_info, key=lambda x: x["date"], reverse=True)
+        if refresh:
+            await run_coalesced("refresh", refresh_catalog)
+        total, files_info = await run_blocking(list_data_files, limit, offset)
+        response.headers["X-Total-Count"] = str(total)
+        return files_info
     except Exception as e:
         print(f"获取文件列表出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/file/{filename}")
-async def get_file_data(filename: str):
-    """获取指定文件的数据"""
+async def get_file_data(request: Request, filename: str, query: Optional[dict] = Depends(dataset_query)):
+    """获取指定文件的数据，查询参数与 /api/latest 相同"""
     try:
-        file_path = os.path.join(DATA_DIR, filename)
-        if not os.path.exists(file_path):
+        file_path = await run_blocking(resolve_data_file, filename)
+        if file_path is None:
             raise HTTPException(status_code=404, detail=f"文件 {filename} 不存在")
         
-        if filename.endswith(".xlsx"):
-            df = pd.read_excel(file_path, sheet_name="简化数据")
-        else:
-            df = pd.read_csv(file_path)
-        
-        # 处理列名映射
-        columns = df.columns.tolist()
-        column_mapping = {
-            "产品名称": "product_name",
-            "容量": "capacity",
-            "价格": "price",
-            "每TB价格": "price_per_tb",
-            "接口": "interface",
-            "硬盘形态": "form_factor",
-            "卖家": "seller",
-            "评分": "rating",
-            "产品链接": "product_url",
-            "卖家链接": "seller_url",
-            "爬取时间": "date_scraped"
-        }
-        
-        # 如果列名是中文，进行重命名
-        if "产品名称" in columns:
-            df = df.rename(columns=column_mapping)
-            
-        return df.to_dict(orient="records")
+        entry = await run_coalesced(("load", file_path), load_dataset, file_path)
+        return await dataset_response(request, entry, query)
     except Exception as e:
         print(f"获取文件数据出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/file/{filename}/stream")
+async def stream_file_data(
+    filename: str,
+    format: str = Query("ndjson", description="ndjson 或 csv"),
+    chunksize: int = Query(1000, ge=1, le=100000),
+):
+    """分块流式导出数据文件（NDJSON 或 CSV），内存占用与文件大小无关"""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    file_path = await run_blocking(resolve_data_file, filename)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail=f"文件 {filename} 不存在")
+    
+    chunks = iter_file_chunks(file_path, chunksize)
+    if format == "csv":
+        return StreamingResponse(iter_csv(chunks), media_type="text/csv; charset=utf-8")
+    return StreamingResponse(iter_ndjson(chunks), media_type="application/x-ndjson")
+
+@app.get("/api/history/products")
+async def get_history_products(
+    search: Optional[str] = Query(None, description="按产品名称或链接模糊匹配"),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """列出历史价格库中的产品及最近一次观测时间"""
+    try:
+        return await run_blocking(history_store.products, search, limit, offset)
+    except Exception as e:
+        print(f"获取产品列表出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/history")
+async def get_product_history(
+    product: str = Query(..., description="产品链接（没有链接时为产品名称）"),
+    days: int = Query(90, ge=1, le=3650),
+    limit: Optional[int] = Query(None, ge=1, le=100000),
+):
+    """某个产品最近 days 天的每次观测（价格、每TB价格、卖家）"""
+    try:
+        start = datetime.now() - timedelta(days=days)
+        return await run_blocking(history_store.history, product, start, None, limit)
+    except Exception as e:
+        print(f"获取历史价格出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/history/daily")
+async def get_daily_prices(
+    product: Optional[str] = Query(None, description="产品链接，不指定时为全部产品"),
+    days: int = Query(90, ge=1, le=3650),
+):
+    """每日最低价和中位数（价格和每TB价格）"""
+    try:
+        start = datetime.now() - timedelta(days=days)
+        return await run_blocking(history_store.daily, product or price_history.ALL_PRODUCTS, start)
+    except Exception as e:
+        print(f"获取每日价格出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def load_summary(filename, group_by, filters):
+    """读取文件的汇总；没有预先计算（旧版文件或汇总库创建之前的快照）时计算一次并保存"""
+    if filename is None:
+        latest_file = find_latest_file()
+        if latest_file is None:
+            return None
+        filename = os.path.basename(latest_file)
+    if not cube_store.has(filename):
+        file_path = resolve_data_file(filename)
+        if file_path is None:
+            return None
+        entry = load_dataset(file_path)
+        cube_store.add(filename, analytics_cube.build_cube(entry.df))
+    return {"file": filename, "group_by": group_by, "rows": cube_store.query(filename, group_by, filters)}
+
+@app.get("/api/summary")
+async def get_summary(
+    group_by: Optional[str] = Query("seller", description="分组维度，多个用逗号分隔: seller,interface,form_factor,capacity_bucket"),
+    file: Optional[str] = Query(None, description="数据文件名，默认最新的数据文件"),
+    seller: Optional[str] = Query(None),
+    interface: Optional[str] = Query(None),
+    form_factor: Optional[str] = Query(None),
+    capacity_bucket: Optional[str] = Query(None),
+):
+    """按维度汇总的数量、平均价格和每TB价格（平均/最低/最高/中位数），直接读取预先计算的结果"""
+    dims = _split_values(group_by) or []
+    unknown = [dim for dim in dims if dim not in analytics_cube.DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的分组维度: {', '.join(unknown)}")
+    filters = {dim: value for dim, value in (("seller", seller), ("interface", interface),
+                                             ("form_factor", form_factor), ("capacity_bucket", capacity_bucket))
+               if value is not None}
+    try:
+        summary = await run_coalesced(("summary", file, tuple(dims), tuple(sorted(filters.items()))),
+                                      load_summary, file, dims, filters)
+    except Exception as e:
+        print(f"获取汇总出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=404, detail="没有找到数据文件")
+    return summary
+
 # 挂载静态文件
 app.mount("/", StaticFiles(directory="frontend/build", html=True)) 
\ No newline at end of file
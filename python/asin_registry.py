@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import datetime
+
+# 连续多少次刷新都没有返回价格后从登记表中删除（下架或不再销售）
+MAX_MISSES = 3
+# 刷新价格时重建记录所需的商品信息
+METADATA_FIELDS = ('product_name', 'product_url', 'capacity', 'interface', 'form_factor', 'seller')
+
+class AsinRegistry:
+    """已知商品（ASIN）的本地登记表，供价格刷新模式用 GetItems 批量重新查询价格
+
+    每个 ASIN 保存重建记录所需的商品信息、最近价格和首次/最近出现时间。
+    """
+
+    def __init__(self, path='data/asin_registry.json'):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"读取 ASIN 登记表出错，将重新建立: {e}")
+                self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, asin):
+        return asin in self.entries
+
+    def get(self, asin):
+        return self.entries.get(asin)
+
+    def asins(self):
+        """所有已知 ASIN，最久没有更新的排在前面"""
+        return sorted(self.entries, key=lambda asin: self.entries[asin].get('last_seen') or '')
+
+    def update(self, records):
+        """登记搜索或刷新得到的记录，返回新增的 ASIN 数量"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        added = 0
+        for record in records:
+            asin = record.get('asin')
+            if not asin:
+                continue
+            entry = self.entries.get(asin)
+            if entry is None:
+                entry = {'first_seen': now}
+                self.entries[asin] = entry
+                added += 1
+            for field in METADATA_FIELDS:
+                if record.get(field) is not None:
+                    entry[field] = record[field]
+            entry['last_price'] = record.get('price')
+            entry['last_seen'] = now
+            entry['misses'] = 0
+        return added
+
+    def mark_missing(self, asins):
+        """记录本次刷新没有返回价格的 ASIN，连续 MAX_MISSES 次后删除，返回删除的数量"""
+        removed = 0
+        for asin in asins:
+            entry = self.entries.get(asin)
+            if entry is None:
+                continue
+            entry['misses'] = entry.get('misses', 0) + 1
+            if entry['misses'] >= MAX_MISSES:
+                del self.entries[asin]
+                removed += 1
+        return removed
+
+    def save(self):
+        """原子地写入登记表文件"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
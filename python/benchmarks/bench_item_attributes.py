@@ -0,0 +1,127 @@
+"""Amazon 商品属性提取的微基准：逐关键词查找的旧实现 vs item_attributes.extract_attributes
+
+用法: python benchmarks/bench_item_attributes.py [--items 5000] [--repeat 5] [--json 结果文件]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from item_attributes import extract_attributes
+
+# 合成语料：模仿 PA-API 商品标题和特征文本
+BRANDS = ['Samsung', 'WD', 'Seagate', 'Crucial', 'Kingston', 'SanDisk', 'Toshiba', 'SK hynix', 'Sabrent', 'LaCie']
+PRODUCTS = ['Internal Hard Drive', 'External Hard Drive', 'SSD', 'NVMe SSD', 'SATA SSD', 'Portable SSD',
+            'Desktop HDD', 'NAS Drive', 'Gaming Drive', 'Solid State Drive']
+CAPACITIES = ['250GB', '500 GB', '1TB', '2 TB', '4TB', '8TB', '12 TB', '16TB', '18TB', '20 TB', '960GB', '1.92TB']
+# 特征文本与 PA-API 返回的 Features 类似，每条是一句较长的卖点描述
+DETAILS = [
+    'SATA III 6Gb/s interface delivers sequential read speeds up to 560 MB/s for faster boot and load times',
+    'PCIe Gen4 NVMe performance with read/write speeds of up to 7,000/5,100 MB/s for gaming and creative work',
+    'USB 3.2 Gen 2 connectivity with included USB-C and USB-A cables, plug-and-play on Windows and macOS',
+    'Thunderbolt 3 port for transfer rates up to 40Gb/s when editing 4K and 8K video directly from the drive',
+    'Slim 2.5 inch form factor fits laptops, desktops and game consoles with a standard drive bay',
+    'Standard 3.5" form factor with 7200 RPM spindle speed and 256MB cache for demanding NAS workloads',
+    'M.2 2280 single-sided design with heatsink-ready profile for desktops, laptops and PlayStation 5',
+    'Rugged external enclosure with drop, dust and water resistance to protect your files on the go',
+    'Hardware-based 256-bit AES encryption and password protection keep sensitive data secure',
+    'Built with TLC 3D NAND and a DRAM cache for consistent sustained write performance',
+    'Backed by a 5-year limited warranty and free data recovery services for peace of mind',
+    'Compatible with PC, Mac, PS5 and Xbox Series X|S; reformatting may be required for some systems',
+]
+
+def build_corpus(items, seed=0):
+    """生成 items 个商品的 [标题] + 特征 文本列表"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(items):
+        title = f"{rng.choice(BRANDS)} {rng.choice(CAPACITIES)} {rng.choice(PRODUCTS)} - {rng.choice(DETAILS)}"
+        features = rng.sample(DETAILS, rng.randint(0, 6))
+        corpus.append([title] + features)
+    return corpus
+
+def legacy_extract(texts):
+    """旧版 _extract_capacity / _extract_interface / _extract_form_factor 的逻辑，各自重新小写并逐个关键词查找"""
+    def capacity():
+        lowered = [text.lower() for text in texts]
+        conversions = {'tb': 1, 'gb': 0.001, 'mb': 0.000001}
+        for text in lowered:
+            for unit, factor in conversions.items():
+                if unit in text:
+                    numbers = re.findall(r'(\d+(?:\.\d+)?)\s*' + unit, text)
+                    if numbers:
+                        return float(numbers[0]) * factor
+        return None
+
+    def interface():
+        lowered = [text.lower() for text in texts]
+        for text in lowered:
+            for name in ['sata', 'nvme', 'usb', 'thunderbolt', 'pcie']:
+                if name in text:
+                    return name.upper()
+        return 'Unknown'
+
+    def form_factor():
+        lowered = [text.lower() for text in texts]
+        form_factors = {'2.5': '2.5"', '3.5': '3.5"', 'm.2': 'M.2', 'external': 'External'}
+        for text in lowered:
+            for key, value in form_factors.items():
+                if key in text:
+                    return value
+        return 'Unknown'
+
+    return capacity(), interface(), form_factor()
+
+def time_extractor(extract, corpus, repeat):
+    """返回 repeat 次中最快的一次耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for texts in corpus:
+            extract(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="商品属性提取微基准")
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.items)
+
+    # 先确认两种实现的结果一致
+    mismatches = 0
+    for texts in corpus:
+        expected = legacy_extract(texts)
+        actual = tuple(extract_attributes(texts))
+        if expected[1:] != actual[1:] or (expected[0] is None) != (actual[0] is None) or \
+                (expected[0] is not None and abs(expected[0] - actual[0]) > 1e-9):
+            mismatches += 1
+
+    legacy = time_extractor(legacy_extract, corpus, args.repeat)
+    single_pass = time_extractor(extract_attributes, corpus, args.repeat)
+    results = {
+        'benchmark': 'item_attributes',
+        'items': args.items,
+        'repeat': args.repeat,
+        'mismatches': mismatches,
+        'legacy_items_per_sec': args.items / legacy,
+        'single_pass_items_per_sec': args.items / single_pass,
+        'speedup': legacy / single_pass
+    }
+    print(f"商品数: {args.items}，结果不一致: {mismatches}")
+    print(f"旧实现:   {results['legacy_items_per_sec']:,.0f} 个/秒")
+    print(f"单次扫描: {results['single_pass_items_per_sec']:,.0f} 个/秒 ({results['speedup']:.2f}x)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
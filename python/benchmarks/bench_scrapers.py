@@ -0,0 +1,315 @@
+"""爬虫的端到端基准：本地 HTTP 服务器提供指定行数的 diskprices 页面，测量各个爬虫的
+每秒行数、浏览器往返次数、峰值内存（RSS）和首行时间
+
+用法:
+    python benchmarks/bench_scrapers.py [--rows 100,1000,10000] [--scrapers enhanced,detailed,simple]
+                                        [--page 录制的页面] [--repeat 1] [--json 结果文件]
+
+每次运行在单独的子进程和临时目录中执行，峰值内存互不影响，爬虫保存的文件不会留在仓库中。
+浏览器由 BrowserPool 在计时开始前启动（无头模式、不拦截资源），启动时间单独记录。
+三个爬虫都只计时从打开页面到取得所有行的部分（见 _extract_rows），结果可以相互比较。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from diskprices_fixture import FixtureServer, generate_page
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# enhanced: EnhancedDiskPricesScraper，detailed: scrape_diskprices_enhanced，simple: scrape_diskprices
+SCRAPERS = ('enhanced', 'detailed', 'simple')
+DEFAULT_ROWS = (100, 1000, 10000)
+MAX_ROWS = 50000
+RSS_SAMPLE_INTERVAL = 0.05
+
+class RoundtripCounter:
+    """统计 Playwright 异步调用（每次 await 一次浏览器往返），并记录首次收到首行数据的时间"""
+
+    def __init__(self, marker=None):
+        self.marker = normalize_whitespace(marker) if marker else None
+        self.calls = 0
+        self.by_method = {}
+        self.first_row_at = None
+
+    def wrap(self, value):
+        if isinstance(value, list):
+            return [self.wrap(item) for item in value]
+        if type(value).__module__.startswith('playwright.'):
+            return _Counted(value, self)
+        return value
+
+    def record(self, method, result):
+        self.calls += 1
+        self.by_method[method] = self.by_method.get(method, 0) + 1
+        if self.first_row_at is None and self.marker and _contains(result, self.marker):
+            self.first_row_at = time.perf_counter()
+
+def normalize_whitespace(text):
+    """合并所有空白（包括换行），浏览器 innerText 与静态解析的文本换行和空格不同"""
+    return ' '.join(text.split())
+
+def _contains(value, marker):
+    """结果中是否包含首行产品名（行数据在前面，找到后立即返回）；marker 已合并空白"""
+    if isinstance(value, str):
+        return marker in normalize_whitespace(value)
+    if isinstance(value, (list, tuple)):
+        return any(_contains(item, marker) for item in value)
+    if isinstance(value, dict):
+        return any(_contains(item, marker) for item in value.values())
+    return False
+
+def _unwrap(value):
+    if isinstance(value, _Counted):
+        return object.__getattribute__(value, '_target')
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    return value
+
+class _Counted:
+    """Page / ElementHandle 等对象的代理：每次调用异步方法计为一次往返，返回的句柄同样被代理"""
+
+    def __init__(self, target, counter):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_counter', counter)
+
+    def __getattr__(self, name):
+        target = object.__getattribute__(self, '_target')
+        counter = object.__getattribute__(self, '_counter')
+        attr = getattr(target, name)
+        if asyncio.iscoroutinefunction(attr):
+            async def call(*args, **kwargs):
+                result = await attr(*[_unwrap(arg) for arg in args],
+                                    **{key: _unwrap(value) for key, value in kwargs.items()})
+                counter.record(name, result)
+                return counter.wrap(result)
+            return call
+        if callable(attr):
+            # page.locator() 等同步方法返回的对象也要统计
+            def call(*args, **kwargs):
+                return counter.wrap(attr(*[_unwrap(arg) for arg in args],
+                                         **{key: _unwrap(value) for key, value in kwargs.items()}))
+            return call
+        return counter.wrap(attr)
+
+    def __setattr__(self, name, value):
+        setattr(object.__getattribute__(self, '_target'), name, value)
+
+    def __bool__(self):
+        return True
+
+def counting_pool(counter, **kwargs):
+    """返回借出页面时套上 RoundtripCounter 代理的 BrowserPool；池自身的健康检查不计入"""
+    from browser_pool import BrowserPool, PooledPage
+
+    class CountingPool(BrowserPool):
+        async def acquire(self):
+            slot = await super().acquire()
+            lease = PooledPage(slot.context, counter.wrap(slot.page))
+            lease.slot = slot
+            lease.uses = slot.uses
+            return lease
+
+        async def release(self, lease, healthy=True):
+            await super().release(getattr(lease, 'slot', lease), healthy=healthy)
+
+    return CountingPool(**kwargs)
+
+def _children_rss():
+    """当前进程所有子进程（Playwright 驱动和浏览器）的 RSS 之和（字节）"""
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+async def _sample_rss(peak):
+    while True:
+        peak['browser'] = max(peak['browser'], _children_rss())
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+async def _extract_rows(name, url, pool):
+    """运行一个爬虫，只计时从打开页面到取得所有行的部分：爬虫初始化、截图和保存文件不计入
+
+    返回 (行数, 开始时间, 结束时间)
+    """
+    if name == 'enhanced':
+        from diskprices_enhanced import EnhancedDiskPricesScraper
+        from rate_limit import HostRateLimiter
+        scraper = EnhancedDiskPricesScraper(pool=pool, rate_limiter=HostRateLimiter(min_interval=0))
+        scraper.url = url
+        await scraper.initialize()
+        try:
+            start = time.perf_counter()
+            await scraper.scrape(max_pages=1, save_intermediate=False)
+            end = time.perf_counter()
+        finally:
+            await scraper.close()
+        return len(scraper.data), start, end
+    if name == 'detailed':
+        from diskprices_enhanced_v2 import scrape_rows_with_browser
+        start = time.perf_counter()
+        data = await scrape_rows_with_browser(pool=pool, url=url)
+        return len(data), start, time.perf_counter()
+    # scrape_diskprices 的提取步骤，不包括截图和保存 CSV/HTML
+    from diskprices_simple import collect_table_rows
+    async with pool.page() as page:
+        start = time.perf_counter()
+        await page.goto(url, timeout=60000)
+        await page.wait_for_load_state("networkidle")
+        tables = await page.query_selector_all('table')
+        data = await collect_table_rows(tables[0]) if tables else []
+        return len(data), start, time.perf_counter()
+
+async def run_worker(name, url, marker):
+    """子进程中运行一次爬虫并返回测量结果"""
+    counter = RoundtripCounter(marker)
+    pool = counting_pool(counter, size=1, headless=True, block_profile='none')
+    launch_start = time.perf_counter()
+    await pool.start()
+    launch_seconds = time.perf_counter() - launch_start
+
+    peak = {'browser': 0}
+    sampler = asyncio.create_task(_sample_rss(peak)) if psutil is not None else None
+    try:
+        rows, start, end = await _extract_rows(name, url, pool)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        await pool.close()
+    if rows and counter.first_row_at is None:
+        raise RuntimeError(f"浏览器返回的结果中没有找到首行标记: {marker!r}")
+
+    elapsed = end - start
+    # 没有 psutil 时只能得到单个最大的子进程（通常是浏览器渲染进程）的峰值
+    browser_peak = peak['browser'] if psutil is not None else resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    return {
+        'rows': rows,
+        'elapsed_seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else None,
+        'time_to_first_row_seconds': counter.first_row_at - start if counter.first_row_at is not None else None,
+        'roundtrips': counter.calls,
+        'roundtrips_by_method': counter.by_method,
+        'launch_seconds': launch_seconds,
+        'python_peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'browser_peak_rss_mb': browser_peak / 1024 / 1024,
+        'browser_rss_method': 'psutil' if psutil is not None else 'rusage_children_max',
+    }
+
+def run_once(name, url, marker, timeout):
+    """在新的子进程和临时目录中运行一次，返回结果字典"""
+    with tempfile.TemporaryDirectory() as workdir:
+        result_path = os.path.join(workdir, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--url', url,
+                   '--result', result_path]
+        if marker:
+            command += ['--marker', marker]
+        try:
+            process = subprocess.run(command, cwd=workdir, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {'error': f"超过 {timeout} 秒未完成"}
+        if process.returncode != 0 or not os.path.exists(result_path):
+            lines = (process.stderr or process.stdout).strip().splitlines()
+            return {'error': lines[-1] if lines else f"退出码 {process.returncode}"}
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+def environment_info():
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'psutil': psutil is not None,
+    }
+    try:
+        from importlib.metadata import version
+        info['playwright'] = version('playwright')
+    except Exception:
+        info['playwright'] = None
+    return info
+
+def print_summary(results):
+    print(f"\n{'爬虫':<10}{'行数':>8}{'行/秒':>12}{'首行(秒)':>10}{'往返':>10}{'Python RSS':>12}{'浏览器 RSS':>12}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['scraper']:<10}{result['page_rows']:>8}  出错: {result['error']}")
+            continue
+        first_row = result['time_to_first_row_seconds']
+        print(f"{result['scraper']:<10}{result['rows']:>8}{result['rows_per_sec'] or 0:>12,.0f}"
+              f"{first_row if first_row is not None else float('nan'):>10.3f}{result['roundtrips']:>10}"
+              f"{result['python_peak_rss_mb']:>10.0f}MB{result['browser_peak_rss_mb']:>10.0f}MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="爬虫端到端基准")
+    parser.add_argument('--rows', default=','.join(str(rows) for rows in DEFAULT_ROWS),
+                        help=f"页面行数，逗号分隔（最多 {MAX_ROWS}）")
+    parser.add_argument('--scrapers', default=','.join(SCRAPERS), help=f"逗号分隔，可选: {', '.join(SCRAPERS)}")
+    parser.add_argument('--page', help="录制的 diskprices 页面（见 diskprices_fixture.py record），默认生成合成页面")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=900, help="每次运行的超时时间（秒）")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    # 以下参数由主进程启动子进程时使用
+    parser.add_argument('--worker', choices=SCRAPERS, help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--marker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_worker(args.worker, args.url, args.marker))
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return result
+
+    row_counts = [int(rows) for rows in args.rows.split(',') if rows.strip()]
+    if any(rows < 1 or rows > MAX_ROWS for rows in row_counts):
+        parser.error(f"行数需要在 1 到 {MAX_ROWS} 之间")
+    scrapers = [name.strip() for name in args.scrapers.split(',') if name.strip()]
+    unknown = [name for name in scrapers if name not in SCRAPERS]
+    if unknown:
+        parser.error(f"未知的爬虫: {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as fixture_dir, FixtureServer(fixture_dir) as server:
+        for rows in row_counts:
+            name = f"diskprices_{rows}.html"
+            marker = generate_page(rows, os.path.join(fixture_dir, name), args.page)
+            for scraper in scrapers:
+                for run in range(args.repeat):
+                    print(f"{scraper}: {rows} 行，第 {run + 1}/{args.repeat} 次")
+                    result = {'scraper': scraper, 'page_rows': rows, 'run': run + 1}
+                    result.update(run_once(scraper, server.url(name), marker, args.timeout))
+                    results.append(result)
+
+    print_summary(results)
+    report = {
+        'benchmark': 'scrapers',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'fixture': args.page or 'synthetic',
+        'environment': environment_info(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.json}")
+    return report
+
+if __name__ == "__main__":
+    main()
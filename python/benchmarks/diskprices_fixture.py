@@ -0,0 +1,174 @@
+"""diskprices 页面的录制/回放：保存真实页面，按需要的行数生成页面并由本地 HTTP 服务器提供
+
+用法:
+    python benchmarks/diskprices_fixture.py record [保存路径]          录制 diskprices.com 当前页面
+    python benchmarks/diskprices_fixture.py generate 行数 保存路径 [--page 录制的页面]
+    python benchmarks/diskprices_fixture.py serve 目录 [端口]
+"""
+import functools
+import html
+import os
+import random
+import re
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import diskprices_static
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'diskprices_recorded.html')
+
+# 录制页面中的一行 tr.disk（页面中的行不嵌套表格）
+DISK_ROW_PATTERN = re.compile(r'<tr\b[^>]*\bclass\s*=\s*["\'][^"\']*\bdisk\b[^"\']*["\'][^>]*>.*?</tr>',
+                              re.IGNORECASE | re.DOTALL)
+
+# 合成页面使用的取值，列顺序与 diskprices.com 相同：
+# 产品、容量、价格、每TB价格、接口、形态、卖家、评分
+BRANDS = ['Seagate', 'WD', 'Toshiba', 'Samsung', 'Crucial', 'Kingston', 'SanDisk', 'HGST']
+CAPACITIES_TB = [0.5, 1, 2, 4, 8, 12, 14, 16, 18, 20, 22]
+INTERFACES = ['SATA', 'NVMe', 'USB 3.0', 'USB-C', 'SAS', 'Thunderbolt']
+FORM_FACTORS = ['3.5"', '2.5"', 'M.2', 'External']
+SELLERS = ['Amazon', 'Newegg', 'B&H Photo', 'Best Buy', 'Third Party']
+
+PAGE_HEADER = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Disk Prices (benchmark fixture)</title>
+</head>
+<body>
+<table class="disktable" id="diskprices">
+<thead>
+<tr><th>Product</th><th>Capacity</th><th>Price</th><th>Price/TB</th><th>Interface</th><th>Form Factor</th><th>Seller</th><th>Rating</th></tr>
+</thead>
+<tbody>
+'''
+PAGE_FOOTER = '''</tbody>
+</table>
+</body>
+</html>
+'''
+
+def synthetic_row(index, rng):
+    """生成一行与 diskprices.com 结构相同的 tr.disk"""
+    brand = rng.choice(BRANDS)
+    capacity = rng.choice(CAPACITIES_TB)
+    price = round(capacity * rng.uniform(12, 90) + rng.uniform(10, 40), 2)
+    seller = rng.choice(SELLERS)
+    name = f"{brand} Bench Disk {index:06d} {capacity:g}TB"
+    return (
+        '<tr class="disk">'
+        f'<td><a href="https://www.amazon.com/dp/B{index:09d}">{html.escape(name)}</a></td>'
+        f'<td>{capacity:g} TB</td>'
+        f'<td>${price:,.2f}</td>'
+        f'<td>${price / capacity:,.2f}</td>'
+        f'<td>{rng.choice(INTERFACES)}</td>'
+        f'<td>{html.escape(rng.choice(FORM_FACTORS))}</td>'
+        f'<td><a href="https://example.com/seller/{index % 97}">{html.escape(seller)}</a></td>'
+        f'<td>{rng.uniform(3, 5):.1f}</td>'
+        '</tr>\n'
+    )
+
+def split_recording(text):
+    """把录制的页面拆成 (表格之前的部分, 所有 tr.disk 行, 表格之后的部分)"""
+    rows = list(DISK_ROW_PATTERN.finditer(text))
+    if not rows:
+        raise ValueError("录制的页面中没有 tr.disk 行")
+    return text[:rows[0].start()], [row.group(0) for row in rows], text[rows[-1].end():]
+
+def generate_page(rows, path, recording=None, seed=0):
+    """生成包含 rows 行 tr.disk 的页面并写入 path
+
+    recording: 录制的页面路径，提供时保留页面其余部分，循环使用其中的行；否则生成合成页面
+    返回第一行产品单元格的文本，用于测量首行时间；没有时抛出 ValueError
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if recording:
+            with open(recording, 'r', encoding='utf-8', errors='replace') as source:
+                header, recorded_rows, footer = split_recording(source.read())
+            f.write(header)
+            for index in range(rows):
+                f.write(recorded_rows[index % len(recorded_rows)])
+            f.write(footer)
+        else:
+            rng = random.Random(seed)
+            f.write(PAGE_HEADER)
+            for index in range(rows):
+                f.write(synthetic_row(index, rng))
+            f.write(PAGE_FOOTER)
+    first = next((row for row in diskprices_static.parse_rows(path) if 'disk' in row.classes and row.cells), None)
+    if first is None or not first.cells[0].text.strip():
+        raise ValueError(f"生成的页面中第一行 tr.disk 没有产品文本，无法测量首行时间: {path}")
+    return first.cells[0].text
+
+def record_page(path=DEFAULT_RECORDING, url=diskprices_static.DISKPRICES_URL):
+    """下载页面原始HTML保存为录制文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in diskprices_static.iter_html_chunks(url):
+            f.write(chunk)
+    with open(path, 'r', encoding='utf-8') as f:
+        _, rows, _ = split_recording(f.read())
+    print(f"已录制 {url}，共 {len(rows)} 行 tr.disk，保存到 {path}")
+    return path
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """在后台线程中用本地 HTTP 服务器提供目录中的页面: with FixtureServer(目录) as server: server.url(文件名)"""
+
+    def __init__(self, directory, port=0):
+        handler = functools.partial(_QuietHandler, directory=directory)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.port}/{name}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('record', 'generate', 'serve'):
+        print(__doc__)
+        return
+    command = sys.argv[1]
+    if command == 'record':
+        record_page(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_RECORDING)
+    elif command == 'generate':
+        recording = sys.argv[sys.argv.index('--page') + 1] if '--page' in sys.argv else None
+        marker = generate_page(int(sys.argv[2]), sys.argv[3], recording)
+        print(f"已生成 {sys.argv[3]}，第一行: {marker}")
+    else:
+        server = FixtureServer(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 8000)
+        print(f"正在提供 {sys.argv[2]}: http://127.0.0.1:{server.port}/")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from resource_blocking import apply_blocking_profile
+from response_cache import apply_response_cache
+
+# 与 EnhancedDiskPricesScraper 一致的浏览器配置
+LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
+}
+
+class PooledPage:
+    """池中的一个预热的浏览器上下文和页面"""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.created_at = time.time()
+
+class BrowserPool:
+    """常驻的浏览器池：复用同一个 Chromium，向爬虫任务分发有限数量的预热上下文/页面
+
+    每个上下文在使用 max_uses 次后、或健康检查失败时关闭并重建，以限制内存增长。
+    """
+
+    def __init__(self, size=4, max_uses=20, headless=True, launch_args=None, context_options=None,
+                 health_check_timeout=5, block_profile='default', cache=None):
+        """
+        size: 同时可用的上下文/页面数量
+        max_uses: 每个上下文被分发多少次后回收重建
+        health_check_timeout: 健康检查的超时时间（秒）
+        block_profile: 每个上下文使用的资源拦截配置，见 resource_blocking.BLOCKING_PROFILES
+        cache: 可选的 response_cache.ResponseCache，所有上下文共享
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.launch_args = launch_args if launch_args is not None else LAUNCH_ARGS
+        self.context_options = context_options if context_options is not None else CONTEXT_OPTIONS
+        self.health_check_timeout = health_check_timeout
+        self.block_profile = block_profile
+        self.cache = cache
+        self.playwright = None
+        self.browser = None
+        self._slots = asyncio.Queue()
+        self._launch_lock = asyncio.Lock()
+        self._started = False
+
+    async def start(self):
+        """启动浏览器并预热所有上下文"""
+        if self._started:
+            return
+        start = time.perf_counter()
+        self.playwright = await async_playwright().start()
+        await self._launch_browser()
+        for _ in range(self.size):
+            self._slots.put_nowait(await self._new_slot())
+        self._started = True
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"浏览器池已启动: {self.size} 个上下文，耗时 {elapsed:.0f} ms")
+
+    async def acquire(self):
+        """获取一个可用的页面，池中没有空闲页面时等待"""
+        if not self._started:
+            await self.start()
+        slot = await self._slots.get()
+        try:
+            if not await self._is_healthy(slot):
+                print("页面健康检查失败，重建上下文")
+                slot = await self._recycle(slot)
+        except Exception:
+            # 重建失败时把名额还给池，避免池逐渐缩小
+            self._slots.put_nowait(slot)
+            raise
+        slot.uses += 1
+        return slot
+
+    async def release(self, slot, healthy=True):
+        """归还页面；使用次数达到上限或任务报告异常时回收重建"""
+        try:
+            if not healthy or slot.uses >= self.max_uses:
+                slot = await self._recycle(slot)
+        except Exception as e:
+            print(f"回收上下文时出错: {e}")
+        self._slots.put_nowait(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        """以上下文管理器的方式借用页面: async with pool.page() as page"""
+        slot = await self.acquire()
+        healthy = True
+        try:
+            yield slot.page
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            await self.release(slot, healthy=healthy)
+
+    async def close(self):
+        """关闭所有上下文、浏览器和 Playwright"""
+        if not self._started:
+            return
+        self._started = False
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        try:
+            await self.browser.close()
+            await self.playwright.stop()
+            print("浏览器池已关闭")
+        except Exception as e:
+            print(f"关闭浏览器池时出错: {e}")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _launch_browser(self):
+        self.browser = await self.playwright.chromium.launch(
+            headless=self.headless,
+            args=self.launch_args
+        )
+
+    async def _new_slot(self):
+        # 浏览器意外退出时重新启动，加锁避免多个任务同时重启
+        async with self._launch_lock:
+            if not self.browser.is_connected():
+                print("浏览器已断开，重新启动")
+                await self._launch_browser()
+        context = await self.browser.new_context(**self.context_options)
+        await apply_response_cache(context, self.cache)
+        await apply_blocking_profile(context, self.block_profile)
+        page = await context.new_page()
+        return PooledPage(context, page)
+
+    async def _recycle(self, slot):
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+        return await self._new_slot()
+
+    async def _is_healthy(self, slot):
+        if not self.browser.is_connected() or slot.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(slot.page.evaluate('1'), timeout=self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+async def main():
+    # 示例：多个过滤条件共享同一个浏览器池，避免每次任务都重新启动浏览器
+    from diskprices_enhanced import EnhancedDiskPricesScraper
+
+    async with BrowserPool(size=2, max_uses=10) as pool:
+        for disk_type in ['internal', 'external']:
+            scraper = EnhancedDiskPricesScraper(filters={'type': disk_type}, sort_by='price_per_tb', pool=pool)
+            try:
+                await scraper.initialize()
+                await scraper.scrape(max_pages=1)
+                scraper.save_to_csv(f"diskprices_{disk_type}_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+            finally:
+                await scraper.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
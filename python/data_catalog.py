@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 目录文件与快照放在同一目录下: snapshots/catalog.sqlite
+CATALOG_FILENAME = 'catalog.sqlite'
+
+# 文件类型，find_latest 时按此顺序优先选择
+KIND_SNAPSHOT = 'snapshot'
+KIND_EXCEL = 'xlsx'
+KIND_CSV = 'csv'
+KINDS = (KIND_SNAPSHOT, KIND_EXCEL, KIND_CSV)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    row_count INTEGER,
+    schema_version INTEGER,
+    min_scraped TEXT,
+    max_scraped TEXT,
+    registered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime_ns DESC);
+CREATE INDEX IF NOT EXISTS files_kind_name ON files (kind, name);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+"""
+
+def file_kind(file_path):
+    """根据扩展名返回文件类型"""
+    if file_path.endswith(('.parquet', '.arrow')):
+        return KIND_SNAPSHOT
+    if file_path.endswith('.xlsx'):
+        return KIND_EXCEL
+    return KIND_CSV
+
+class DataCatalog:
+    """数据文件目录：记录每个快照/数据文件的大小、修改时间、行数、schema 版本和爬取时间范围
+
+    爬虫写入快照时登记，API 直接分页查询目录，不必每次 glob 和 stat 所有文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # API 在线程池中访问目录，用锁串行化同一个连接上的操作
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def register(self, file_path, row_count=None, schema_version=None, min_scraped=None, max_scraped=None):
+        """登记或更新一个文件；文件被重写时行数等信息一并覆盖"""
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        registered_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO files (path, name, kind, size, mtime_ns, row_count, schema_version,
+                                   min_scraped, max_scraped, registered_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    row_count = excluded.row_count,
+                    schema_version = excluded.schema_version,
+                    min_scraped = excluded.min_scraped,
+                    max_scraped = excluded.max_scraped,
+                    registered_at = excluded.registered_at
+                """,
+                (file_path, os.path.basename(file_path), file_kind(file_path), stat.st_size, stat.st_mtime_ns,
+                 row_count, schema_version, min_scraped, max_scraped, registered_at)
+            )
+
+    def update_stats(self, file_path, row_count, min_scraped=None, max_scraped=None):
+        """补充已登记文件的行数和时间范围（例如 API 解析旧版文件之后）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE files SET row_count = ?, min_scraped = COALESCE(?, min_scraped), "
+                "max_scraped = COALESCE(?, max_scraped) WHERE path = ?",
+                (row_count, min_scraped, max_scraped, os.path.abspath(file_path))
+            )
+
+    def remove(self, file_path):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(file_path),))
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def list_files(self, limit=100, offset=0):
+        """按修改时间从新到旧分页返回文件记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM files ORDER BY mtime_ns DESC, name DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find(self, name):
+        """按文件名查找，返回记录或 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM files WHERE name = ? ORDER BY mtime_ns DESC LIMIT 1", (name,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def find_latest(self, kinds=KINDS):
+        """返回最新的文件记录：按 kinds 的顺序优先，同类型中文件名（时间戳）最大的"""
+        with self._lock:
+            for kind in kinds:
+                row = self._conn.execute(
+                    "SELECT * FROM files WHERE kind = ? ORDER BY name DESC LIMIT 1", (kind,)
+                ).fetchone()
+                if row is not None:
+                    return dict(row)
+        return None
+
+    def reconcile(self, file_paths, inspect=None):
+        """与磁盘上的文件同步：登记新增或已修改的文件，删除已不存在的记录
+
+        inspect: 可选函数，接受文件路径，返回 row_count / schema_version / min_scraped / max_scraped 字典
+        返回 (新增或更新数量, 删除数量)
+        """
+        with self._lock:
+            known = {row['path']: (row['size'], row['mtime_ns'])
+                     for row in self._conn.execute("SELECT path, size, mtime_ns FROM files")}
+
+        updated = 0
+        seen = set()
+        for file_path in file_paths:
+            file_path = os.path.abspath(file_path)
+            seen.add(file_path)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if known.get(file_path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            info = {}
+            if inspect is not None:
+                try:
+                    info = inspect(file_path) or {}
+                except Exception as e:
+                    print(f"读取文件信息失败 {file_path}: {e}")
+            self.register(file_path, **info)
+            updated += 1
+
+        removed = [path for path in known if path not in seen]
+        if removed:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        return updated, len(removed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def main():
+    # 用法: python data_catalog.py [目录文件] [数量]
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('snapshots', CATALOG_FILENAME)
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    catalog = DataCatalog(path)
+    start = time.perf_counter()
+    files = catalog.list_files(limit=limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"目录中共 {catalog.count()} 个文件，查询 {len(files)} 条耗时 {elapsed:.1f} ms")
+    for item in files:
+        print(f"{item['name']}\t{item['row_count']} 行\t{item['min_scraped']} ~ {item['max_scraped']}")
+    catalog.close()
+
+if __name__ == "__main__":
+    main()
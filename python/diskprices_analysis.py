@@ -1,37 +1,60 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+# 只生成图片文件，使用非交互式后端（也避免在没有显示器的服务器上出错）
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
+import analytics_cube
+import history_analysis
+import normalize
+import snapshot_store
+
+# 分析所需的列，读取列式快照时只加载这些列
+ANALYSIS_COLUMNS = ['product_name', 'capacity', 'price', 'price_per_tb', 'interface', 'form_factor', 'seller',
+                    'price_value', 'price_per_tb_value']
 
-def load_data(file_path):
-    """加载数据文件"""
+# 数据量超过该行数时，直方图先用 numpy 分箱再绘制，散点图先抽样
+PREBIN_THRESHOLD = 10000
+HIST_BINS = 30
+MAX_SCATTER_POINTS = 5000
+# 记录每个图表输入数据哈希的文件，输入没有变化的图表不再重新绘制
+CHART_MANIFEST = '.chart_hashes.json'
+
+def load_data(file_path, columns=None):
+    """加载数据文件；列式快照（Parquet/Arrow）只读取 columns 指定的列"""
     if file_path.endswith('.csv'):
-        return pd.read_csv(file_path)
+        return pd.read_csv(file_path, usecols=columns)
     elif file_path.endswith('.xlsx'):
-        return pd.read_excel(file_path)
+        return pd.read_excel(file_path, usecols=columns)
+    elif file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path, columns=columns)
+    elif file_path.endswith('.arrow'):
+        return pd.read_feather(file_path, columns=columns)
     else:
-        raise ValueError("不支持的文件格式，请提供CSV或Excel文件")
+        raise ValueError("不支持的文件格式，请提供CSV、Excel、Parquet或Arrow文件")
 
 def clean_data(df):
     """清洗和准备数据"""
-    # 清理价格数据
-    df['price_clean'] = df['price'].str.replace('$', '').str.replace(',', '').astype(float)
-    df['price_per_tb_clean'] = df['price_per_tb'].str.replace('$', '').str.replace(',', '').astype(float)
-    
-    # 提取容量为数字
-    df['capacity_num'] = df['capacity'].str.extract(r'(\d+\.?\d*)').astype(float)
-    df['capacity_unit'] = df['capacity'].str.extract(r'(\D+)$')
-    
-    # 标准化容量单位为TB
-    conditions = [
-        df['capacity_unit'].str.contains('TB', case=False),
-        df['capacity_unit'].str.contains('GB', case=False)
-    ]
-    choices = [
-        df['capacity_num'],
-        df['capacity_num'] / 1024
-    ]
-    df['capacity_tb'] = np.select(conditions, choices, default=df['capacity_num'])
+    # 列式快照在写入时已解析出价格数值，直接使用；旧版文件从文本解析
+    if 'price_value' in df.columns:
+        df['price_clean'] = df['price_value'].astype(float)
+    else:
+        df['price_clean'] = normalize.parse_price(df['price'])
+    if 'price_per_tb_value' in df.columns:
+        df['price_per_tb_clean'] = df['price_per_tb_value'].astype(float)
+    else:
+        df['price_per_tb_clean'] = normalize.parse_price(df['price_per_tb'])
+    
+    # 标准化容量单位为TB（GB 按 1/1024 TB 换算）
+    df['capacity_tb'] = normalize.parse_capacity_tb(df['capacity'], binary=True)
     
     return df
 
@@ -41,111 +64,206 @@ def analyze_data(df):
     print("数据概览:")
     print(df.describe())
     
+    # 一次计算所有维度组合的汇总，卖家和接口统计都从中直接取出
+    cube = analytics_cube.build_cube(df.assign(
+        price_value=df['price_clean'],
+        price_per_tb_value=df['price_per_tb_clean']
+    ))
+    columns = {
+        'count': '产品数量',
+        'mean_price': '平均价格',
+        'mean_price_per_tb': '平均每TB价格'
+    }
+    
     # 按卖家统计
-    seller_stats = df.groupby('seller').agg({
-        'product_name': 'count',
-        'price_clean': 'mean',
-        'price_per_tb_clean': 'mean'
-    }).rename(columns={
-        'product_name': '产品数量',
-        'price_clean': '平均价格',
-        'price_per_tb_clean': '平均每TB价格'
-    }).sort_values('产品数量', ascending=False)
+    seller_stats = analytics_cube.rollup(cube, ['seller']).set_index('seller')[list(columns)].rename(columns=columns)
     
     print("\n卖家统计:")
     print(seller_stats)
     
     # 按接口类型统计
-    interface_stats = df.groupby('interface').agg({
-        'product_name': 'count',
-        'price_clean': 'mean',
-        'price_per_tb_clean': 'mean'
-    }).rename(columns={
-        'product_name': '产品数量',
-        'price_clean': '平均价格',
-        'price_per_tb_clean': '平均每TB价格'
-    }).sort_values('产品数量', ascending=False)
+    interface_stats = analytics_cube.rollup(cube, ['interface']).set_index('interface')[list(columns)].rename(columns=columns)
     
     print("\n接口类型统计:")
     print(interface_stats)
     
     return {
         'seller_stats': seller_stats,
-        'interface_stats': interface_stats
+        'interface_stats': interface_stats,
+        'cube': cube
     }
 
-def visualize_data(df, stats, output_dir='charts'):
-    """可视化数据"""
-    # 创建输出目录
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 设置样式
+def _histogram_input(values):
+    """直方图的输入：数据量大时先分箱，只把每个箱的计数传给绘图进程"""
+    values = pd.Series(values, dtype=float).dropna().to_numpy()
+    if len(values) <= PREBIN_THRESHOLD:
+        return {'values': values}
+    counts, edges = np.histogram(values, bins=HIST_BINS)
+    return {'counts': counts, 'edges': edges}
+
+def chart_inputs(df, stats):
+    """准备每个图表的绘图函数参数（只包含绘图需要的汇总或抽样数据）"""
+    scatter = df[['capacity_tb', 'price_clean', 'interface']]
+    if len(scatter) > MAX_SCATTER_POINTS:
+        scatter = scatter.sample(MAX_SCATTER_POINTS, random_state=0)
+    return {
+        'price_distribution': {
+            'kind': 'histogram', 'data': _histogram_input(df['price_clean']),
+            'title': '硬盘价格分布', 'xlabel': '价格 ($)'
+        },
+        'price_per_tb_distribution': {
+            'kind': 'histogram', 'data': _histogram_input(df['price_per_tb_clean']),
+            'title': '每TB价格分布', 'xlabel': '每TB价格 ($)'
+        },
+        'seller_comparison': {
+            'kind': 'barplot', 'data': stats['seller_stats'].head(10),
+            'title': '各卖家每TB平均价格比较 (前10名)', 'xlabel': '卖家', 'figsize': (12, 8)
+        },
+        'interface_comparison': {
+            'kind': 'barplot', 'data': stats['interface_stats'],
+            'title': '各接口类型每TB平均价格比较', 'xlabel': '接口类型', 'figsize': (10, 6)
+        },
+        'capacity_price_relationship': {
+            'kind': 'scatter', 'data': scatter.reset_index(drop=True),
+            'title': '容量与价格关系'
+        },
+    }
+
+def render_chart(chart, output_path):
+    """在工作进程中绘制一个图表并保存"""
     sns.set(style="whitegrid")
-    
-    # 1. 价格分布图
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['price_clean'], bins=30, kde=True)
-    plt.title('硬盘价格分布')
-    plt.xlabel('价格 ($)')
-    plt.ylabel('数量')
-    plt.savefig(f'{output_dir}/price_distribution.png')
+    kind, data = chart['kind'], chart['data']
+    if kind == 'histogram':
+        plt.figure(figsize=(10, 6))
+        if 'counts' in data:
+            # 已分箱的数据：以箱中心为样本、计数为权重，KDE 同样按权重计算
+            centers = (data['edges'][:-1] + data['edges'][1:]) / 2
+            sns.histplot(x=centers, weights=data['counts'], bins=data['edges'], kde=True)
+        else:
+            sns.histplot(data['values'], bins=HIST_BINS, kde=True)
+        plt.title(chart['title'])
+        plt.xlabel(chart['xlabel'])
+        plt.ylabel('数量')
+    elif kind == 'barplot':
+        plt.figure(figsize=chart['figsize'])
+        sns.barplot(x=data.index, y='平均每TB价格', data=data)
+        plt.title(chart['title'])
+        plt.xlabel(chart['xlabel'])
+        plt.ylabel('每TB平均价格 ($)')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+    else:
+        plt.figure(figsize=(10, 6))
+        sns.scatterplot(x='capacity_tb', y='price_clean', hue='interface', data=data)
+        plt.title(chart['title'])
+        plt.xlabel('容量 (TB)')
+        plt.ylabel('价格 ($)')
+        plt.tight_layout()
+    plt.savefig(output_path)
     plt.close()
+    return output_path
+
+def chart_hash(chart):
+    """图表输入的哈希，用于判断是否需要重新绘制"""
+    return hashlib.sha256(pickle.dumps(chart, protocol=4)).hexdigest()
+
+def visualize_data(df, stats, output_dir='charts', workers=None, force=False):
+    """可视化数据：各图表在进程池中并行绘制，输入没有变化的图表跳过"""
+    # 创建输出目录
+    os.makedirs(output_dir, exist_ok=True)
     
-    # 2. 每TB价格分布图
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['price_per_tb_clean'], bins=30, kde=True)
-    plt.title('每TB价格分布')
-    plt.xlabel('每TB价格 ($)')
-    plt.ylabel('数量')
-    plt.savefig(f'{output_dir}/price_per_tb_distribution.png')
-    plt.close()
+    manifest_path = os.path.join(output_dir, CHART_MANIFEST)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
     
-    # 3. 卖家比较图
-    top_sellers = stats['seller_stats'].head(10)
-    plt.figure(figsize=(12, 8))
-    sns.barplot(x=top_sellers.index, y='平均每TB价格', data=top_sellers)
-    plt.title('各卖家每TB平均价格比较 (前10名)')
-    plt.xlabel('卖家')
-    plt.ylabel('每TB平均价格 ($)')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/seller_comparison.png')
-    plt.close()
+    jobs = {}
+    for name, chart in chart_inputs(df, stats).items():
+        output_path = os.path.join(output_dir, f'{name}.png')
+        digest = chart_hash(chart)
+        if not force and manifest.get(name) == digest and os.path.exists(output_path):
+            print(f"图表 {name} 的数据没有变化，跳过")
+            continue
+        jobs[name] = (chart, output_path, digest)
     
-    # 4. 接口类型比较图
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=stats['interface_stats'].index, y='平均每TB价格', data=stats['interface_stats'])
-    plt.title('各接口类型每TB平均价格比较')
-    plt.xlabel('接口类型')
-    plt.ylabel('每TB平均价格 ($)')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/interface_comparison.png')
-    plt.close()
+    if jobs:
+        workers = workers or min(len(jobs), os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {name: executor.submit(render_chart, chart, output_path)
+                           for name, (chart, output_path, _) in jobs.items()}
+                results = {}
+                for name, future in futures.items():
+                    try:
+                        future.result()
+                        results[name] = True
+                    except Exception as e:
+                        print(f"绘制图表 {name} 时出错: {e}")
+                        results[name] = False
+        else:
+            results = {}
+            for name, (chart, output_path, _) in jobs.items():
+                try:
+                    render_chart(chart, output_path)
+                    results[name] = True
+                except Exception as e:
+                    print(f"绘制图表 {name} 时出错: {e}")
+                    results[name] = False
+        
+        for name, ok in results.items():
+            if ok:
+                manifest[name] = jobs[name][2]
+            else:
+                manifest.pop(name, None)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
     
-    # 5. 容量与价格关系图
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(x='capacity_tb', y='price_clean', hue='interface', data=df)
-    plt.title('容量与价格关系')
-    plt.xlabel('容量 (TB)')
-    plt.ylabel('价格 ($)')
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/capacity_price_relationship.png')
-    plt.close()
+    print(f"可视化图表已保存到 {output_dir} 目录（重新绘制 {len(jobs)} 个）")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="硬盘价格数据分析")
+    parser.add_argument('--history', action='store_true',
+                        help="分析时间窗口内的所有历史快照（分批读取，内存占用有上限），而不是最新的一个文件")
+    parser.add_argument('--since', type=date.fromisoformat, help="开始日期 YYYY-MM-DD（含）")
+    parser.add_argument('--until', type=date.fromisoformat, help="结束日期 YYYY-MM-DD（含）")
+    parser.add_argument('--root', default=snapshot_store.SNAPSHOT_DIR, help="快照目录")
+    parser.add_argument('--engine', choices=['auto', 'duckdb', 'pandas'], default='auto',
+                        help="历史分析引擎，auto 在安装了 duckdb 时使用 duckdb")
+    return parser.parse_args()
+
+def run_history_analysis(args):
+    """历史模式：只输出卖家和接口类型统计"""
+    stats = history_analysis.analyze_history(args.root, args.since, args.until, engine=args.engine)
+    if stats is None:
+        print("时间窗口内没有快照")
+        return
     
-    print(f"可视化图表已保存到 {output_dir} 目录")
+    print(f"\n卖家统计 ({stats['files']} 个快照):")
+    print(stats['seller_stats'])
+    print("\n接口类型统计:")
+    print(stats['interface_stats'])
+    print("分析完成")
 
 def main():
+    args = parse_args()
+    if args.history:
+        run_history_analysis(args)
+        return
+    
     # 加载最新的数据文件
     files = [f for f in os.listdir() if f.startswith('diskprices_data_') and (f.endswith('.csv') or f.endswith('.xlsx'))]
+    files += snapshot_store.list_snapshots(args.root)
     if not files:
         print("未找到数据文件")
         return
     
-    latest_file = max(files)
+    latest_file = max(files, key=os.path.basename)
     print(f"正在分析文件: {latest_file}")
     
-    df = load_data(latest_file)
+    is_snapshot = latest_file.endswith(tuple(snapshot_store.FORMATS.values()))
+    df = load_data(latest_file, columns=ANALYSIS_COLUMNS if is_snapshot else None)
     df = clean_data(df)
     stats = analyze_data(df)
     visualize_data(df, stats)
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import time
+from browser_pool import BrowserPool
+from diskprices_enhanced import EnhancedDiskPricesScraper
+from rate_limit import HostRateLimiter
+
+def build_jobs(disk_types=('internal', 'external'), sorts=('price', 'price_per_tb'), max_pages=3):
+    """生成过滤条件 x 排序方式的所有组合任务"""
+    return [
+        {'filters': {'type': disk_type}, 'sort_by': sort_by, 'max_pages': max_pages}
+        for disk_type, sort_by in itertools.product(disk_types, sorts)
+    ]
+
+def record_key(record):
+    """去重键：同一商品在同一卖家只保留一条"""
+    if record.get('product_url') and record['product_url'] != "N/A":
+        return (record['product_url'], record.get('seller'))
+    return (record.get('product_name'), record.get('seller'), record.get('price'))
+
+def merge_results(results):
+    """合并多个任务的结果并去重，保留第一次出现的记录"""
+    merged = []
+    seen = set()
+    for records in results:
+        for record in records:
+            key = record_key(record)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(record)
+    return merged
+
+async def run_job(job, pool, semaphore, rate_limiter):
+    """在信号量限制下执行单个过滤/排序任务"""
+    async with semaphore:
+        scraper = EnhancedDiskPricesScraper(
+            filters=job.get('filters'),
+            sort_by=job.get('sort_by'),
+            pool=pool,
+            rate_limiter=rate_limiter
+        )
+        start = time.perf_counter()
+        try:
+            await scraper.initialize()
+            await scraper.scrape(max_pages=job.get('max_pages'), save_intermediate=False)
+        finally:
+            await scraper.close()
+        elapsed = time.perf_counter() - start
+        print(f"任务 {job} 完成: {len(scraper.data)} 条数据，耗时 {elapsed:.1f} 秒")
+        return scraper.data
+
+async def scrape_batch(jobs, concurrency=4, min_interval=1.0, jitter=0.5, pool=None):
+    """并发执行多个过滤/排序/页数任务，合并去重后返回所有记录
+    concurrency: 同时运行的任务数，也是默认浏览器池的大小
+    min_interval / jitter: 同一主机两次请求之间的间隔，替代每个任务内固定的等待
+    pool: 可选的 BrowserPool，未提供时创建一个并在结束后关闭
+    """
+    owns_pool = pool is None
+    if owns_pool:
+        pool = BrowserPool(size=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = HostRateLimiter(min_interval=min_interval, jitter=jitter)
+    
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(
+            *(run_job(job, pool, semaphore, rate_limiter) for job in jobs),
+            return_exceptions=True
+        )
+    finally:
+        if owns_pool:
+            await pool.close()
+    
+    completed = []
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"任务 {job} 失败: {result}")
+        else:
+            completed.append(result)
+    
+    merged = merge_results(completed)
+    elapsed = time.perf_counter() - start
+    total = sum(len(records) for records in completed)
+    print(f"批量爬取完成: {len(jobs)} 个任务，{total} 条记录，去重后 {len(merged)} 条，耗时 {elapsed:.1f} 秒")
+    return merged
+
+async def main():
+    # 内置/外置硬盘 x 所有排序方式
+    jobs = build_jobs()
+    data = await scrape_batch(jobs, concurrency=4)
+    
+    # 复用 EnhancedDiskPricesScraper 的保存逻辑
+    writer = EnhancedDiskPricesScraper()
+    writer.data = data
+    if not writer.save_snapshot():
+        writer.save_to_csv()
+        writer.save_to_excel()
+        writer.save_to_json()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"程序执行失败: {e}")
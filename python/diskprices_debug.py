@@ -1,10 +1,34 @@
 import asyncio
 from playwright.async_api import async_playwright
+import diskprices_static
+from response_cache import apply_response_cache, cache_from_env
 
-async def debug_website():
+def debug_website_static(source=None, cache=None):
+    """不启动浏览器，保存页面HTML并输出解析到的表格结构"""
+    try:
+        html_content = ''.join(diskprices_static.iter_html_chunks(source, cache=cache))
+        with open("diskprices_html.txt", "w", encoding="utf-8") as f:
+            f.write(html_content)
+        print("已保存HTML到 diskprices_html.txt")
+        
+        rows = diskprices_static.parse_rows("diskprices_html.txt")
+        disk_rows = [row for row in rows if 'disk' in row.classes]
+        print(f"共 {len(rows)} 行，其中 tr.disk {len(disk_rows)} 行")
+        if disk_rows:
+            print(f"第一行: {[cell.text for cell in disk_rows[0].cells]}")
+    except Exception as e:
+        print(f"调试过程中出错: {e}")
+
+async def debug_website(engine='browser', source=None, cache=None):
+    """cache: 可选的 response_cache.ResponseCache，调试提取逻辑时重复打开页面不再请求网络"""
+    if engine == 'static':
+        debug_website_static(source, cache=cache)
+        return
+    
     playwright = await async_playwright().start()
     browser = await playwright.chromium.launch(headless=False)  # 设为False以查看浏览器
     page = await browser.new_page()
+    await apply_response_cache(page, cache)
     
     try:
         print("正在访问网站...")
@@ -32,4 +56,7 @@ async def debug_website():
         await playwright.stop()
 
 if __name__ == "__main__":
-    asyncio.run(debug_website()) 
\ No newline at end of file
+    # 通过 DISKPRICES_ENGINE=static 和 DISKPRICES_SOURCE 选择静态解析引擎
+    engine, source = diskprices_static.engine_from_env()
+    # DISKPRICES_CACHE=1 时页面缓存到磁盘，重复运行不再请求网络
+    asyncio.run(debug_website(engine=engine, source=source, cache=cache_from_env())) 
\ No newline at end of file
@@ -1,21 +1,123 @@
 import asyncio
 from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 import pandas as pd
 import time
 import os
 import json
 from datetime import datetime
-import random
+import diskprices_static
+from rate_limit import HostRateLimiter
+from resource_blocking import apply_blocking_profile
+from response_cache import apply_response_cache, cache_from_env
+from fingerprint_store import FingerprintStore, append_delta
+import snapshot_store
+
+# 每行按位置提取的单元格数：产品、容量、价格、每TB价格、接口、形态、卖家
+ROW_CELL_COUNT = 7
+# 点击后表格在这段时间（毫秒）内没有变化、且没有进行中的请求时，认为点击没有改变表格（例如排序已生效）
+SETTLE_TIMEOUT = 1000
+# Playwright 中 timeout=0 表示不限时，剩余等待时间至少按 1 毫秒传入
+MIN_WAIT_MS = 1
+
+# 在页面内一次性提取表格所有行，每行返回
+# [7 个单元格文本..., 产品链接, 卖家链接]，避免逐个单元格的浏览器往返
+BULK_EXTRACT_SCRIPT = '''
+    (tableSelector) => {
+        let rows = document.querySelectorAll(tableSelector + ' tbody tr');
+        if (rows.length === 0) {
+            rows = document.querySelectorAll('tr');
+        }
+        const result = [];
+        for (const row of rows) {
+            const cells = row.querySelectorAll('td');
+            // 单元格不足的行可能是表头或空行
+            if (cells.length < 3) {
+                continue;
+            }
+            const values = [];
+            for (let i = 0; i < 7; i++) {
+                values.push(i < cells.length ? cells[i].innerText : null);
+            }
+            const linkHref = (i) => {
+                if (i >= cells.length) return null;
+                const link = cells[i].querySelector('a');
+                return link ? link.getAttribute('href') : null;
+            };
+            values.push(linkHref(0), linkHref(6));
+            result.push(values);
+        }
+        return result;
+    }
+'''
+
+# 表格状态签名：行数 + 第一行文本，用于判断点击后表格是否已经更新
+TABLE_SIGNATURE_SCRIPT = '''
+    (rowSelector) => {
+        const rows = document.querySelectorAll(rowSelector);
+        return rows.length + '|' + (rows.length ? rows[0].innerText : '');
+    }
+'''
+
+# 表格签名与点击前不同时返回 true，供 wait_for_function 轮询
+TABLE_CHANGED_SCRIPT = '''
+    ({rowSelector, before}) => {
+        const rows = document.querySelectorAll(rowSelector);
+        const signature = rows.length + '|' + (rows.length ? rows[0].innerText : '');
+        return rows.length > 0 && signature !== before;
+    }
+'''
 
 class EnhancedDiskPricesScraper:
-    def __init__(self, filters=None, sort_by=None):
+    def __init__(self, filters=None, sort_by=None, engine='browser', source=None, pool=None, rate_limiter=None,
+                 wait_timeout=10000, block_profile='default', debug_artifacts=False, cache=None):
+        """
+        engine: 'browser' 使用 Playwright；'static' 直接请求/读取 HTML 并解析，不启动浏览器
+        source: static 引擎的数据源，URL 或本地保存的页面文件，默认使用 self.url
+        pool: 可选的 BrowserPool，提供时从池中借用预热的页面，而不是每次启动浏览器
+        rate_limiter: 可选的 HostRateLimiter，多个爬虫共享时按主机统一限速；默认每次请求间隔 1-3 秒
+        wait_timeout: 点击过滤、排序、下一页后等待表格更新的超时时间（毫秒）
+        block_profile: 资源拦截配置（'none'/'default'/'strict' 或自定义字典），使用浏览器池时由池的配置决定
+        debug_artifacts: 是否保存调试截图和HTML（debug_screenshot.png、table_html.txt 等）
+        cache: 可选的 response_cache.ResponseCache，页面和脚本命中缓存时直接从磁盘返回；使用浏览器池时由池的配置决定
+        """
+        if engine not in diskprices_static.ENGINES:
+            raise ValueError(f"不支持的引擎: {engine}")
         self.url = "https://diskprices.com/"
         self.data = []
         self.filters = filters or {}  # 例如: {'type': 'internal', 'capacity': '1TB-4TB'}
         self.sort_by = sort_by  # 例如: 'price_per_tb'
+        self.engine = engine
+        self.source = source
+        self.pool = pool
+        self.rate_limiter = rate_limiter or HostRateLimiter(min_interval=1.0, jitter=2.0)
+        self.playwright = None
+        self.browser = None
+        self._lease = None
+        self._failed = False  # 爬取出错时归还浏览器池的页面需要重建
+        self.wait_timeout = wait_timeout
+        self.wait_stats = []  # 每个步骤实际等待的时间
+        self._inflight = set()  # 页面上正在进行的请求
+        self.table_selector = None
+        self.block_profile = block_profile
+        self.debug_artifacts = debug_artifacts
+        self.block_stats = None
+        self.cache = cache
+        self.cache_stats = None
         
     async def initialize(self):
         """初始化 Playwright 和浏览器"""
+        if self.engine == 'static':
+            print("使用静态解析引擎，无需启动浏览器")
+            return
+        if self.pool is not None:
+            self._lease = await self.pool.acquire()
+            self._failed = False
+            self.context = self._lease.context
+            self.page = self._lease.page
+            self._track_requests()
+            print("已从浏览器池获取页面")
+            return
         try:
             self.playwright = await async_playwright().start()
             # 使用更真实的浏览器配置
@@ -28,12 +130,91 @@ class EnhancedDiskPricesScraper:
                 viewport={'width': 1920, 'height': 1080},
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
             )
+            # 响应缓存需要先注册，被拦截的请求不会到达缓存
+            self.cache_stats = await apply_response_cache(self.context, self.cache)
+            # 拦截图片、字体、广告和统计脚本
+            self.block_stats = await apply_blocking_profile(self.context, self.block_profile)
             self.page = await self.context.new_page()
+            self._track_requests()
             print("浏览器初始化成功")
         except Exception as e:
             print(f"初始化失败: {e}")
             raise
     
+    def _on_request(self, request):
+        self._inflight.add(request)
+    
+    def _on_request_done(self, request):
+        self._inflight.discard(request)
+    
+    def _track_requests(self):
+        """记录页面上正在进行的请求，用于判断点击后是否还有数据在加载"""
+        self.page.on('request', self._on_request)
+        self.page.on('requestfinished', self._on_request_done)
+        self.page.on('requestfailed', self._on_request_done)
+    
+    def _untrack_requests(self):
+        # 池中的页面会被其他任务复用，归还前移除监听
+        for event, handler in (('request', self._on_request), ('requestfinished', self._on_request_done),
+                               ('requestfailed', self._on_request_done)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
+        self._inflight.clear()
+    
+    def _remaining_ms(self, start):
+        return self.wait_timeout - (time.perf_counter() - start) * 1000
+    
+    def _rows_selector(self):
+        return f'{self.table_selector} tbody tr' if self.table_selector else 'tr'
+    
+    async def _table_signature(self):
+        """返回当前表格的签名，点击前记录，用于判断表格是否已更新"""
+        try:
+            return await self.page.evaluate(TABLE_SIGNATURE_SCRIPT, self._rows_selector())
+        except Exception:
+            return None
+    
+    async def _wait_for_table_change(self, step, before):
+        """等待表格行数或第一行发生变化，超过 wait_timeout 不报错，返回表格是否已更新
+
+        先等待 SETTLE_TIMEOUT：表格没有变化且页面没有进行中的请求时，说明点击没有改变表格，
+        直接返回；仍有请求在进行时继续等待，直到 wait_timeout 用完。
+        """
+        start = time.perf_counter()
+        changed = False
+        arg = {'rowSelector': self._rows_selector(), 'before': before}
+        try:
+            try:
+                await self.page.wait_for_function(TABLE_CHANGED_SCRIPT, arg=arg,
+                                                  timeout=min(SETTLE_TIMEOUT, self.wait_timeout))
+                changed = True
+            except PlaywrightTimeoutError:
+                remaining = self._remaining_ms(start)
+                if self._inflight and remaining >= MIN_WAIT_MS:
+                    await self.page.wait_for_function(TABLE_CHANGED_SCRIPT, arg=arg, timeout=remaining)
+                    changed = True
+        except PlaywrightTimeoutError:
+            pass
+        except Exception:
+            # 点击触发整页跳转时执行上下文会被销毁，等待新页面加载后再比较
+            try:
+                remaining = self._remaining_ms(start)
+                if remaining >= MIN_WAIT_MS:
+                    await self.page.wait_for_load_state('domcontentloaded', timeout=remaining)
+                remaining = self._remaining_ms(start)
+                if remaining >= MIN_WAIT_MS:
+                    await self.page.wait_for_selector(self._rows_selector(), timeout=remaining)
+                changed = await self._table_signature() != before
+            except Exception:
+                pass
+        
+        elapsed = (time.perf_counter() - start) * 1000
+        self.wait_stats.append({'step': step, 'wait_ms': round(elapsed, 1), 'changed': changed})
+        print(f"{step}: 等待 {elapsed:.0f} ms，表格{'已更新' if changed else '未变化'}")
+        return changed
+    
     async def apply_filters(self):
         """应用过滤器"""
         try:
@@ -52,8 +233,9 @@ class EnhancedDiskPricesScraper:
                         element = await self.page.query_selector(selector)
                         if element:
                             print(f"找到过滤器元素: {selector}")
+                            before = await self._table_signature()
                             await element.click()
-                            await self.page.wait_for_timeout(2000)
+                            await self._wait_for_table_change(f"{disk_type} 过滤器", before)
                             print(f"已点击 {disk_type} 过滤器")
                             break
                     except Exception as e:
@@ -79,6 +261,7 @@ class EnhancedDiskPricesScraper:
         """应用排序"""
         try:
             if self.sort_by:
+                before = await self._table_signature()
                 # 实现排序逻辑
                 if self.sort_by == 'price':
                     # 点击价格排序按钮
@@ -86,37 +269,154 @@ class EnhancedDiskPricesScraper:
                 elif self.sort_by == 'price_per_tb':
                     # 点击每TB价格排序按钮
                     await self.page.click('th:has-text("Price/TB")')
-                await self.page.wait_for_timeout(1000)
+                await self._wait_for_table_change(f"{self.sort_by} 排序", before)
                 print(f"已按 {self.sort_by} 排序")
             return True
         except Exception as e:
             print(f"应用排序时出错: {e}")
             return False
     
-    async def scrape(self, max_pages=None):
-        """爬取网站数据"""
+    async def _extract_rows_bulk(self, table_selector):
+        """在页面内一次性提取所有行，返回紧凑数组；出错时返回 None"""
+        try:
+            start = time.perf_counter()
+            rows_data = await self.page.evaluate(BULK_EXTRACT_SCRIPT, table_selector)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"批量提取 {len(rows_data)} 行数据，耗时 {elapsed:.1f} ms")
+            return rows_data
+        except Exception as e:
+            print(f"批量提取失败，回退到逐元素提取: {e}")
+            return None
+    
+    async def _extract_rows_per_element(self, table_selector):
+        """逐个元素提取行数据（回退路径），返回与批量提取相同的紧凑数组"""
+        rows = await self.page.query_selector_all(f'{table_selector} tbody tr')
+        print(f"找到 {len(rows)} 行数据")
+        
+        # 如果没有找到行数据，尝试其他方法
+        if len(rows) == 0:
+            print("未找到行数据，尝试直接提取表格内容...")
+            if self.debug_artifacts:
+                # 提取整个表格的HTML
+                table_html = await self.page.evaluate(f'document.querySelector("{table_selector}").outerHTML')
+                with open("table_html.txt", "w", encoding="utf-8") as f:
+                    f.write(table_html)
+                print("已保存表格HTML到 table_html.txt")
+            
+            # 尝试使用更通用的选择器
+            rows = await self.page.query_selector_all('tr')
+            print(f"使用通用选择器找到 {len(rows)} 行数据")
+        
+        rows_data = []
+        for row in rows:
+            try:
+                # 提取每一行的数据
+                cells = await row.query_selector_all('td')
+                
+                # 如果这一行没有足够的单元格，可能是表头或空行
+                if len(cells) < 3:
+                    continue
+                
+                # 打印单元格数量以便调试
+                print(f"行包含 {len(cells)} 个单元格")
+                
+                values = []
+                for index in range(ROW_CELL_COUNT):
+                    values.append(await cells[index].inner_text() if len(cells) > index else None)
+                
+                # 提取产品链接和卖家链接
+                product_link = await cells[0].query_selector('a')
+                product_url = await product_link.get_attribute('href') if product_link else None
+                seller_url = None
+                if len(cells) > 6:
+                    seller_link = await cells[6].query_selector('a')
+                    if seller_link:
+                        seller_url = await seller_link.get_attribute('href')
+                
+                rows_data.append(values + [product_url, seller_url])
+            except Exception as e:
+                print(f"处理行数据时出错: {e}")
+                continue
+        return rows_data
+    
+    def _build_record(self, row_values):
+        """将紧凑数组 [7 个单元格文本, 产品链接, 卖家链接] 转换为数据记录"""
+        texts = [value if value is not None else "N/A" for value in row_values[:ROW_CELL_COUNT]]
+        product_name, capacity, price, price_per_tb, interface, form_factor, seller = texts
+        product_url = row_values[ROW_CELL_COUNT] or "N/A"
+        seller_url = row_values[ROW_CELL_COUNT + 1]
+        
+        # 提取更多详细信息
+        details = {}
+        if seller_url:
+            details['seller_url'] = seller_url
+        details['raw_price'] = price.replace('$', '').strip() if '$' in price else price
+        if price_per_tb != "N/A":
+            details['raw_price_per_tb'] = price_per_tb.replace('$', '').strip() if '$' in price_per_tb else price_per_tb
+        
+        return {
+            'product_name': product_name,
+            'product_url': product_url,
+            'capacity': capacity,
+            'price': price,
+            'price_per_tb': price_per_tb,
+            'interface': interface,
+            'form_factor': form_factor,
+            'seller': seller,
+            'details': details,
+            'date_scraped': datetime.now().strftime('%Y-%m-%d')
+        }
+    
+    def scrape_static(self):
+        """使用静态解析引擎获取数据，记录结构与浏览器引擎一致"""
+        if self.filters or self.sort_by:
+            print("静态解析引擎不支持页面上的过滤和排序，已忽略")
+        try:
+            rows = diskprices_static.parse_rows(self.source or self.url, cache=self.cache)
+            for row_values in diskprices_static.to_enhanced_rows(rows, ROW_CELL_COUNT):
+                self.data.append(self._build_record(row_values))
+            print(f"爬取完成，共获取 {len(self.data)} 条数据")
+        except Exception as e:
+            print(f"静态解析过程中出错: {e}")
+    
+    async def _throttle(self):
+        """按主机限速，替代固定的随机等待"""
+        delay = await self.rate_limiter.wait(self.url)
+        if delay > 0:
+            print(f"限速等待 {delay * 1000:.0f} ms")
+    
+    async def scrape(self, max_pages=None, bulk_extract=True, save_intermediate=True):
+        """爬取网站数据
+        bulk_extract: 为 True 时每页只用一次 page.evaluate 提取所有行，否则逐元素提取
+        save_intermediate: 是否把第一页数据保存到 first_page_data.csv（并发任务时应关闭）
+        """
+        if self.engine == 'static':
+            self.scrape_static()
+            return
         try:
             print(f"正在访问 {self.url}")
+            await self._throttle()
             await self.page.goto(self.url, timeout=60000)
             print("页面已加载")
             
-            # 保存页面截图以便调试
-            await self.page.screenshot(path="debug_screenshot.png")
-            print("已保存页面截图到 debug_screenshot.png")
-            
-            # 分析页面结构
-            print("分析页面结构...")
-            
-            # 查找所有表格
-            tables = await self.page.query_selector_all('table')
-            print(f"找到 {len(tables)} 个表格")
-            
-            # 获取所有表格的类名
-            table_classes = []
-            for i, table in enumerate(tables):
-                class_attr = await table.get_attribute('class')
-                table_classes.append(class_attr)
-                print(f"表格 {i+1} 类名: {class_attr}")
+            if self.debug_artifacts:
+                # 保存页面截图以便调试
+                await self.page.screenshot(path="debug_screenshot.png")
+                print("已保存页面截图到 debug_screenshot.png")
+                
+                # 分析页面结构
+                print("分析页面结构...")
+                
+                # 查找所有表格
+                tables = await self.page.query_selector_all('table')
+                print(f"找到 {len(tables)} 个表格")
+                
+                # 获取所有表格的类名
+                table_classes = []
+                for i, table in enumerate(tables):
+                    class_attr = await table.get_attribute('class')
+                    table_classes.append(class_attr)
+                    print(f"表格 {i+1} 类名: {class_attr}")
             
             # 等待表格加载完成 - 使用更通用的选择器
             print("等待表格加载...")
@@ -164,6 +464,7 @@ class EnhancedDiskPricesScraper:
                 print(f"使用替代表格选择器: {table_selector}")
             
             print(f"表格已加载，使用选择器: {table_selector}")
+            self.table_selector = table_selector
             
             # 应用过滤器和排序
             await self.apply_filters()
@@ -176,92 +477,25 @@ class EnhancedDiskPricesScraper:
             while has_next_page and (max_pages is None or page_num <= max_pages):
                 print(f"正在爬取第 {page_num} 页...")
                 
-                # 添加随机延迟，模拟人类行为
-                await self.page.wait_for_timeout(random.randint(1000, 3000))
-                
                 # 等待表格数据加载 - 使用找到的选择器
                 await self.page.wait_for_selector(f'{table_selector} tbody tr', timeout=10000)
                 
-                # 提取当前页面的数据
-                rows = await self.page.query_selector_all(f'{table_selector} tbody tr')
-                print(f"找到 {len(rows)} 行数据")
+                # 提取当前页面的数据：优先一次 evaluate 批量提取，失败时回退到逐元素提取
+                rows_data = None
+                if bulk_extract:
+                    rows_data = await self._extract_rows_bulk(table_selector)
+                if not rows_data:
+                    rows_data = await self._extract_rows_per_element(table_selector)
                 
-                # 如果没有找到行数据，尝试其他方法
-                if len(rows) == 0:
-                    print("未找到行数据，尝试直接提取表格内容...")
-                    # 提取整个表格的HTML
-                    table_html = await self.page.evaluate(f'document.querySelector("{table_selector}").outerHTML')
-                    with open("table_html.txt", "w", encoding="utf-8") as f:
-                        f.write(table_html)
-                    print("已保存表格HTML到 table_html.txt")
-                    
-                    # 尝试使用更通用的选择器
-                    rows = await self.page.query_selector_all('tr')
-                    print(f"使用通用选择器找到 {len(rows)} 行数据")
-                
-                for row in rows:
+                for row_values in rows_data:
                     try:
-                        # 提取每一行的数据
-                        cells = await row.query_selector_all('td')
-                        
-                        # 如果这一行没有足够的单元格，可能是表头或空行
-                        if len(cells) < 3:
-                            continue
-                        
-                        # 打印单元格数量以便调试
-                        print(f"行包含 {len(cells)} 个单元格")
-                        
-                        # 提取第一个单元格的文本作为产品名称
-                        product_name = await cells[0].inner_text() if len(cells) > 0 else "N/A"
-                        
-                        # 尝试提取链接
-                        product_link = await cells[0].query_selector('a') if len(cells) > 0 else None
-                        product_url = await product_link.get_attribute('href') if product_link else "N/A"
-                        
-                        # 根据单元格数量灵活提取数据
-                        capacity = await cells[1].inner_text() if len(cells) > 1 else "N/A"
-                        price = await cells[2].inner_text() if len(cells) > 2 else "N/A"
-                        
-                        # 其他字段可能不存在，使用条件提取
-                        price_per_tb = await cells[3].inner_text() if len(cells) > 3 else "N/A"
-                        interface = await cells[4].inner_text() if len(cells) > 4 else "N/A"
-                        form_factor = await cells[5].inner_text() if len(cells) > 5 else "N/A"
-                        seller = await cells[6].inner_text() if len(cells) > 6 else "N/A"
-                        
-                        # 提取更多详细信息
-                        details = {}
-                        try:
-                            # 获取卖家链接
-                            if len(cells) > 6:
-                                seller_link = await cells[6].query_selector('a')
-                                if seller_link:
-                                    details['seller_url'] = await seller_link.get_attribute('href')
-                        
-                            # 获取其他可能的详细信息
-                            details['raw_price'] = price.replace('$', '').strip() if '$' in price else price
-                            if price_per_tb != "N/A":
-                                details['raw_price_per_tb'] = price_per_tb.replace('$', '').strip() if '$' in price_per_tb else price_per_tb
-                        except Exception as e:
-                            print(f"提取详细信息时出错: {e}")
-                        
-                        self.data.append({
-                            'product_name': product_name,
-                            'product_url': product_url,
-                            'capacity': capacity,
-                            'price': price,
-                            'price_per_tb': price_per_tb,
-                            'interface': interface,
-                            'form_factor': form_factor,
-                            'seller': seller,
-                            'details': details,
-                            'date_scraped': datetime.now().strftime('%Y-%m-%d')
-                        })
+                        self.data.append(self._build_record(row_values))
                     except Exception as e:
                         print(f"处理行数据时出错: {e}")
                         continue
                 
                 # 如果成功提取了数据，保存一个中间结果
-                if self.data and page_num == 1:
+                if save_intermediate and self.data and page_num == 1:
                     self.save_to_csv("first_page_data.csv")
                     print("已保存第一页数据到 first_page_data.csv")
                 
@@ -296,11 +530,18 @@ class EnhancedDiskPricesScraper:
                                 has_next_page = False
                                 print("已到达最后一页")
                             else:
+                                # 按主机限速后再请求下一页，模拟人类行为
+                                await self._throttle()
                                 print("点击下一页")
+                                before = await self._table_signature()
                                 # 使用JavaScript点击，更可靠
                                 await self.page.evaluate('(button) => button.click()', next_button)
-                                await self.page.wait_for_timeout(3000)  # 等待新页面加载
-                                page_num += 1
+                                # 等待新页面的表格加载，表格没有变化说明已经没有下一页
+                                if await self._wait_for_table_change(f"第 {page_num + 1} 页", before):
+                                    page_num += 1
+                                else:
+                                    has_next_page = False
+                                    print("点击下一页后表格未变化，停止翻页")
                         else:
                             has_next_page = False
                             print("未找到下一页按钮")
@@ -309,9 +550,16 @@ class EnhancedDiskPricesScraper:
                     has_next_page = False
                     
             print(f"爬取完成，共获取 {len(self.data)} 条数据")
+            if self.wait_stats:
+                total_wait = sum(stat['wait_ms'] for stat in self.wait_stats)
+                print(f"等待步骤 {len(self.wait_stats)} 个，共等待 {total_wait:.0f} ms")
+            if self.block_stats:
+                print(f"已拦截 {self.block_stats['blocked']} 个请求，放行 {self.block_stats['allowed']} 个")
+            if self.cache_stats:
+                print(f"响应缓存命中 {self.cache_stats['hits']} 个请求，未命中 {self.cache_stats['misses']} 个")
             
             # 如果没有数据但已经分析了页面，保存页面内容以便进一步分析
-            if not self.data:
+            if not self.data and self.debug_artifacts:
                 print("未能提取到数据，保存页面内容以便分析...")
                 html_content = await self.page.content()
                 with open("full_page_html.txt", "w", encoding="utf-8") as f:
@@ -319,6 +567,7 @@ class EnhancedDiskPricesScraper:
                 print("已保存完整页面HTML到 full_page_html.txt")
                 
         except Exception as e:
+            self._failed = True
             print(f"爬取过程中出错: {e}")
             # 保存已爬取的数据
             if self.data:
@@ -326,6 +575,8 @@ class EnhancedDiskPricesScraper:
                 self.save_to_csv("partial_data.csv")
             
             # 保存页面截图和HTML以便调试
+            if not self.debug_artifacts:
+                return
             try:
                 await self.page.screenshot(path="error_screenshot.png")
                 print("已保存错误页面截图到 error_screenshot.png")
@@ -405,8 +656,49 @@ class EnhancedDiskPricesScraper:
         except Exception as e:
             print(f"保存JSON时出错: {e}")
     
+    def save_snapshot(self, root=snapshot_store.SNAPSHOT_DIR, fmt='parquet'):
+        """保存带类型的压缩列式快照（按爬取日期分区），返回文件路径，失败时返回 None
+        旧版 CSV/Excel/JSON 可以用 snapshot_store.export_legacy 按需生成
+        """
+        if not self.data:
+            print("没有数据可保存")
+            return None
+        
+        try:
+            return snapshot_store.write_snapshot(self.data, root=root, fmt=fmt)
+        except Exception as e:
+            print(f"保存快照时出错: {e}")
+            return None
+    
+    def save_delta(self, store_path='fingerprints_enhanced.json', delta_path='diskprices_delta.jsonl',
+                   detect_removed=True):
+        """增量保存：与上一次运行的指纹比较，只追加新增、变化和消失的商品
+        detect_removed: 只爬取了部分页面时应设为 False
+        """
+        if not self.data:
+            print("没有数据可保存")
+            return None
+        
+        try:
+            store = FingerprintStore(store_path)
+            delta = store.compute_delta(self.data, detect_removed=detect_removed)
+            append_delta(delta, delta_path)
+            store.commit()
+            return delta
+        except Exception as e:
+            print(f"保存增量数据时出错: {e}")
+            return None
+    
     async def close(self):
-        """关闭浏览器和 Playwright"""
+        """关闭浏览器和 Playwright；使用浏览器池时只归还页面"""
+        if self._lease is not None:
+            self._untrack_requests()
+            await self.pool.release(self._lease, healthy=not self._failed)
+            self._lease = None
+            print("页面已归还浏览器池")
+            return
+        if self.browser is None:
+            return
         try:
             await self.browser.close()
             await self.playwright.stop()
@@ -423,13 +715,24 @@ async def main():
     }
     sort_by = 'price_per_tb'  # 'price' 或 'price_per_tb'
     
-    scraper = EnhancedDiskPricesScraper(filters=filters, sort_by=sort_by)
+    # 通过 DISKPRICES_ENGINE=static 和 DISKPRICES_SOURCE 选择静态解析引擎
+    engine, source = diskprices_static.engine_from_env()
+    # DISKPRICES_DEBUG=1 时保存调试截图和HTML
+    debug_artifacts = os.environ.get('DISKPRICES_DEBUG') == '1'
+    # DISKPRICES_CACHE=1 时页面缓存到磁盘，重复运行不再请求网络
+    scraper = EnhancedDiskPricesScraper(filters=filters, sort_by=sort_by, engine=engine, source=source,
+                                        debug_artifacts=debug_artifacts, cache=cache_from_env())
     try:
         await scraper.initialize()
         await scraper.scrape(max_pages=3)  # 限制爬取前3页
-        scraper.save_to_csv()
-        scraper.save_to_excel()
-        scraper.save_to_json()
+        # DISKPRICES_INCREMENTAL=1 时只追加与上次运行相比的增量
+        if os.environ.get('DISKPRICES_INCREMENTAL') == '1':
+            scraper.save_delta(detect_removed=False)
+        elif not scraper.save_snapshot():
+            # 没有安装 pyarrow 等原因无法保存快照时，退回到旧版格式
+            scraper.save_to_csv()
+            scraper.save_to_excel()
+            scraper.save_to_json()
     except Exception as e:
         print(f"主程序出错: {e}")
     finally:
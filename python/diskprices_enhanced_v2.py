@@ -3,18 +3,167 @@ from playwright.async_api import async_playwright
 import pandas as pd
 from datetime import datetime
 import json
+import diskprices_static
+import os
+from resource_blocking import apply_blocking_profile
+from response_cache import apply_response_cache, cache_from_env
+from fingerprint_store import FingerprintStore, append_delta
+import analytics_cube
+import snapshot_store
 
-async def scrape_diskprices_enhanced():
-    """增强版本的 diskprices.com 爬虫，专门解析 class="disk" 的内容"""
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
-    page = await browser.new_page()
+# 根据列的位置存储数据
+COLUMN_PREFIXES = {
+    0: 'product',
+    1: 'capacity',
+    2: 'price',
+    3: 'price_per_tb',
+    4: 'interface',
+    5: 'form_factor',
+    6: 'seller',
+    7: 'rating'
+}
+COLUMN_COUNT = 8  # 假设最多8列
+COLUMN_FIELDS = ['text', 'html', 'link_text', 'link_url']
+
+# 简化数据的列名与快照/API 使用的英文列名
+SIMPLE_COLUMN_MAPPING = {
+    '产品名称': 'product_name',
+    '容量': 'capacity',
+    '价格': 'price',
+    '每TB价格': 'price_per_tb',
+    '接口': 'interface',
+    '硬盘形态': 'form_factor',
+    '卖家': 'seller',
+    '评分': 'rating',
+    '产品链接': 'product_url',
+    '卖家链接': 'seller_url',
+    '爬取时间': 'date_scraped'
+}
+
+# 增量保存时用于识别商品和计算指纹的列
+DELTA_FIELDS = {'url': 'product_link_url', 'price': 'price_text', 'seller': 'seller_text', 'name': 'product_text'}
+
+# 在页面内把 tr.disk 行序列化为扁平数组：每列依次为 text/html/link_text/link_url
+COLLECT_DISK_ROWS_SCRIPT = '''
+    ({start, count, columns}) => {
+        const rows = Array.from(document.querySelectorAll('tr.disk')).slice(start, start + count);
+        return rows.map(row => {
+            const cells = row.querySelectorAll('td');
+            const values = [];
+            for (let i = 0; i < columns; i++) {
+                const cell = cells[i];
+                if (!cell) {
+                    values.push(null, null, null, null);
+                    continue;
+                }
+                const link = cell.querySelector('a');
+                values.push(
+                    cell.innerText,
+                    cell.innerHTML,
+                    link ? link.innerText : null,
+                    link ? link.getAttribute('href') : null
+                );
+            }
+            return values;
+        });
+    }
+'''
+
+def column_prefix(index):
+    """根据列的位置返回列前缀"""
+    return COLUMN_PREFIXES.get(index, f'column_{index}')
+
+def build_column_order():
+    """详细数据的列顺序：每列的 text/html/link_text/link_url，最后是爬取时间"""
+    column_order = []
+    for i in range(COLUMN_COUNT):
+        prefix = column_prefix(i)
+        column_order.extend(f'{prefix}_{field}' for field in COLUMN_FIELDS)
+    
+    # 添加时间戳列
+    column_order.append('date_scraped')
+    return column_order
+
+async def collect_disk_rows(page, chunk_size=None):
+    """一次 evaluate 序列化所有 tr.disk 行，返回按 column_order 排列的行列表
+    chunk_size: 每次 evaluate 返回的最大行数，用于限制单条消息大小；None 表示一次取完
+    """
+    total = await page.evaluate("() => document.querySelectorAll('tr.disk').length")
+    chunk_size = chunk_size or max(total, 1)
+    date_scraped = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    data = []
+    for start in range(0, total, chunk_size):
+        rows = await page.evaluate(
+            COLLECT_DISK_ROWS_SCRIPT,
+            {'start': start, 'count': chunk_size, 'columns': COLUMN_COUNT}
+        )
+        data.extend(row + [date_scraped] for row in rows)
+    return data
+
+async def collect_disk_rows_per_element(page):
+    """逐个单元格提取 tr.disk 行（回退路径），返回与 collect_disk_rows 相同的结构"""
+    rows = await page.query_selector_all('tr.disk')
+    
+    data = []
+    for row in rows:
+        try:
+            # 获取该行的所有td内容
+            cells = await row.query_selector_all('td')
+            values = []
+            
+            # 解析每个td的内容
+            for i in range(COLUMN_COUNT):
+                if i >= len(cells):
+                    values.extend([None] * len(COLUMN_FIELDS))
+                    continue
+                cell = cells[i]
+                # 获取td的文本内容
+                text_content = await cell.inner_text()
+                # 获取td的HTML内容
+                html_content = await cell.inner_html()
+                # 获取td中的链接
+                link = await cell.query_selector('a')
+                link_text = await link.inner_text() if link else None
+                link_href = await link.get_attribute('href') if link else None
+                values.extend([text_content, html_content, link_text, link_href])
+            
+            values.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            data.append(values)
+                
+        except Exception as e:
+            print(f"处理行数据时出错: {e}")
+            continue
+    return data
+
+async def scrape_rows_with_browser(chunk_size=None, pool=None, block_profile='default', debug_artifacts=False,
+                                  cache=None, url=diskprices_static.DISKPRICES_URL):
+    """使用 Playwright 打开页面并提取所有 tr.disk 行
+    pool: 可选的 BrowserPool，提供时借用池中预热的页面，而不是启动新的浏览器
+    block_profile: 资源拦截配置，使用浏览器池时由池的配置决定
+    debug_artifacts: 出错时是否保存截图
+    cache: 可选的 response_cache.ResponseCache，使用浏览器池时由池的配置决定
+    url: 页面地址，默认 diskprices.com（基准测试时指向本地服务器）
+    """
+    if pool is not None:
+        lease = await pool.acquire()
+        page = lease.page
+    else:
+        playwright = await async_playwright().start()
+        browser = await playwright.chromium.launch(headless=False)
+        page = await browser.new_page()
+        # 响应缓存需要先注册，被拦截的请求不会到达缓存
+        await apply_response_cache(page, cache)
+        # 拦截图片、字体、广告和统计脚本
+        await apply_blocking_profile(page, block_profile)
     
     data = []
+    # 出错的页面可能停在错误页或已崩溃，归还浏览器池时要求重建
+    healthy = True
     
     try:
         print("正在访问网站...")
-        await page.goto("https://diskprices.com/", timeout=60000)
+        await page.goto(url, timeout=60000)
         print("页面已加载")
         
         # 等待页面完全加载
@@ -29,170 +178,179 @@ async def scrape_diskprices_enhanced():
         ''')
         print(f"表格列标题: {headers}")
         
-        # 专门获取 class="disk" 的行
-        rows = await page.query_selector_all('tr.disk')
-        print(f"找到 {len(rows)} 个硬盘数据")
+        # 专门获取 class="disk" 的行，在页面内批量序列化，失败时回退到逐元素提取
+        try:
+            data = await collect_disk_rows(page, chunk_size=chunk_size)
+        except Exception as e:
+            print(f"批量提取失败，回退到逐元素提取: {e}")
+            data = await collect_disk_rows_per_element(page)
+        print(f"找到 {len(data)} 个硬盘数据")
+    
+    except Exception as e:
+        healthy = False
+        print(f"爬取过程中出错: {e}")
+        if debug_artifacts:
+            await page.screenshot(path="error_screenshot.png")
         
-        for row in rows:
-            try:
-                # 获取该行的所有td内容
-                cells = await row.query_selector_all('td')
-                
-                disk_data = {
-                    'date_scraped': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                # 解析每个td的内容
-                for i, cell in enumerate(cells):
-                    # 获取td的文本内容
-                    text_content = await cell.inner_text()
-                    # 获取td的HTML内容
-                    html_content = await cell.inner_html()
-                    # 获取td中的链接
-                    link = await cell.query_selector('a')
-                    link_text = await link.inner_text() if link else None
-                    link_href = await link.get_attribute('href') if link else None
-                    
-                    # 根据列的位置存储数据
-                    column_prefix = {
-                        0: 'product',
-                        1: 'capacity',
-                        2: 'price',
-                        3: 'price_per_tb',
-                        4: 'interface',
-                        5: 'form_factor',
-                        6: 'seller',
-                        7: 'rating'
-                    }.get(i, f'column_{i}')
-                    
-                    # 存储该列的所有信息
-                    disk_data.update({
-                        f'{column_prefix}_text': text_content,
-                        f'{column_prefix}_html': html_content,
-                        f'{column_prefix}_link_text': link_text,
-                        f'{column_prefix}_link_url': link_href
-                    })
-                
-                data.append(disk_data)
-                    
-            except Exception as e:
-                print(f"处理行数据时出错: {e}")
-                continue
+    finally:
+        if pool is not None:
+            await pool.release(lease, healthy=healthy)
+        else:
+            await browser.close()
+            await playwright.stop()
+            print("浏览器已关闭")
+    
+    return data
+
+def save_detailed_data(data):
+    """保存详细数据、简化数据和数据分析到Excel，并打印简单的数据分析报告"""
+    if not data:
+        print("没有数据可保存")
+        return
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # 保存为Excel，包含所有td的内容
+    excel_filename = f"diskprices_detailed_{timestamp}.xlsx"
+    
+    # 行数据已按 column_order 排列，直接构建 DataFrame
+    df = pd.DataFrame(data, columns=build_column_order())
+    
+    # 创建一个Excel writer对象
+    with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
+        # 保存详细数据到第一个sheet
+        df.to_excel(writer, sheet_name='详细数据', index=False)
         
-        # 保存数据到不同格式
-        if data:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            
-            # 保存为Excel，包含所有td的内容
-            excel_filename = f"diskprices_detailed_{timestamp}.xlsx"
-            
-            # 创建DataFrame，确保包含所有列
-            df = pd.DataFrame(data)
-            
-            # 重新组织列的顺序
-            column_order = []
-            for i in range(8):  # 假设最多8列
-                prefix = {
-                    0: 'product',
-                    1: 'capacity',
-                    2: 'price',
-                    3: 'price_per_tb',
-                    4: 'interface',
-                    5: 'form_factor',
-                    6: 'seller',
-                    7: 'rating'
-                }.get(i, f'column_{i}')
-                
-                column_order.extend([
-                    f'{prefix}_text',
-                    f'{prefix}_html',
-                    f'{prefix}_link_text',
-                    f'{prefix}_link_url'
-                ])
-            
-            # 添加时间戳列
-            column_order.append('date_scraped')
+        # 创建一个简化版本的sheet
+        simple_data = pd.DataFrame({
+            '产品名称': df['product_text'],
+            '容量': df['capacity_text'],
+            '价格': df['price_text'],
+            '每TB价格': df['price_per_tb_text'],
+            '接口': df['interface_text'],
+            '硬盘形态': df['form_factor_text'],
+            '卖家': df['seller_text'],
+            '评分': df.get('rating_text', None),
+            '产品链接': df['product_link_url'],
+            '卖家链接': df['seller_link_url'],
+            '爬取时间': df['date_scraped']
+        })
+        simple_data.to_excel(writer, sheet_name='简化数据', index=False)
+        
+        # 创建数据分析sheet - 修改这部分代码
+        analysis_sheet_name = '数据分析'
+        
+        # 首先创建一个空的DataFrame来初始化数据分析sheet
+        pd.DataFrame().to_excel(writer, sheet_name=analysis_sheet_name)
+        
+        # 准备数据分析内容：各维度的分布都取自同一次计算的汇总
+        cube = analytics_cube.build_cube(simple_data.rename(columns=SIMPLE_COLUMN_MAPPING))
+        distributions = {
+            dim: analytics_cube.rollup(cube, [dim]).set_index(dim)['count']
+            for dim in ('seller', 'interface', 'form_factor', 'capacity_bucket')
+        }
+        analysis_data = {
+            '卖家分布': distributions['seller'],
+            '接口类型分布': distributions['interface'],
+            '硬盘形态分布': distributions['form_factor'],
+            '容量分布': distributions['capacity_bucket']
+        }
+        
+        # 获取工作表
+        worksheet = writer.sheets[analysis_sheet_name]
+        
+        # 写入分析数据
+        current_row = 1
+        for title, data_series in analysis_data.items():
+            # 写入标题
+            worksheet.cell(row=current_row, column=1, value=title)
+            current_row += 1
             
-            # 重新排序列并保存
-            df = df.reindex(columns=column_order)
+            # 写入数据
+            for index, value in data_series.items():
+                worksheet.cell(row=current_row, column=1, value=index)
+                worksheet.cell(row=current_row, column=2, value=value)
+                current_row += 1
             
-            # 创建一个Excel writer对象
-            with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-                # 保存详细数据到第一个sheet
-                df.to_excel(writer, sheet_name='详细数据', index=False)
-                
-                # 创建一个简化版本的sheet
-                simple_data = pd.DataFrame({
-                    '产品名称': df['product_text'],
-                    '容量': df['capacity_text'],
-                    '价格': df['price_text'],
-                    '每TB价格': df['price_per_tb_text'],
-                    '接口': df['interface_text'],
-                    '硬盘形态': df['form_factor_text'],
-                    '卖家': df['seller_text'],
-                    '评分': df.get('rating_text', None),
-                    '产品链接': df['product_link_url'],
-                    '卖家链接': df['seller_link_url'],
-                    '爬取时间': df['date_scraped']
-                })
-                simple_data.to_excel(writer, sheet_name='简化数据', index=False)
-                
-                # 创建数据分析sheet - 修改这部分代码
-                analysis_sheet_name = '数据分析'
-                
-                # 首先创建一个空的DataFrame来初始化数据分析sheet
-                pd.DataFrame().to_excel(writer, sheet_name=analysis_sheet_name)
-                
-                # 准备数据分析内容
-                analysis_data = {
-                    '卖家分布': df['seller_text'].value_counts(),
-                    '接口类型分布': df['interface_text'].value_counts(),
-                    '硬盘形态分布': df['form_factor_text'].value_counts(),
-                    '容量分布': df['capacity_text'].value_counts()
-                }
-                
-                # 获取工作表
-                worksheet = writer.sheets[analysis_sheet_name]
-                
-                # 写入分析数据
-                current_row = 1
-                for title, data_series in analysis_data.items():
-                    # 写入标题
-                    worksheet.cell(row=current_row, column=1, value=title)
-                    current_row += 1
-                    
-                    # 写入数据
-                    for index, value in data_series.items():
-                        worksheet.cell(row=current_row, column=1, value=index)
-                        worksheet.cell(row=current_row, column=2, value=value)
-                        current_row += 1
-                    
-                    # 添加空行
-                    current_row += 2
+            # 添加空行
+            current_row += 2
 
-            print(f"已保存详细数据到 {excel_filename}")
-            
-            # 打印简单的数据分析报告
-            print("\n数据分析报告:")
-            print(f"总商品数量: {len(data)}")
-            
-            print("\n卖家分布 (前5名):")
-            print(df['seller_text'].value_counts().head())
-            
-            print("\n接口类型分布:")
-            print(df['interface_text'].value_counts())
-            
-            print("\n硬盘形态分布:")
-            print(df['form_factor_text'].value_counts())
-            
+    print(f"已保存详细数据到 {excel_filename}")
+    
+    # 同时保存简化数据的列式快照，供 API 和分析脚本按列读取
+    try:
+        snapshot_store.write_snapshot(simple_data.rename(columns=SIMPLE_COLUMN_MAPPING))
     except Exception as e:
-        print(f"爬取过程中出错: {e}")
-        await page.screenshot(path="error_screenshot.png")
-        
-    finally:
-        await browser.close()
-        await playwright.stop()
-        print("浏览器已关闭")
+        print(f"保存快照时出错: {e}")
+    
+    # 打印简单的数据分析报告
+    print("\n数据分析报告:")
+    print(f"总商品数量: {len(data)}")
+    
+    print("\n卖家分布 (前5名):")
+    print(distributions['seller'].head())
+    
+    print("\n接口类型分布:")
+    print(distributions['interface'])
+    
+    print("\n硬盘形态分布:")
+    print(distributions['form_factor'])
+
+def save_detailed_delta(data, store_path='fingerprints_detailed.json', delta_path='diskprices_detailed_delta.jsonl'):
+    """增量保存：只追加与上一次运行相比新增、变化和消失的 tr.disk 行"""
+    if not data:
+        print("没有数据可保存")
+        return None
+    
+    column_order = build_column_order()
+    records = [dict(zip(column_order, row)) for row in data]
+    store = FingerprintStore(store_path, fields=DELTA_FIELDS)
+    delta = store.compute_delta(records)
+    append_delta(delta, delta_path)
+    store.commit()
+    return delta
+
+async def scrape_diskprices_enhanced(chunk_size=None, engine='browser', source=None, pool=None,
+                                     block_profile='default', debug_artifacts=False, incremental=False, cache=None,
+                                     url=diskprices_static.DISKPRICES_URL):
+    """增强版本的 diskprices.com 爬虫，专门解析 class="disk" 的内容
+    chunk_size: 批量提取时每次 evaluate 返回的最大行数
+    engine: 'browser' 使用 Playwright；'static' 直接请求/读取 HTML 并解析，不启动浏览器
+    source: static 引擎的数据源，URL 或本地保存的页面文件
+    pool: 可选的 BrowserPool，用于在多次任务之间复用浏览器
+    block_profile: 资源拦截配置（'none'/'default'/'strict' 或自定义字典）
+    debug_artifacts: 是否保存调试截图
+    incremental: 为 True 时只追加增量（见 save_detailed_delta），不再重写完整的Excel
+    cache: 可选的 response_cache.ResponseCache，页面命中缓存时不再请求网络
+    url: browser 引擎访问的页面地址
+    """
+    if engine == 'static':
+        try:
+            data = diskprices_static.to_detailed_rows(diskprices_static.parse_rows(source, cache=cache), COLUMN_COUNT)
+            print(f"找到 {len(data)} 个硬盘数据")
+        except Exception as e:
+            print(f"静态解析过程中出错: {e}")
+            data = []
+    else:
+        data = await scrape_rows_with_browser(chunk_size=chunk_size, pool=pool, block_profile=block_profile,
+                                              debug_artifacts=debug_artifacts, cache=cache, url=url)
+    
+    try:
+        if incremental:
+            save_detailed_delta(data)
+        else:
+            save_detailed_data(data)
+    except Exception as e:
+        print(f"保存数据时出错: {e}")
+    return data
 
 if __name__ == "__main__":
-    asyncio.run(scrape_diskprices_enhanced()) 
\ No newline at end of file
+    # 通过 DISKPRICES_ENGINE=static 和 DISKPRICES_SOURCE 选择静态解析引擎
+    engine, source = diskprices_static.engine_from_env()
+    # DISKPRICES_DEBUG=1 时保存调试截图
+    debug_artifacts = os.environ.get('DISKPRICES_DEBUG') == '1'
+    # DISKPRICES_INCREMENTAL=1 时只追加与上次运行相比的增量
+    incremental = os.environ.get('DISKPRICES_INCREMENTAL') == '1'
+    # DISKPRICES_CACHE=1 时页面缓存到磁盘，重复运行不再请求网络
+    asyncio.run(scrape_diskprices_enhanced(engine=engine, source=source, debug_artifacts=debug_artifacts,
+                                           incremental=incremental, cache=cache_from_env())) 
\ No newline at end of file
@@ -1,106 +1,231 @@
 try:
-    boto3
+    import boto3
     from botocore.config import Config
     import pandas as pd
     import time
     import os
     from datetime import datetime
     import json
+    import argparse
     import random
+    import threading
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     from amazon.paapi import AmazonAPI
+    import normalize
+    from asin_registry import AsinRegistry
+    from item_attributes import ItemAttributes, extract_attributes, item_texts
+    import snapshot_store
+    from rate_limit import DailyQuotaExceeded, TokenBucket
+    from response_cache import cache_from_env, cache_key
 except ImportError as e:
     print(f"缺少必要的依赖包: {e}")
     print("请运行: pip install python-amazon-paapi pandas openpyxl boto3")
     exit(1)
 
+# 默认的搜索关键词，可以用关键词文件（每行一个）替换
+DEFAULT_SEARCH_TERMS = [
+    'internal hard drive',
+    'external hard drive',
+    'SSD',
+    'NVMe SSD',
+    'SATA SSD'
+]
+SEARCH_RESOURCES = [
+    'ItemInfo.Title',
+    'Offers.Listings.Price',
+    'ItemInfo.Features',
+    'ItemInfo.TechnicalInfo',
+    'ItemInfo.Classifications'
+]
+# 价格刷新只请求价格，减少响应大小
+REFRESH_RESOURCES = ['Offers.Listings.Price']
+# GetItems 每次最多查询10个 ASIN
+GET_ITEMS_BATCH_SIZE = 10
+# PA-API 每页最多返回10个商品，最多翻10页
+ITEMS_PER_PAGE = 10
+MAX_ITEM_PAGE = 10
+# PA-API 的默认配额：每秒1个请求，每天8640个请求
+DEFAULT_TPS = 1.0
+DEFAULT_TPD = 8640
+
+def load_search_terms(path):
+    """从文件读取搜索关键词，每行一个，忽略空行和 # 开头的注释"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def is_throttling_error(error):
+    """判断是否是 PA-API 的限流错误（TooManyRequests / HTTP 429）"""
+    text = f"{type(error).__name__} {error}".lower()
+    return 'toomanyrequests' in text or 'too many requests' in text or 'throttl' in text or '429' in text
+
 class AmazonDiskPricesScraper:
-    def __init__(self, access_key, secret_key, partner_tag, country='US'):
+    def __init__(self, access_key, secret_key, partner_tag, country='US', search_terms=None, max_pages=1,
+                 workers=4, tps=DEFAULT_TPS, tpd=DEFAULT_TPD, max_retries=5, backoff=1.0,
+                 registry_path='data/asin_registry.json', cache=None):
         """
         初始化Amazon API客户端
         access_key: Amazon Access Key
         secret_key: Amazon Secret Key
         partner_tag: Amazon Associates Partner Tag
         country: 国家/地区代码
+        search_terms: 搜索关键词列表，默认 DEFAULT_SEARCH_TERMS
+        max_pages: 每个关键词最多翻几页（每页10个商品，最多10页）
+        workers: 并发搜索的线程数
+        tps / tpd: 账号的每秒/每日请求配额，所有线程共享
+        max_retries / backoff: 限流时的重试次数和初始退避时间（秒），每次重试加倍
+        registry_path: 已知 ASIN 登记表，搜索结果登记后可以用 refresh_prices 只刷新价格
+        cache: 可选的 response_cache.ResponseCache，相同请求在有效期内直接使用缓存的响应，不占用配额
         """
-        self.amazon = AmazonAPI(access_key, secret_key, partner_tag, country)
+        # 请求间隔由 self.bucket 统一控制，关闭客户端自带的串行等待
+        self.amazon = AmazonAPI(access_key, secret_key, partner_tag, country, throttling=0)
+        self.search_terms = list(search_terms or DEFAULT_SEARCH_TERMS)
+        self.max_pages = max(1, min(max_pages, MAX_ITEM_PAGE))
+        self.workers = workers
+        self.bucket = TokenBucket(rate=tps, capacity=max(1, int(tps)), daily_limit=tpd)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.registry = AsinRegistry(registry_path)
+        self.country = country
+        self.cache = cache
         self.data = []
+        self._seen_asins = set()
+        self._data_lock = threading.Lock()
         
-    def search_disks(self):
-        """搜索硬盘产品"""
-        try:
-            # 搜索条件
-            search_terms = [
-                'internal hard drive',
-                'external hard drive',
-                'SSD',
-                'NVMe SSD',
-                'SATA SSD'
-            ]
-            
-            for term in search_terms:
-                print(f"搜索: {term}")
+    def _call_api(self, method, use_cache=True, **kwargs):
+        """按令牌桶配额调用 API，遇到限流错误时指数退避后重试
+        use_cache: 启用缓存时是否先查找缓存并保存响应；价格刷新必须请求最新价格，不使用缓存
+        """
+        key = None
+        if self.cache is not None and use_cache:
+            key = cache_key('paapi', self.country, method.__name__, kwargs)
+            try:
+                cached = self.cache.get_object(key)
+            except Exception as e:
+                print(f"读取响应缓存出错: {e}")
+                cached = None
+            if cached is not None:
+                return cached
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = method(**kwargs)
+                if key is not None and response is not None:
+                    try:
+                        self.cache.put_object(key, response)
+                    except Exception as e:
+                        print(f"写入响应缓存出错: {e}")
+                return response
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                print(f"请求被限流，{delay:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+    
+    def _search_term(self, term):
+        """搜索一个关键词的所有页，返回解析出的记录
+
+        某一页出错时返回前面各页的记录；配额用完（DailyQuotaExceeded）时先把已获取的记录
+        交给 _add_records，再抛出异常让调用方停止剩余的搜索。
+        """
+        records = []
+        for page in range(1, self.max_pages + 1):
+            try:
+                response = self._call_api(
+                    self.amazon.search_items,
+                    keywords=term,
+                    search_index='Electronics',
+                    item_count=ITEMS_PER_PAGE,
+                    item_page=page,
+                    resources=SEARCH_RESOURCES
+                )
+            except DailyQuotaExceeded:
+                # 前面几页已经消耗了配额，先保存已获取的记录再停止
+                added = self._add_records(records)
+                print(f"搜索: {term} 第 {page} 页时配额用完，保留前 {page - 1} 页的 {added} 个商品")
+                raise
+            except Exception as e:
+                print(f"搜索: {term} 第 {page} 页出错: {e}，保留前 {page - 1} 页的结果")
+                break
+            items = response.items if response and response.items else []
+            for item in items:
                 try:
-                    # 使用Amazon API搜索产品
-                    response = self.amazon.search_items(
-                        keywords=term,
-                        search_index='Electronics',
-                        item_count=10,  # 每个类别获取10个商品
-                        resources=[
-                            'ItemInfo.Title',
-                            'Offers.Listings.Price',
-                            'ItemInfo.Features',
-                            'ItemInfo.TechnicalInfo',
-                            'ItemInfo.Classifications'
-                        ]
-                    )
-                    
-                    # 处理搜索结果
-                    if response.items:
-                        for item in response.items:
-                            try:
-                                # 提取容量信息
-                                capacity = self._extract_capacity(item)
-                                if not capacity:
-                                    continue
-                                
-                                # 提取接口类型
-                                interface = self._extract_interface(item)
-                                
-                                # 提取价格
-                                price = self._extract_price(item)
-                                if not price:
-                                    continue
-                                
-                                # 计算每TB价格
-                                price_per_tb = self._calculate_price_per_tb(price, capacity)
-                                
-                                # 提取硬盘形态
-                                form_factor = self._extract_form_factor(item)
-                                
-                                self.data.append({
-                                    'product_name': item.item_info.title.display_value,
-                                    'product_url': item.detail_page_url,
-                                    'capacity': f"{capacity}TB",
-                                    'price': f"${price:.2f}",
-                                    'price_per_tb': f"${price_per_tb:.2f}/TB",
-                                    'interface': interface,
-                                    'form_factor': form_factor,
-                                    'seller': 'Amazon',
-                                    'date_scraped': datetime.now().strftime('%Y-%m-%d')
-                                })
-                                
-                            except Exception as e:
-                                print(f"处理商品时出错: {e}")
-                                continue
-                    
-                    # 避免请求过快
-                    time.sleep(random.uniform(1, 2))
-                    
+                    record = self._build_record(item)
+                    if record:
+                        records.append(record)
                 except Exception as e:
-                    print(f"搜索 {term} 时出错: {e}")
+                    print(f"处理商品时出错: {e}")
+            # 不足一页说明已经没有更多结果
+            if len(items) < ITEMS_PER_PAGE:
+                break
+        return records
+    
+    def _build_record(self, item):
+        """把一个商品转换为记录，缺少容量或价格时返回 None"""
+        # 提取容量、接口类型和硬盘形态
+        capacity, interface, form_factor = self._extract_attributes(item)
+        if not capacity:
+            return None
+        
+        # 提取价格
+        price = self._extract_price(item)
+        if not price:
+            return None
+        
+        # 计算每TB价格
+        price_per_tb = self._calculate_price_per_tb(price, capacity)
+        
+        return {
+            'asin': item.asin,
+            'product_name': item.item_info.title.display_value,
+            'product_url': item.detail_page_url,
+            'capacity': f"{capacity}TB",
+            'price': f"${price:.2f}",
+            'price_per_tb': f"${price_per_tb:.2f}/TB",
+            'interface': interface,
+            'form_factor': form_factor,
+            'seller': 'Amazon',
+            'date_scraped': datetime.now().strftime('%Y-%m-%d')
+        }
+    
+    def _add_records(self, records):
+        """合并记录，不同关键词搜到的同一商品（ASIN）只保留一次"""
+        added = 0
+        with self._data_lock:
+            for record in records:
+                if record['asin'] in self._seen_asins:
                     continue
-                
-            print(f"搜索完成，共获取 {len(self.data)} 条数据")
+                self._seen_asins.add(record['asin'])
+                self.data.append(record)
+                added += 1
+        return added
+    
+    def search_disks(self):
+        """在线程池中并发搜索所有关键词，请求速率由共享的令牌桶控制"""
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self._search_term, term): term for term in self.search_terms}
+                for future in as_completed(futures):
+                    term = futures[future]
+                    try:
+                        added = self._add_records(future.result())
+                        print(f"搜索: {term}，新增 {added} 个商品")
+                    except DailyQuotaExceeded as e:
+                        # 配额用完后取消还没开始的关键词
+                        print(f"搜索 {term} 时出错: {e}，停止剩余的搜索")
+                        for pending in futures:
+                            pending.cancel()
+                    except Exception as e:
+                        print(f"搜索 {term} 时出错: {e}")
+            
+            elapsed = time.perf_counter() - start
+            print(f"搜索完成，共获取 {len(self.data)} 条数据，{len(self.search_terms)} 个关键词，"
+                  f"今日已用 {self.bucket.used_today} 次请求，耗时 {elapsed:.1f} 秒")
+            
+            added = self.registry.update(self.data)
+            self.registry.save()
+            print(f"ASIN 登记表新增 {added} 个，共 {len(self.registry)} 个")
             
         except Exception as e:
             print(f"搜索过程中出错: {e}")
@@ -108,53 +233,80 @@ class AmazonDiskPricesScraper:
                 print("保存已获取的部分数据...")
                 self.save_data()
                 
-    def _extract_capacity(self, item):
-        """从商品信息中提取容量（TB）"""
-        try:
-            # 从标题和特征中提取容量信息
-            title = item.item_info.title.display_value.lower()
-            features = [f.lower() for f in item.item_info.features.display_values] if item.item_info.features else []
-            
-            # 常见容量单位转换
-            conversions = {
-                'tb': 1,
-                'gb': 0.001,
-                'mb': 0.000001
-            }
-            
-            # 在标题和特征中查找容量信息
-            for text in [title] + features:
-                for unit, factor in conversions.items():
-                    if unit in text:
-                        # 使用正则表达式提取数字
-                        import re
-                        numbers = re.findall(r'(\d+(?:\.\d+)?)\s*' + unit, text)
-                        if numbers:
-                            return float(numbers[0]) * factor
-            
-            return None
-        except Exception:
+    def _refresh_batch(self, asins):
+        """用一次 GetItems 请求查询最多10个 ASIN 的价格，返回 {asin: 价格}"""
+        # 刷新得到的价格以当前时间记入历史价格，缓存中的旧价格会被当成新的观测值
+        response = self._call_api(self.amazon.get_items, use_cache=False, item_ids=asins,
+                                  resources=REFRESH_RESOURCES)
+        # 不同版本的客户端返回商品列表或带 items 属性的响应
+        items = getattr(response, 'items', response) or []
+        prices = {}
+        for item in items:
+            price = self._extract_price(item)
+            if price:
+                prices[item.asin] = price
+        return prices
+    
+    def _refreshed_record(self, asin, price):
+        """用登记表中的商品信息和新价格重建记录"""
+        entry = self.registry.get(asin)
+        capacity = normalize.capacity_tb(entry.get('capacity'))
+        if pd.isna(capacity) or capacity <= 0:
             return None
-            
-    def _extract_interface(self, item):
-        """从商品信息中提取接口类型"""
+        return {
+            'asin': asin,
+            'product_name': entry.get('product_name'),
+            'product_url': entry.get('product_url'),
+            'capacity': entry.get('capacity'),
+            'price': f"${price:.2f}",
+            'price_per_tb': f"${self._calculate_price_per_tb(price, capacity):.2f}/TB",
+            'interface': entry.get('interface', 'Unknown'),
+            'form_factor': entry.get('form_factor', 'Unknown'),
+            'seller': entry.get('seller', 'Amazon'),
+            'date_scraped': datetime.now().strftime('%Y-%m-%d')
+        }
+    
+    def refresh_prices(self):
+        """价格刷新模式：不搜索，只用 GetItems 按每批10个 ASIN 重新查询登记表中商品的价格"""
+        asins = self.registry.asins()
+        if not asins:
+            print("ASIN 登记表为空，请先运行搜索")
+            return
+        
+        start = time.perf_counter()
+        batches = [asins[i:i + GET_ITEMS_BATCH_SIZE] for i in range(0, len(asins), GET_ITEMS_BATCH_SIZE)]
+        missing = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._refresh_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    prices = future.result()
+                except DailyQuotaExceeded as e:
+                    print(f"刷新价格时出错: {e}，停止剩余的刷新")
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                except Exception as e:
+                    print(f"刷新价格时出错: {e}")
+                    continue
+                missing.extend(asin for asin in batch if asin not in prices)
+                records = [self._refreshed_record(asin, price) for asin, price in prices.items()]
+                self._add_records([record for record in records if record])
+        
+        self.registry.update(self.data)
+        removed = self.registry.mark_missing(missing)
+        self.registry.save()
+        elapsed = time.perf_counter() - start
+        print(f"价格刷新完成: {len(self.data)}/{len(asins)} 个 ASIN，{len(batches)} 次请求，"
+              f"{len(missing)} 个没有价格（删除 {removed} 个），耗时 {elapsed:.1f} 秒")
+    
+    def _extract_attributes(self, item):
+        """一次扫描标题和特征，提取容量（TB）、接口类型和硬盘形态"""
         try:
-            # 从标题和特征中提取接口信息
-            title = item.item_info.title.display_value.lower()
-            features = [f.lower() for f in item.item_info.features.display_values] if item.item_info.features else []
-            
-            # 常见接口类型
-            interfaces = ['sata', 'nvme', 'usb', 'thunderbolt', 'pcie']
-            
-            # 在标题和特征中查找接口信息
-            for text in [title] + features:
-                for interface in interfaces:
-                    if interface in text:
-                        return interface.upper()
-            
-            return 'Unknown'
+            return extract_attributes(item_texts(item))
         except Exception:
-            return 'Unknown'
+            return ItemAttributes(None, 'Unknown', 'Unknown')
             
     def _extract_price(self, item):
         """提取商品价格"""
@@ -172,33 +324,8 @@ class AmazonDiskPricesScraper:
         except Exception:
             return 0
             
-    def _extract_form_factor(self, item):
-        """从商品信息中提取硬盘形态"""
-        try:
-            # 从标题和特征中提取形态信息
-            title = item.item_info.title.display_value.lower()
-            features = [f.lower() for f in item.item_info.features.display_values] if item.item_info.features else []
-            
-            # 常见硬盘形态
-            form_factors = {
-                '2.5': '2.5"',
-                '3.5': '3.5"',
-                'm.2': 'M.2',
-                'external': 'External'
-            }
-            
-            # 在标题和特征中查找形态信息
-            for text in [title] + features:
-                for key, value in form_factors.items():
-                    if key in text:
-                        return value
-            
-            return 'Unknown'
-        except Exception:
-            return 'Unknown'
-        
-    def save_data(self):
-        """保存数据到各种格式"""
+    def save_data(self, formats=()):
+        """保存数据：写入列式快照 data/snapshots，formats 中列出的旧版格式（csv/xlsx/json）按需生成"""
         if not self.data:
             print("没有数据可保存")
             return
@@ -208,23 +335,35 @@ class AmazonDiskPricesScraper:
         # 创建data目录
         os.makedirs('data', exist_ok=True)
         
+        formats = set(formats)
+        try:
+            snapshot_store.write_snapshot(self.data, root='data/snapshots', prefix='amazon_data')
+        except Exception as e:
+            # 无法写入快照（例如没有安装 pyarrow）时退回到旧版格式
+            print(f"保存快照时出错，改为保存旧版格式: {e}")
+            formats |= {'csv', 'xlsx', 'json'}
+        
         try:
-            # 保存为CSV
-            csv_file = f"data/diskprices_{timestamp}.csv"
             df = pd.DataFrame(self.data)
-            df.to_csv(csv_file, index=False, encoding='utf-8')
-            print(f"数据已保存到CSV: {csv_file}")
+            
+            # 保存为CSV
+            if 'csv' in formats:
+                csv_file = f"data/diskprices_{timestamp}.csv"
+                df.to_csv(csv_file, index=False, encoding='utf-8')
+                print(f"数据已保存到CSV: {csv_file}")
             
             # 保存为Excel
-            excel_file = f"data/diskprices_{timestamp}.xlsx"
-            df.to_excel(excel_file, index=False)
-            print(f"数据已保存到Excel: {excel_file}")
+            if 'xlsx' in formats:
+                excel_file = f"data/diskprices_{timestamp}.xlsx"
+                df.to_excel(excel_file, index=False)
+                print(f"数据已保存到Excel: {excel_file}")
             
             # 保存为JSON
-            json_file = f"data/diskprices_{timestamp}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-            print(f"数据已保存到JSON: {json_file}")
+            if 'json' in formats:
+                json_file = f"data/diskprices_{timestamp}.json"
+                with open(json_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                print(f"数据已保存到JSON: {json_file}")
             
             # 保存最新数据
             latest_json = "data/latest_data.json"
@@ -241,9 +380,21 @@ def main():
     secret_key = "YOUR_SECRET_KEY"
     partner_tag = "YOUR_PARTNER_TAG"
     
-    scraper = AmazonDiskPricesScraper(access_key, secret_key, partner_tag)
+    parser = argparse.ArgumentParser(description="通过 Amazon PA-API 获取硬盘价格")
+    parser.add_argument('--terms', help="搜索关键词文件，每行一个")
+    parser.add_argument('--pages', type=int, default=1, help="每个关键词最多翻几页（1-10）")
+    parser.add_argument('--refresh', action='store_true', help="不搜索，只刷新 ASIN 登记表中已知商品的价格")
+    args = parser.parse_args()
+    
+    search_terms = load_search_terms(args.terms) if args.terms else None
+    # DISKPRICES_CACHE=1 时缓存 API 响应，重复运行不消耗配额
+    scraper = AmazonDiskPricesScraper(access_key, secret_key, partner_tag,
+                                      search_terms=search_terms, max_pages=args.pages, cache=cache_from_env())
     try:
-        scraper.search_disks()
+        if args.refresh:
+            scraper.refresh_prices()
+        else:
+            scraper.search_disks()
         scraper.save_data()
     except Exception as e:
         print(f"主程序出错: {e}")
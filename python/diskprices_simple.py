@@ -4,18 +4,76 @@ import pandas as pd
 import time
 import os
 from datetime import datetime
+import diskprices_static
+from response_cache import apply_response_cache, cache_from_env
 
-async def scrape_diskprices():
-    """简单版本的diskprices.com爬虫"""
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)  # 设为False以便观察
-    page = await browser.new_page()
+def scrape_diskprices_static(source=None, cache=None):
+    """不启动浏览器，直接请求/读取 HTML 并解析第一个表格"""
+    try:
+        data = diskprices_static.to_simple_records(diskprices_static.parse_rows(source, cache=cache))
+        if data:
+            df = pd.DataFrame(data)
+            df.to_csv("simple_data.csv", index=False)
+            print(f"已保存 {len(data)} 条数据到 simple_data.csv")
+        else:
+            print("未找到数据")
+    except Exception as e:
+        print(f"静态解析过程中出错: {e}")
+
+async def collect_table_rows(table):
+    """逐行读取表格 tbody 中的产品、容量、价格"""
+    rows = await table.query_selector_all('tbody tr')
+    print(f"找到 {len(rows)} 行数据")
+    
+    data = []
+    for row in rows:
+        try:
+            # 获取所有单元格
+            cells = await row.query_selector_all('td')
+            
+            if len(cells) >= 3:  # 至少需要产品名、容量和价格
+                product_text = await cells[0].inner_text()
+                capacity = await cells[1].inner_text() if len(cells) > 1 else "N/A"
+                price = await cells[2].inner_text() if len(cells) > 2 else "N/A"
+                
+                data.append({
+                    'product': product_text,
+                    'capacity': capacity,
+                    'price': price
+                })
+        except Exception as e:
+            print(f"处理行时出错: {e}")
+    return data
+
+async def scrape_diskprices(engine='browser', source=None, pool=None, cache=None,
+                            url=diskprices_static.DISKPRICES_URL):
+    """简单版本的diskprices.com爬虫
+    engine: 'browser' 使用 Playwright；'static' 直接请求/读取 HTML 并解析
+    source: static 引擎的数据源，URL 或本地保存的页面文件（例如 simple_page.html）
+    pool: 可选的 BrowserPool，提供时借用池中预热的页面，而不是启动新的浏览器
+    cache: 可选的 response_cache.ResponseCache，页面命中缓存时不再请求网络；使用浏览器池时由池的配置决定
+    url: browser 引擎访问的页面地址，默认 diskprices.com（基准测试时指向本地服务器）
+    """
+    if engine == 'static':
+        scrape_diskprices_static(source, cache=cache)
+        return
+    
+    if pool is not None:
+        lease = await pool.acquire()
+        page = lease.page
+    else:
+        playwright = await async_playwright().start()
+        browser = await playwright.chromium.launch(headless=False)  # 设为False以便观察
+        page = await browser.new_page()
+        await apply_response_cache(page, cache)
     
     data = []
+    # 出错的页面可能停在错误页或已崩溃，归还浏览器池时要求重建
+    healthy = True
     
     try:
         print("正在访问网站...")
-        await page.goto("https://diskprices.com/", timeout=60000)
+        await page.goto(url, timeout=60000)
         print("页面已加载")
         
         # 保存截图
@@ -33,27 +91,7 @@ async def scrape_diskprices():
             # 假设第一个表格是数据表格
             main_table = tables[0]
             
-            # 获取表格行
-            rows = await main_table.query_selector_all('tbody tr')
-            print(f"找到 {len(rows)} 行数据")
-            
-            for row in rows:
-                try:
-                    # 获取所有单元格
-                    cells = await row.query_selector_all('td')
-                    
-                    if len(cells) >= 3:  # 至少需要产品名、容量和价格
-                        product_text = await cells[0].inner_text()
-                        capacity = await cells[1].inner_text() if len(cells) > 1 else "N/A"
-                        price = await cells[2].inner_text() if len(cells) > 2 else "N/A"
-                        
-                        data.append({
-                            'product': product_text,
-                            'capacity': capacity,
-                            'price': price
-                        })
-                except Exception as e:
-                    print(f"处理行时出错: {e}")
+            data = await collect_table_rows(main_table)
             
             # 保存数据
             if data:
@@ -77,6 +115,7 @@ async def scrape_diskprices():
             print("已保存页面HTML到 simple_page.html")
     
     except Exception as e:
+        healthy = False
         print(f"爬取过程中出错: {e}")
         # 保存错误页面
         await page.screenshot(path="simple_error.png")
@@ -86,9 +125,15 @@ async def scrape_diskprices():
         print("已保存错误页面信息")
     
     finally:
-        await browser.close()
-        await playwright.stop()
-        print("浏览器已关闭")
+        if pool is not None:
+            await pool.release(lease, healthy=healthy)
+        else:
+            await browser.close()
+            await playwright.stop()
+            print("浏览器已关闭")
 
 if __name__ == "__main__":
-    asyncio.run(scrape_diskprices()) 
\ No newline at end of file
+    # 通过 DISKPRICES_ENGINE=static 和 DISKPRICES_SOURCE 选择静态解析引擎
+    engine, source = diskprices_static.engine_from_env()
+    # DISKPRICES_CACHE=1 时页面缓存到磁盘，重复运行不再请求网络
+    asyncio.run(scrape_diskprices(engine=engine, source=source, cache=cache_from_env())) 
\ No newline at end of file
@@ -0,0 +1,269 @@
+import codecs
+import html
+import os
+import sys
+import time
+import urllib.request
+from collections import namedtuple
+from datetime import datetime
+from html.parser import HTMLParser
+import response_cache
+
+DISKPRICES_URL = "https://diskprices.com/"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
+CHUNK_SIZE = 64 * 1024
+
+# 可选的抓取引擎：browser 使用 Playwright，static 直接请求/读取 HTML 并解析
+ENGINES = ('browser', 'static')
+
+# 表格的分组标签；tbody 可以省略，浏览器会自动补上
+TABLE_SECTIONS = ('thead', 'tbody', 'tfoot')
+
+# 解析得到的单元格和行
+ParsedCell = namedtuple('ParsedCell', ['text', 'html', 'link_text', 'link_url'])
+ParsedRow = namedtuple('ParsedRow', ['table_index', 'table_classes', 'in_tbody', 'classes', 'cells'])
+
+def engine_from_env():
+    """从环境变量 DISKPRICES_ENGINE / DISKPRICES_SOURCE 读取本次运行使用的引擎和数据源"""
+    engine = os.environ.get('DISKPRICES_ENGINE', 'browser').lower()
+    if engine not in ENGINES:
+        raise ValueError(f"不支持的引擎: {engine}，可选: {', '.join(ENGINES)}")
+    source = os.environ.get('DISKPRICES_SOURCE') or None
+    return engine, source
+
+def _read_url(source, timeout):
+    """请求 URL，返回 (响应体, 与浏览器缓存相同结构的元数据)"""
+    request = urllib.request.Request(source, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read(), response_cache.http_meta(source, response.status, response.headers.items())
+
+def _decode_chunks(body, charset):
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield decoder.decode(body[start:start + CHUNK_SIZE])
+    yield decoder.decode(b'', final=True)
+
+def iter_html_chunks(source=None, timeout=60, cache=None):
+    """逐块读取页面HTML
+    source: URL 或本地文件路径（例如 simple_page.html、full_page_html.txt），默认请求 diskprices.com
+    cache: 可选的 response_cache.ResponseCache，URL 命中缓存时不再请求网络
+    """
+    source = source or DISKPRICES_URL
+    if source.startswith(('http://', 'https://')):
+        if cache is not None:
+            # 使用缓存时需要完整的响应体，不再边下载边解析
+            key = response_cache.cache_key('GET', source)
+            cached = cache.get(key)
+            if cached is not None:
+                body, meta = cached.body, cached.meta
+            else:
+                body, meta = _read_url(source, timeout)
+                cache.put(key, body, meta)
+            yield from _decode_chunks(body, meta.get('charset') or 'utf-8')
+            return
+        request = urllib.request.Request(source, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            charset = response.headers.get_content_charset() or 'utf-8'
+            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield decoder.decode(chunk)
+            yield decoder.decode(b'', final=True)
+    else:
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+class DiskTableParser(HTMLParser):
+    """流式解析页面中所有表格行，记录每个 td 的文本、HTML 和第一个链接"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.rows = []
+        self._tables = []  # 当前嵌套的表格: (序号, 类名)
+        self._sections = []  # 每个嵌套表格当前所在的 thead/tbody/tfoot，None 表示直接位于 table 下
+        self._table_count = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table' and self._cell is None:
+            self._finish_row()
+            self._tables.append((self._table_count, _classes(attrs)))
+            self._sections.append(None)
+            self._table_count += 1
+        elif tag in TABLE_SECTIONS and self._tables and self._cell is None:
+            self._finish_row()
+            self._sections[-1] = tag
+        elif tag == 'tr' and self._tables and self._cell is None:
+            self._finish_row()
+            table_index, table_classes = self._tables[-1]
+            # 浏览器会把直接位于 table 下的 tr 放进隐式的 tbody，与 'tbody tr' 选择器的结果一致
+            in_tbody = self._sections[-1] not in ('thead', 'tfoot')
+            self._row = ParsedRow(table_index, table_classes, in_tbody, _classes(attrs), [])
+        elif tag == 'td' and self._row is not None:
+            self._finish_cell()
+            self._cell = {'text': [], 'html': [], 'link_text': None, 'link_url': None, 'in_link': False}
+        elif tag == 'tr' or tag == 'td':
+            return
+        elif self._cell is not None:
+            self._cell['html'].append(self.get_starttag_text())
+            if tag == 'br':
+                self._append_text('\n')
+            elif tag == 'a' and self._cell['link_url'] is None and not self._cell['in_link']:
+                self._cell['in_link'] = True
+                self._cell['link_text'] = []
+                self._cell['link_url'] = dict(attrs).get('href')
+
+    def handle_startendtag(self, tag, attrs):
+        if self._cell is not None:
+            self._cell['html'].append(self.get_starttag_text())
+            if tag == 'br':
+                self._append_text('\n')
+
+    def handle_endtag(self, tag):
+        if tag == 'td':
+            self._finish_cell()
+        elif tag == 'tr':
+            self._finish_row()
+        elif tag in TABLE_SECTIONS and self._tables and self._cell is None:
+            # 结束标签会隐式关闭未闭合的 td/tr
+            self._finish_row()
+            self._sections[-1] = None
+        elif tag == 'table':
+            self._finish_row()
+            if self._tables:
+                self._tables.pop()
+                self._sections.pop()
+        elif self._cell is not None:
+            self._cell['html'].append(f'</{tag}>')
+            if tag == 'a':
+                self._cell['in_link'] = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell['html'].append(data)
+            self._append_text(data)
+
+    def handle_entityref(self, name):
+        self._handle_reference(f'&{name};')
+
+    def handle_charref(self, name):
+        self._handle_reference(f'&#{name};')
+
+    def close(self):
+        super().close()
+        self._finish_row()
+
+    def _handle_reference(self, raw):
+        if self._cell is not None:
+            self._cell['html'].append(raw)
+            self._append_text(html.unescape(raw))
+
+    def _append_text(self, text):
+        self._cell['text'].append(text)
+        if self._cell['in_link']:
+            self._cell['link_text'].append(text)
+
+    def _finish_cell(self):
+        if self._cell is None:
+            return
+        cell = self._cell
+        self._cell = None
+        link_text = _clean_text(''.join(cell['link_text'])) if cell['link_text'] is not None else None
+        self._row.cells.append(ParsedCell(
+            _clean_text(''.join(cell['text'])),
+            ''.join(cell['html']),
+            link_text,
+            cell['link_url']
+        ))
+
+    def _finish_row(self):
+        self._finish_cell()
+        if self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+def _classes(attrs):
+    return tuple((dict(attrs).get('class') or '').split())
+
+def _clean_text(text):
+    """近似浏览器的 innerText：合并每行内的空白并去掉空行"""
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+def parse_rows(source=None, cache=None):
+    """流式读取并解析页面，返回所有表格行；cache 见 iter_html_chunks"""
+    start = time.perf_counter()
+    parser = DiskTableParser()
+    for chunk in iter_html_chunks(source, cache=cache):
+        parser.feed(chunk)
+    parser.close()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"静态解析完成，共 {len(parser.rows)} 行，耗时 {elapsed:.1f} ms")
+    return parser.rows
+
+def to_enhanced_rows(rows, cell_count=7):
+    """转换为 EnhancedDiskPricesScraper 的紧凑行数组: [单元格文本..., 产品链接, 卖家链接]"""
+    # 优先使用 table.disktable 的 tbody 行，否则使用所有表格的 tbody 行
+    candidates = [row for row in rows if row.in_tbody and 'disktable' in row.table_classes]
+    if not candidates:
+        candidates = [row for row in rows if row.in_tbody] or rows
+
+    result = []
+    for row in candidates:
+        cells = row.cells
+        # 如果这一行没有足够的单元格，可能是表头或空行
+        if len(cells) < 3:
+            continue
+        values = [cells[i].text if i < len(cells) else None for i in range(cell_count)]
+        seller_url = cells[6].link_url if len(cells) > 6 else None
+        result.append(values + [cells[0].link_url, seller_url])
+    return result
+
+def to_detailed_rows(rows, column_count=8):
+    """转换为 scrape_diskprices_enhanced 的扁平行: 每列 text/html/link_text/link_url，最后是爬取时间"""
+    date_scraped = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    result = []
+    for row in rows:
+        if 'disk' not in row.classes:
+            continue
+        values = []
+        for i in range(column_count):
+            if i < len(row.cells):
+                values.extend(row.cells[i])
+            else:
+                values.extend([None] * len(ParsedCell._fields))
+        values.append(date_scraped)
+        result.append(values)
+    return result
+
+def to_simple_records(rows):
+    """转换为 scrape_diskprices 的记录: 第一个表格 tbody 中的产品、容量、价格"""
+    result = []
+    for row in rows:
+        if row.table_index != 0 or not row.in_tbody or len(row.cells) < 3:
+            continue
+        result.append({
+            'product': row.cells[0].text,
+            'capacity': row.cells[1].text,
+            'price': row.cells[2].text
+        })
+    return result
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    # DISKPRICES_CACHE=1 时页面缓存到磁盘，重复运行不再请求网络
+    rows = parse_rows(source, cache=response_cache.cache_from_env())
+    print(f"表格行: {len(rows)}")
+    print(f"增强版记录: {len(to_enhanced_rows(rows))}")
+    print(f"详细版记录 (tr.disk): {len(to_detailed_rows(rows))}")
+    print(f"简单版记录: {len(to_simple_records(rows))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+# 默认用于识别商品和计算指纹的字段（EnhancedDiskPricesScraper 的记录结构）
+DEFAULT_FIELDS = {'url': 'product_url', 'price': 'price', 'seller': 'seller', 'name': 'product_name'}
+
+def _value(record, field):
+    value = record.get(field)
+    return '' if value is None else str(value)
+
+def _hash(*values):
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+class FingerprintStore:
+    """持久化的行指纹存储，用于增量爬取：只输出新增、变化和消失的商品
+
+    商品以 (商品链接, 卖家) 识别，链接缺失时退回到商品名称；
+    指纹为 商品链接 + 价格 + 卖家 的哈希。
+    """
+
+    def __init__(self, path='fingerprints.json', fields=None):
+        """
+        path: 指纹文件路径
+        fields: 字段映射 {'url', 'price', 'seller', 'name'}，默认使用 DEFAULT_FIELDS
+        """
+        self.path = path
+        self.fields = {**DEFAULT_FIELDS, **(fields or {})}
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"读取指纹文件出错，将重新建立: {e}")
+                self.entries = {}
+        self._pending = None
+
+    def row_key(self, record):
+        url = _value(record, self.fields['url'])
+        if not url or url == "N/A":
+            url = 'name:' + _value(record, self.fields['name'])
+        return _hash(url, _value(record, self.fields['seller']))
+
+    def fingerprint(self, record):
+        return _hash(
+            _value(record, self.fields['url']),
+            _value(record, self.fields['price']),
+            _value(record, self.fields['seller'])
+        )
+
+    def compute_delta(self, records, detect_removed=True):
+        """与上一次运行比较，返回 {'inserted', 'changed', 'removed', 'unchanged'}
+        detect_removed: 本次是否爬取了完整数据集；只爬了部分页面时应设为 False，避免误报消失
+        需要调用 commit() 才会把本次结果写入指纹文件
+        """
+        inserted = []
+        changed = []
+        unchanged = 0
+        current = {}
+        for record in records:
+            key = self.row_key(record)
+            fingerprint = self.fingerprint(record)
+            # 只保存识别字段，消失的商品输出这部分信息
+            current[key] = {
+                'fingerprint': fingerprint,
+                'record': {field: record.get(field) for field in self.fields.values()}
+            }
+            previous = self.entries.get(key)
+            if previous is None:
+                inserted.append(record)
+            elif previous['fingerprint'] != fingerprint:
+                changed.append(record)
+            else:
+                unchanged += 1
+        
+        removed = []
+        if detect_removed:
+            removed = [entry['record'] for key, entry in self.entries.items() if key not in current]
+            pending = current
+        else:
+            pending = {**self.entries, **current}
+        
+        self._pending = pending
+        print(f"增量结果: 新增 {len(inserted)}，变化 {len(changed)}，消失 {len(removed)}，未变化 {unchanged}")
+        return {'inserted': inserted, 'changed': changed, 'removed': removed, 'unchanged': unchanged}
+
+    def commit(self):
+        """把最近一次 compute_delta 的结果写入指纹文件"""
+        if self._pending is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._pending, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.entries = self._pending
+        self._pending = None
+
+def append_delta(delta, path='diskprices_delta.jsonl'):
+    """把增量以 JSON Lines 追加到文件，每行 {'op', 'scraped_at', 'record'}，返回写入的行数"""
+    scraped_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    count = 0
+    with open(path, 'a', encoding='utf-8') as f:
+        for op in ('inserted', 'changed', 'removed'):
+            for record in delta[op]:
+                f.write(json.dumps({'op': op, 'scraped_at': scraped_at, 'record': record}, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+    print(f"已追加 {count} 条增量记录到 {path}")
+    return count
@@ -0,0 +1,165 @@
+import re
+import sys
+import time
+from datetime import date
+import pandas as pd
+import analytics_cube
+import snapshot_store
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# 历史分析只需要这些列，快照按列读取
+HISTORY_COLUMNS = ['seller', 'interface', 'price_value', 'price_per_tb_value']
+GROUP_DIMENSIONS = ('seller', 'interface')
+# 每批读取的行数，内存占用与快照总量无关
+CHUNK_ROWS = 100000
+PARTITION_PATTERN = re.compile(r'scrape_date=(\d{4}-\d{2}-\d{2})')
+
+# 可合并的部分统计量：各批次/各引擎的结果相加后再计算平均值
+PARTIAL_COLUMNS = ['count', 'price_sum', 'price_n', 'price_per_tb_sum', 'price_per_tb_n']
+
+def snapshot_files(root=snapshot_store.SNAPSHOT_DIR, since=None, until=None, prefix='diskprices_data'):
+    """列出时间窗口 [since, until] 内的快照，按 scrape_date 分区目录过滤，不打开窗口外的文件"""
+    files = []
+    for path in snapshot_store.list_snapshots(root, prefix):
+        match = PARTITION_PATTERN.search(path)
+        if match is None:
+            continue
+        scrape_date = date.fromisoformat(match.group(1))
+        if since is not None and scrape_date < since:
+            continue
+        if until is not None and scrape_date > until:
+            continue
+        files.append(path)
+    return files
+
+def _partial_stats(frame, dimension):
+    """一批数据按维度计算部分统计量；缺失的维度取值与汇总（analytics_cube）一样归入 Unknown"""
+    frame = frame.assign(**{dimension: analytics_cube.dimension_labels(frame[dimension]).to_numpy()})
+    return frame.groupby(dimension, observed=True).agg(
+        count=('price_value', 'size'),
+        price_sum=('price_value', 'sum'),
+        price_n=('price_value', 'count'),
+        price_per_tb_sum=('price_per_tb_value', 'sum'),
+        price_per_tb_n=('price_per_tb_value', 'count'),
+    )
+
+def _merge_partials(partials):
+    """合并部分统计量（按维度取值相加）"""
+    partials = [partial for partial in partials if not partial.empty]
+    if not partials:
+        return pd.DataFrame(columns=PARTIAL_COLUMNS)
+    merged = pd.concat(partials)
+    merged.index = merged.index.astype(str)
+    return merged.groupby(level=0).sum()
+
+def _finalize(partial):
+    """部分统计量转换为与 analyze_data 相同的统计表"""
+    stats = pd.DataFrame({
+        '产品数量': partial['count'].astype(int),
+        '平均价格': partial['price_sum'] / partial['price_n'].where(partial['price_n'] > 0),
+        '平均每TB价格': partial['price_per_tb_sum'] / partial['price_per_tb_n'].where(partial['price_per_tb_n'] > 0),
+    })
+    return stats.sort_values('产品数量', ascending=False)
+
+def _iter_batches(path, columns, chunk_rows):
+    """逐批读取快照中存在的列"""
+    snapshot_store._require_pyarrow()
+    if path.endswith(snapshot_store.FORMATS['arrow']):
+        reader = snapshot_store.ipc.open_file(path)
+        available = [column for column in columns if column in reader.schema.names]
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).select(available).to_pandas()
+    else:
+        parquet = snapshot_store.pq.ParquetFile(path)
+        available = [column for column in columns if column in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=available):
+            yield batch.to_pandas()
+
+def chunked_partials(files, chunk_rows=CHUNK_ROWS):
+    """用 pyarrow 分批读取（只读需要的列），逐批累加部分统计量"""
+    partials = {dimension: [] for dimension in GROUP_DIMENSIONS}
+    for path in files:
+        for frame in _iter_batches(path, HISTORY_COLUMNS, chunk_rows):
+            for column in HISTORY_COLUMNS:
+                if column not in frame.columns:
+                    frame[column] = None
+            for dimension in GROUP_DIMENSIONS:
+                # 每批之后立即合并，保持内存中的部分统计量只有维度取值那么多行
+                partials[dimension] = [_merge_partials(partials[dimension] + [_partial_stats(frame, dimension)])]
+    return {dimension: _merge_partials(items) for dimension, items in partials.items()}
+
+def duckdb_partials(files):
+    """用 DuckDB 直接扫描 Parquet 快照，列裁剪和聚合都在 DuckDB 中完成；缺失的维度取值归入 Unknown"""
+    file_list = '[' + ', '.join("'" + path.replace("'", "''") + "'" for path in files) + ']'
+    connection = duckdb.connect()
+    try:
+        result = {}
+        for dimension in GROUP_DIMENSIONS:
+            frame = connection.execute(f"""
+                SELECT COALESCE(NULLIF(REGEXP_REPLACE(CAST({dimension} AS VARCHAR), '^\\s+|\\s+$', '', 'g'), ''),
+                                '{analytics_cube.UNKNOWN}') AS key,
+                       COUNT(*) AS count,
+                       COALESCE(SUM(price_value), 0) AS price_sum,
+                       COUNT(price_value) AS price_n,
+                       COALESCE(SUM(price_per_tb_value), 0) AS price_per_tb_sum,
+                       COUNT(price_per_tb_value) AS price_per_tb_n
+                FROM read_parquet({file_list}, union_by_name = true)
+                GROUP BY 1
+            """).df()
+            result[dimension] = frame.set_index('key')[PARTIAL_COLUMNS]
+        return result
+    finally:
+        connection.close()
+
+def analyze_history(root=snapshot_store.SNAPSHOT_DIR, since=None, until=None, engine='auto', chunk_rows=CHUNK_ROWS):
+    """在时间窗口内的所有快照上计算卖家和接口类型统计，内存占用与快照总量无关
+
+    engine: auto（有 duckdb 时使用 duckdb）、duckdb 或 pandas（pyarrow 分批读取）
+    """
+    if engine == 'duckdb' and duckdb is None:
+        raise ImportError("duckdb 引擎需要安装 duckdb，请运行: pip install duckdb")
+    use_duckdb = duckdb is not None and engine in ('auto', 'duckdb')
+
+    start = time.perf_counter()
+    files = snapshot_files(root, since, until)
+    if not files:
+        return None
+    print(f"时间窗口内共有 {len(files)} 个快照，使用 {'duckdb' if use_duckdb else 'pandas'} 引擎")
+
+    partials = {dimension: [] for dimension in GROUP_DIMENSIONS}
+    parquet_files = [path for path in files if path.endswith(snapshot_store.FORMATS['parquet'])] if use_duckdb else []
+    if parquet_files:
+        for dimension, partial in duckdb_partials(parquet_files).items():
+            partials[dimension].append(partial)
+    # DuckDB 不读取的 Arrow 快照（或没有 DuckDB 时的全部快照）分批读取
+    scanned = set(parquet_files)
+    remaining = [path for path in files if path not in scanned]
+    if remaining:
+        for dimension, partial in chunked_partials(remaining, chunk_rows).items():
+            partials[dimension].append(partial)
+
+    stats = {f'{dimension}_stats': _finalize(_merge_partials(items)) for dimension, items in partials.items()}
+    stats['files'] = len(files)
+    elapsed = time.perf_counter() - start
+    print(f"历史分析完成，耗时 {elapsed:.2f} 秒")
+    return stats
+
+def main():
+    # 用法: python history_analysis.py [开始日期] [结束日期]
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    until = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    stats = analyze_history(since=since, until=until)
+    if stats is None:
+        print("时间窗口内没有快照")
+        return
+    print("\n卖家统计:")
+    print(stats['seller_stats'])
+    print("\n接口类型统计:")
+    print(stats['interface_stats'])
+
+if __name__ == "__main__":
+    main()
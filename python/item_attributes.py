@@ -0,0 +1,83 @@
+import re
+from collections import namedtuple
+from normalize import CAPACITY_PATTERN, UNIT_PRIORITY, unit_factor
+
+# 接口和硬盘形态关键词，按优先级排列：同一段文本中出现多个时取靠前的
+INTERFACES = ('sata', 'nvme', 'usb', 'thunderbolt', 'pcie')
+FORM_FACTORS = {
+    '2.5': '2.5"',
+    '3.5': '3.5"',
+    'm.2': 'M.2',
+    'external': 'External'
+}
+FORM_FACTOR_KEYS = tuple(FORM_FACTORS)
+UNKNOWN = 'Unknown'
+
+# 多段文本以 \x00 连接（末尾也加一个）为一个字符串后只小写一次，分隔符标记每段文本的结束
+SEPARATOR = '\x00'
+# 容量单位前的数值最多向前查看的字符数
+CAPACITY_LOOKBACK = 32
+
+# 关键词 -> (属性, 优先级)：接口、形态、容量单位（TB/GB/MB，TiB 等）和分隔符
+_TOKENS = {keyword: ('interface', rank) for rank, keyword in enumerate(INTERFACES)}
+_TOKENS.update((keyword, ('form_factor', rank)) for rank, keyword in enumerate(FORM_FACTOR_KEYS))
+_TOKENS.update((unit + iec + 'b', ('capacity', rank)) for rank, unit in enumerate(UNIT_PRIORITY) for iec in ('', 'i'))
+_TOKENS[SEPARATOR] = ('separator', None)
+# 所有关键词合并为一个正则，一次 finditer 按位置取出。每个分支都以普通字符开头，
+# re 可以按首字符快速跳过无关位置；完整的容量正则放进分支会使每个位置都要尝试匹配，慢数倍
+TOKEN_PATTERN = re.compile('|'.join(map(re.escape, sorted(_TOKENS, key=len, reverse=True))))
+# 单位之前的容量数值：在单位前的一小段文本中匹配以该单位结尾的 CAPACITY_PATTERN
+_CAPACITY_BEFORE_UNIT = re.compile(f'(?:{CAPACITY_PATTERN.pattern})\\Z')
+
+# (单位前缀, 是否为 TiB/GiB) -> 换算为TB的系数
+_UNIT_FACTORS = {(unit, iec): unit_factor(unit, iec) for unit in UNIT_PRIORITY for iec in ('', 'i')}
+
+ItemAttributes = namedtuple('ItemAttributes', ['capacity_tb', 'interface', 'form_factor'])
+
+def _capacity_before(text, unit):
+    """unit（TOKEN_PATTERN 匹配到的容量单位）连同前面的数值换算为TB；前面没有数值时返回 None"""
+    match = _CAPACITY_BEFORE_UNIT.search(text, max(unit.start() - CAPACITY_LOOKBACK, 0), unit.end())
+    if match is None:
+        return None
+    number, prefix, iec = match.groups()
+    return float(number.replace(',', '')) * _UNIT_FACTORS[prefix, iec]
+
+def extract_attributes(texts):
+    """一次遍历标题和特征，提取容量（TB）、接口和硬盘形态；所有文本只小写、连接一次
+
+    规则与逐段查找相同：按文本顺序，第一段包含该属性的文本决定结果；
+    同一段文本内容量按 TB、GB、MB 的优先级，接口和形态按 INTERFACES / FORM_FACTORS 的顺序。
+    三个属性都找到后不再查看后面的文本。
+    """
+    if not texts:
+        return ItemAttributes(None, UNKNOWN, UNKNOWN)
+    text = (SEPARATOR.join(texts) + SEPARATOR).lower()
+
+    # 已确定的结果，以及当前这段文本中找到的 (优先级, 取值)
+    found = {'capacity': None, 'interface': None, 'form_factor': None}
+    segment = {}
+    for match in TOKEN_PATTERN.finditer(text):
+        kind, rank = _TOKENS[match.group()]
+        if kind == 'separator':
+            for name, (_, value) in segment.items():
+                found[name] = value
+            if None not in found.values():
+                break
+            segment.clear()
+        elif found[kind] is None and (kind not in segment or rank < segment[kind][0]):
+            value = _capacity_before(text, match) if kind == 'capacity' else match.group()
+            if value is not None:
+                segment[kind] = (rank, value)
+
+    interface, form_factor = found['interface'], found['form_factor']
+    return ItemAttributes(
+        found['capacity'],
+        interface.upper() if interface is not None else UNKNOWN,
+        FORM_FACTORS[form_factor] if form_factor is not None else UNKNOWN
+    )
+
+def item_texts(item):
+    """PA-API 商品的标题和特征列表"""
+    title = item.item_info.title.display_value
+    features = item.item_info.features.display_values if item.item_info.features else []
+    return [title] + list(features)
@@ -0,0 +1,123 @@
+import re
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# 价格: "$1,234.56"、"$15.00/TB"、"€ 99"、"USD 12.5"
+PRICE_PATTERN = re.compile(r'(?P<currency>[$€£¥]|USD|EUR|GBP|JPY|CNY)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)', re.IGNORECASE)
+# 容量: "8 TB"、"500GB"、"1.5TiB"、"2,000 GB"（数值中的千位分隔符在换算前去掉）
+CAPACITY_PATTERN = re.compile(r'(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*([kmgtp])(i?)b', re.IGNORECASE)
+
+CURRENCY_SYMBOLS = {'$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
+
+# 单位换算为TB，decimal 为厂商标注的十进制单位，binary 按 1024 换算（与旧版 clean_data 一致）
+DECIMAL_UNITS = {'k': 1e-9, 'm': 1e-6, 'g': 1e-3, 't': 1.0, 'p': 1e3}
+BINARY_UNITS = {'k': 1024.0 ** -3, 'm': 1024.0 ** -2, 'g': 1024.0 ** -1, 't': 1.0, 'p': 1024.0}
+# 明确写成 TiB/GiB 时总是二进制单位，decimal 模式下换算为十进制TB
+TIB_IN_TB = 1024 ** 4 / 1e12
+# Amazon 等文本中查找容量时单位的优先级
+UNIT_PRIORITY = ('t', 'g', 'm')
+
+# normalize_frame 添加的列
+DERIVED_COLUMNS = ('price_value', 'price_per_tb_value', 'capacity_tb', 'currency')
+
+def unit_factor(prefix, iec, binary=False):
+    """单位前缀（k/m/g/t/p）换算为TB的系数，iec 为 TiB/GiB 中的 i"""
+    prefix = prefix.lower()
+    if binary:
+        return BINARY_UNITS[prefix]
+    if iec:
+        return BINARY_UNITS[prefix] * TIB_IN_TB
+    return DECIMAL_UNITS[prefix]
+
+def price_value(text):
+    """解析单个价格文本，无法解析时返回 NaN"""
+    match = PRICE_PATTERN.search(text) if isinstance(text, str) else None
+    return float(match.group('amount').replace(',', '')) if match else np.nan
+
+def currency_code(text):
+    """解析单个价格文本的货币，默认 USD（diskprices.com 和 Amazon US 都以美元标价）"""
+    match = PRICE_PATTERN.search(text) if isinstance(text, str) else None
+    if match is None:
+        return None
+    symbol = match.group('currency')
+    if not symbol:
+        return 'USD'
+    return CURRENCY_SYMBOLS.get(symbol, symbol.upper())
+
+def capacity_tb(text, binary=False):
+    """解析单个容量文本（第一个容量值）为TB，无法解析时返回 NaN"""
+    match = CAPACITY_PATTERN.search(text) if isinstance(text, str) else None
+    if match is None:
+        return np.nan
+    number, prefix, iec = match.groups()
+    return float(number.replace(',', '')) * unit_factor(prefix, iec, binary)
+
+def find_capacity_tb(texts, binary=False):
+    """在多段文本（标题、特征）中查找容量：按文本顺序，每段文本内 TB 优先于 GB、MB；找不到时返回 None"""
+    for text in texts:
+        matches = CAPACITY_PATTERN.findall(text)
+        for unit in UNIT_PRIORITY:
+            for number, prefix, iec in matches:
+                if prefix.lower() == unit:
+                    return float(number.replace(',', '')) * unit_factor(prefix, iec, binary)
+    return None
+
+def _map_unique(series, func, dtype='float64'):
+    """只对不同的取值解析一次，再按编码展开到所有行；价格和容量的取值重复度很高"""
+    # 缺失值的编码为 -1
+    codes, uniques = pd.factorize(pd.Series(series))
+    parsed = np.array([func(value) for value in uniques], dtype=dtype)
+    if dtype == 'float64':
+        result = np.full(len(codes), np.nan)
+    else:
+        result = np.full(len(codes), None, dtype=object)
+    valid = codes >= 0
+    if len(parsed):
+        result[valid] = parsed[codes[valid]]
+    return result
+
+def parse_price(series):
+    """把价格文本列转换为 float64 数组"""
+    return _map_unique(series, price_value)
+
+def parse_currency(series):
+    """把价格文本列转换为货币代码数组"""
+    return _map_unique(series, currency_code, dtype=object)
+
+def parse_capacity_tb(series, binary=False):
+    """把容量文本列转换为TB（float64 数组），binary=True 时 GB 按 1/1024 TB 换算"""
+    return _map_unique(series, lambda text: capacity_tb(text, binary))
+
+def normalize_frame(df, binary=False):
+    """在数据入库时一次性添加数值列: price_value、price_per_tb_value、capacity_tb、currency"""
+    df = df.copy()
+    if 'price' in df.columns:
+        df['price_value'] = parse_price(df['price'])
+        df['currency'] = parse_currency(df['price'])
+    if 'price_per_tb' in df.columns:
+        df['price_per_tb_value'] = parse_price(df['price_per_tb'])
+    if 'capacity' in df.columns:
+        df['capacity_tb'] = parse_capacity_tb(df['capacity'], binary)
+    return df
+
+def main():
+    # 用法: python normalize.py [行数]  —— 用合成数据测试解析速度
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    prices = rng.uniform(10, 2000, size=2000).round(2)
+    capacities = ['500GB', '1TB', '2 TB', '4TB', '8 TB', '12TB', '18 TB', '1.92TB', '960 GB', '2TiB']
+    df = pd.DataFrame({
+        'price': [f"${value:,.2f}" for value in rng.choice(prices, rows)],
+        'price_per_tb': [f"${value:,.2f}/TB" for value in rng.choice(prices / 10, rows)],
+        'capacity': rng.choice(capacities, rows)
+    })
+    start = time.perf_counter()
+    result = normalize_frame(df)
+    elapsed = time.perf_counter() - start
+    print(f"{rows} 行解析耗时 {elapsed:.2f} 秒 ({rows / elapsed:,.0f} 行/秒)")
+    print(result.head())
+
+if __name__ == "__main__":
+    main()
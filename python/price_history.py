@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+from datetime import datetime, timedelta
+
+# 历史价格库与快照放在同一目录下: snapshots/price_history.sqlite
+HISTORY_FILENAME = 'price_history.sqlite'
+# 每日汇总中表示全部产品的键
+ALL_PRODUCTS = '*'
+# 爬虫用来表示缺失值的文本（例如没有链接时的 "N/A"），不能作为产品标识
+MISSING_VALUES = ('', 'n/a')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    product_key TEXT NOT NULL,
+    product_name TEXT,
+    seller TEXT NOT NULL DEFAULT '',
+    price REAL,
+    price_per_tb REAL,
+    observed_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    source TEXT,
+    UNIQUE (product_key, seller, observed_at)
+);
+CREATE INDEX IF NOT EXISTS observations_product_time ON observations (product_key, observed_at);
+CREATE INDEX IF NOT EXISTS observations_day ON observations (day);
+CREATE TABLE IF NOT EXISTS daily_prices (
+    product_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    observations INTEGER NOT NULL,
+    min_price REAL,
+    median_price REAL,
+    min_price_per_tb REAL,
+    median_price_per_tb REAL,
+    PRIMARY KEY (product_key, day)
+);
+"""
+
+def _present(value):
+    """去掉首尾空白后的文本，缺失值（None、空字符串、"N/A"）返回 None"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value if value.lower() not in MISSING_VALUES else None
+
+def product_key(record):
+    """产品的唯一标识：优先使用产品链接，没有时使用产品名称"""
+    return _present(record.get('product_url')) or _present(record.get('product_name'))
+
+def _median(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+def _min(values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+class PriceHistory:
+    """只追加的历史价格库：每次爬取的每个产品记录一条观测值（价格、每TB价格、卖家）
+
+    按产品和时间建立索引，并维护每个产品和全部产品的每日最低价/中位数汇总，
+    查询某个产品 90 天内的走势只需一次范围查询，不必读取所有快照。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def append(self, records, observed_at=None, source=None):
+        """追加一次爬取的观测值，返回新增的条数；同一产品、卖家和时间的记录只保存一次
+
+        records: 字典列表，使用 product_url / product_name / seller / price_value / price_per_tb_value 字段
+        observed_at: 爬取时间（datetime），默认当前时间
+        """
+        observed_at = observed_at or datetime.now()
+        timestamp = observed_at.strftime('%Y-%m-%d %H:%M:%S')
+        day = observed_at.strftime('%Y-%m-%d')
+        rows = []
+        for record in records:
+            key = product_key(record)
+            if key is None:
+                continue
+            rows.append((key, record.get('product_name'), record.get('seller') or '',
+                         record.get('price_value'), record.get('price_per_tb_value'),
+                         timestamp, day, source))
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO observations "
+                "(product_key, product_name, seller, price, price_per_tb, observed_at, day, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = self._conn.total_changes - before
+            if added:
+                self._update_daily(day, {row[0] for row in rows})
+        return added
+
+    def _update_daily(self, day, keys):
+        """重新计算受影响的产品以及全部产品在 day 这一天的汇总（调用方持有锁并处于事务中）"""
+        values = {}
+        for row in self._conn.execute(
+            "SELECT product_key, price, price_per_tb FROM observations WHERE day = ?", (day,)
+        ):
+            values.setdefault(row['product_key'], []).append((row['price'], row['price_per_tb']))
+
+        summaries = []
+        all_values = [value for items in values.values() for value in items]
+        for key, items in [(ALL_PRODUCTS, all_values)] + [(key, values.get(key, [])) for key in keys]:
+            prices = [item[0] for item in items]
+            per_tb = [item[1] for item in items]
+            summaries.append((key, day, len(items), _min(prices), _median(prices), _min(per_tb), _median(per_tb)))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO daily_prices "
+            "(product_key, day, observations, min_price, median_price, min_price_per_tb, median_price_per_tb) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            summaries
+        )
+
+    def history(self, key, start=None, end=None, limit=None):
+        """返回某个产品在时间范围内的观测值，按时间升序"""
+        sql = "SELECT observed_at, product_name, seller, price, price_per_tb, source FROM observations WHERE product_key = ?"
+        params = [key]
+        sql, params = self._time_range(sql, params, 'observed_at', start, end)
+        sql += " ORDER BY observed_at"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def daily(self, key=ALL_PRODUCTS, start=None, end=None):
+        """返回每日汇总（最低价和中位数），key 为 ALL_PRODUCTS 时为全部产品"""
+        sql = ("SELECT day, observations, min_price, median_price, min_price_per_tb, median_price_per_tb "
+               "FROM daily_prices WHERE product_key = ?")
+        params = [key]
+        sql, params = self._time_range(sql, params, 'day',
+                                       start.strftime('%Y-%m-%d') if start else None,
+                                       end.strftime('%Y-%m-%d') if end else None)
+        sql += " ORDER BY day"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def products(self, search=None, limit=50, offset=0):
+        """列出产品及其最近一次观测，search 按名称或链接模糊匹配"""
+        sql = ("SELECT product_key, MAX(observed_at) AS last_seen, COUNT(*) AS observations, "
+               "MAX(product_name) AS product_name FROM observations")
+        params = []
+        if search:
+            sql += " WHERE product_name LIKE ? OR product_key LIKE ?"
+            params.extend([f"%{search}%", f"%{search}%"])
+        sql += " GROUP BY product_key ORDER BY last_seen DESC, product_key LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    @staticmethod
+    def _time_range(sql, params, column, start, end):
+        if isinstance(start, datetime):
+            start = start.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(end, datetime):
+            end = end.strftime('%Y-%m-%d %H:%M:%S')
+        if start:
+            sql += f" AND {column} >= ?"
+            params.append(start)
+        if end:
+            sql += f" AND {column} <= ?"
+            params.append(end)
+        return sql, params
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def snapshot_timestamp(path):
+    """从快照文件名 <prefix>_YYYYmmdd_HHMMSS.parquet 中解析爬取时间"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.strptime('_'.join(stem.rsplit('_', 2)[-2:]), '%Y%m%d_%H%M%S')
+    except ValueError:
+        return None
+
+def backfill(root, prefix='diskprices_data'):
+    """把已有的快照导入历史价格库，已导入的观测值会被忽略
+
+    观测时间取自快照文件名，文件名中没有时间的快照会被跳过：
+    使用当前时间会让重复导入时同一批数据以新的时间再写入一次。
+    """
+    import snapshot_store
+
+    history = PriceHistory(os.path.join(root, HISTORY_FILENAME))
+    try:
+        total = 0
+        for path in snapshot_store.list_snapshots(root, prefix):
+            observed_at = snapshot_timestamp(path)
+            if observed_at is None:
+                print(f"警告: 无法从文件名解析爬取时间，已跳过 {path}")
+                continue
+            df = snapshot_store.read_snapshot(path)
+            records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+            added = history.append(records, observed_at=observed_at, source=prefix)
+            total += added
+            print(f"{path}: 新增 {added} 条观测值")
+        print(f"导入完成，共新增 {total} 条观测值")
+    finally:
+        history.close()
+
+def main():
+    # 用法: python price_history.py backfill [快照目录] [前缀]
+    #       python price_history.py history <产品链接或名称> [天数]
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        root = sys.argv[2] if len(sys.argv) > 2 else 'snapshots'
+        backfill(root, sys.argv[3] if len(sys.argv) > 3 else 'diskprices_data')
+    elif len(sys.argv) > 2 and sys.argv[1] == 'history':
+        days = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+        history = PriceHistory(os.path.join('snapshots', HISTORY_FILENAME))
+        for row in history.daily(sys.argv[2], start=datetime.now() - timedelta(days=days)):
+            print(f"{row['day']}\t最低 {row['min_price_per_tb']}\t中位数 {row['median_price_per_tb']} $/TB")
+        history.close()
+    else:
+        print("用法: python price_history.py [backfill [快照目录] [前缀] | history <产品> [天数]]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+class HostRateLimiter:
+    """按主机限制请求间隔的异步限速器，多个并发任务访问同一主机时共享间隔"""
+
+    def __init__(self, min_interval=1.0, jitter=0.0):
+        """
+        min_interval: 同一主机两次请求之间的最小间隔（秒）
+        jitter: 在最小间隔之上额外增加的随机间隔上限（秒）
+        """
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_allowed = {}
+        self._locks = {}
+
+    async def wait(self, url):
+        """等待直到允许向 url 所在主机发起下一次请求，返回实际等待的秒数"""
+        host = urlparse(url).netloc or url
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = max(0.0, self._next_allowed.get(host, 0.0) - time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            interval = self.min_interval + (random.uniform(0, self.jitter) if self.jitter else 0)
+            self._next_allowed[host] = time.monotonic() + interval
+        return delay
+
+class DailyQuotaExceeded(Exception):
+    """当天的请求数已达到 TokenBucket 的每日上限"""
+
+class TokenBucket:
+    """线程安全的令牌桶，用于线程池中共享 API 配额（例如 PA-API 的 TPS/TPD）
+
+    每秒补充 rate 个令牌，最多积累 capacity 个；daily_limit 为每个自然日允许的请求总数。
+    """
+
+    def __init__(self, rate=1.0, capacity=1, daily_limit=None):
+        """
+        rate: 每秒补充的令牌数（TPS）
+        capacity: 允许的突发请求数
+        daily_limit: 每日请求上限（TPD），None 表示不限制
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.daily_limit = daily_limit
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._day = time.strftime('%Y-%m-%d')
+        self._used_today = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得 tokens 个令牌，返回等待的秒数；超过每日上限时抛出 DailyQuotaExceeded"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                today = time.strftime('%Y-%m-%d')
+                if today != self._day:
+                    self._day = today
+                    self._used_today = 0
+                if self.daily_limit is not None and self._used_today + tokens > self.daily_limit:
+                    raise DailyQuotaExceeded(f"已达到每日请求上限 {self.daily_limit}")
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self._used_today += tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            # 在锁外等待，其他线程可以同时计算各自的等待时间
+            time.sleep(delay)
+            waited += delay
+
+    @property
+    def used_today(self):
+        with self._lock:
+            return self._used_today
@@ -0,0 +1,68 @@
+from urllib.parse import urlparse
+
+# 常见的广告和统计脚本域名
+TRACKER_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'adservice.google.com',
+    'amazon-adsystem.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'scorecardresearch.com',
+    'hotjar.com',
+    'clarity.ms',
+    'static.cloudflareinsights.com',
+)
+
+# 资源拦截配置：resource_types 为 Playwright 的 request.resource_type，domains 按主机后缀匹配
+BLOCKING_PROFILES = {
+    'none': {'resource_types': (), 'domains': ()},
+    'default': {'resource_types': ('image', 'media', 'font'), 'domains': TRACKER_DOMAINS},
+    'strict': {'resource_types': ('image', 'media', 'font', 'stylesheet', 'websocket', 'manifest', 'other'),
+               'domains': TRACKER_DOMAINS},
+}
+
+def resolve_profile(profile):
+    """profile 可以是 BLOCKING_PROFILES 中的名称、自定义的配置字典或 None"""
+    if profile is None:
+        return BLOCKING_PROFILES['none']
+    if isinstance(profile, dict):
+        return {
+            'resource_types': tuple(profile.get('resource_types', ())),
+            'domains': tuple(profile.get('domains', ())),
+        }
+    if profile not in BLOCKING_PROFILES:
+        raise ValueError(f"未知的拦截配置: {profile}，可选: {', '.join(BLOCKING_PROFILES)}")
+    return BLOCKING_PROFILES[profile]
+
+def _matches_domain(url, domains):
+    host = urlparse(url).hostname or ''
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+async def apply_blocking_profile(target, profile='default'):
+    """在 BrowserContext 或 Page 上拦截图片、字体、广告和统计等请求
+    返回拦截统计字典 {'blocked': n, 'allowed': n}，没有需要拦截的内容时返回 None
+    """
+    config = resolve_profile(profile)
+    resource_types = set(config['resource_types'])
+    domains = config['domains']
+    if not resource_types and not domains:
+        return None
+    
+    stats = {'blocked': 0, 'allowed': 0}
+    
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type in resource_types or _matches_domain(request.url, domains):
+            stats['blocked'] += 1
+            await route.abort()
+        else:
+            stats['allowed'] += 1
+            # 交给其他路由处理器（例如响应缓存），没有时正常发出请求
+            await route.fallback()
+    
+    await target.route('**/*', handle_route)
+    return stats
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from email.message import Message
+
+# 默认缓存目录和配置：页面HTML和 PA-API 响应都保存在这里
+DEFAULT_CACHE_DIR = 'cache/responses'
+INDEX_FILENAME = 'index.sqlite'
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 浏览器缓存的请求类型（只缓存 GET）；图片、字体等由 resource_blocking 拦截
+CACHEABLE_RESOURCE_TYPES = ('document', 'script', 'stylesheet', 'xhr', 'fetch')
+# 缓存的响应体已经解码，回放时去掉与原始传输有关的头部
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+"""
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'meta', 'created_at'])
+
+def cache_key(*parts):
+    """由 URL、请求参数等组成缓存键，字典参数按键排序，结果与参数顺序无关"""
+    payload = json.dumps(parts, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def http_meta(url, status, headers):
+    """HTTP 响应的元数据：浏览器（apply_response_cache）和静态引擎（diskprices_static）使用相同的结构，
+    任何一方缓存的页面都可以被另一方回放
+
+    返回 {'url', 'status', 'headers'（去掉 DROPPED_HEADERS）, 'charset'}
+    """
+    headers = {name.lower(): value for name, value in dict(headers or {}).items()
+               if name.lower() not in DROPPED_HEADERS}
+    message = Message()
+    message['content-type'] = headers.get('content-type', '')
+    return {'url': url, 'status': status, 'headers': headers, 'charset': message.get_content_charset() or 'utf-8'}
+
+class ResponseCache:
+    """磁盘上的响应缓存：按请求（URL/参数）查找，响应体按内容哈希存放，相同内容只保存一份
+
+    超过 ttl 秒的条目视为过期；总大小超过 max_bytes 时按最近访问时间淘汰（LRU）。
+    索引保存在 SQLite 中，可以在多个线程之间共享。
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        root: 缓存目录，响应体保存在 root/objects/ 下
+        ttl: 条目有效期（秒），None 表示永不过期（用作可回放的固定数据）
+        max_bytes: 缓存总大小上限（字节），None 表示不限制
+        """
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, INDEX_FILENAME), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+        # 响应体总大小在写入/删除时增减，淘汰时不必反复汇总整个索引
+        with self._lock:
+            self._total = self._total_bytes()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def get(self, key):
+        """返回未过期的 CachedResponse，没有或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row['created_at'] > self.ttl:
+                self._delete(key, row['digest'], row['size'])
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                with open(self._object_path(row['digest']), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                # 文件被手动删除时当作未命中
+                self._delete(key, row['digest'], row['size'])
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return CachedResponse(body, json.loads(row['meta']) if row['meta'] else {}, row['created_at'])
+
+    def put(self, key, body, meta=None):
+        """保存响应体（bytes）和元数据（可 JSON 序列化的字典），必要时淘汰最久未访问的条目
+
+        大于 max_bytes 的响应体不缓存（否则会淘汰掉所有条目后再淘汰自己），返回是否已保存
+        """
+        if self.max_bytes is not None and len(body) > self.max_bytes:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            row = self._conn.execute("SELECT digest, size FROM entries WHERE key = ?", (key,)).fetchone()
+            stored = self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, size, created_at, accessed_at, meta) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, digest, len(body), now, now, json.dumps(meta, ensure_ascii=False) if meta else None)
+                )
+            if stored is None:
+                self._total += len(body)
+            if row is not None and row['digest'] != digest:
+                self._remove_object_if_unused(row['digest'], row['size'])
+            self._evict()
+        return True
+
+    def get_object(self, key):
+        """读取用 put_object 保存的 Python 对象，没有时返回 None"""
+        cached = self.get(key)
+        return pickle.loads(cached.body) if cached is not None else None
+
+    def put_object(self, key, value):
+        """用 pickle 保存 Python 对象（例如 PA-API 的响应）"""
+        return self.put(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def total_bytes(self):
+        """缓存的响应体总大小（相同内容只计算一次）"""
+        with self._lock:
+            return self._total
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def purge_expired(self):
+        """删除所有过期条目，返回删除的数量"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, digest, size FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+            ).fetchall()
+            for row in rows:
+                self._delete(row['key'], row['digest'], row['size'])
+        return len(rows)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, digest, size FROM entries").fetchall()
+            for row in rows:
+                self._delete(row['key'], row['digest'], row['size'])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _total_bytes(self):
+        row = self._conn.execute("SELECT SUM(size) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest)").fetchone()
+        return row[0] or 0
+
+    def _delete(self, key, digest, size):
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._remove_object_if_unused(digest, size)
+
+    def _remove_object_if_unused(self, digest, size):
+        """没有条目再引用这个响应体时删除文件，并从总大小中减去"""
+        if self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+            self._total -= size
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """总大小超过上限时按最近访问时间从旧到新删除"""
+        if self.max_bytes is None or self._total <= self.max_bytes:
+            return
+        for row in self._conn.execute("SELECT key, digest, size FROM entries ORDER BY accessed_at").fetchall():
+            if self._total <= self.max_bytes:
+                break
+            self._delete(row['key'], row['digest'], row['size'])
+
+def cache_from_env():
+    """从环境变量读取响应缓存配置，未启用时返回 None
+
+    DISKPRICES_CACHE: 1 使用默认目录，或者指定缓存目录
+    DISKPRICES_CACHE_TTL: 有效期（秒），0 表示永不过期
+    DISKPRICES_CACHE_MAX_MB: 缓存大小上限（MB）
+    """
+    setting = os.environ.get('DISKPRICES_CACHE')
+    if not setting or setting == '0':
+        return None
+    root = DEFAULT_CACHE_DIR if setting == '1' else setting
+    ttl = float(os.environ.get('DISKPRICES_CACHE_TTL', DEFAULT_TTL)) or None
+    max_mb = os.environ.get('DISKPRICES_CACHE_MAX_MB')
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return ResponseCache(root, ttl=ttl, max_bytes=max_bytes)
+
+async def apply_response_cache(target, cache, resource_types=CACHEABLE_RESOURCE_TYPES):
+    """在 BrowserContext 或 Page 上拦截 GET 请求：命中时直接从磁盘返回，未命中时请求网络并写入缓存
+
+    需要在 apply_blocking_profile 之前调用：Playwright 先执行后注册的路由，
+    被拦截的请求不会到达缓存，放行的请求通过 route.fallback() 交给这里处理。
+    返回统计字典 {'hits': n, 'misses': n, 'errors': n}，cache 为 None 时返回 None
+    """
+    if cache is None:
+        return None
+    resource_types = set(resource_types)
+    stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    async def handle_route(route):
+        request = route.request
+        if request.method != 'GET' or request.resource_type not in resource_types:
+            await route.fallback()
+            return
+        key = cache_key('GET', request.url)
+        cached = cache.get(key)
+        if cached is not None:
+            stats['hits'] += 1
+            await route.fulfill(status=cached.meta.get('status', 200), headers=cached.meta.get('headers') or {},
+                                body=cached.body)
+            return
+        stats['misses'] += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # 网络错误时交给浏览器正常处理，让页面尽快得到失败结果，而不是一直等到超时
+            print(f"响应缓存请求 {request.url} 出错: {e}")
+            stats['errors'] += 1
+            await route.fallback()
+            return
+        meta = http_meta(request.url, response.status, response.headers)
+        # 只缓存成功的响应，错误页面下次重新请求
+        if response.ok:
+            cache.put(key, body, meta)
+        await route.fulfill(status=response.status, headers=meta['headers'], body=body)
+
+    await target.route('**/*', handle_route)
+    return stats
+
+def main():
+    # 用法: python response_cache.py [缓存目录] [--clear | --purge]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    cache = ResponseCache(args[0] if args else DEFAULT_CACHE_DIR)
+    try:
+        if '--clear' in sys.argv:
+            cache.clear()
+            print("缓存已清空")
+        elif '--purge' in sys.argv:
+            print(f"已删除 {cache.purge_expired()} 个过期条目")
+        print(f"缓存条目: {len(cache)}，大小: {cache.total_bytes() / 1024 / 1024:.1f} MB")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
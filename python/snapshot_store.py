@@ -0,0 +1,237 @@
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+import normalize
+from analytics_cube import CUBE_FILENAME, CubeStore, build_cube
+from data_catalog import CATALOG_FILENAME, DataCatalog
+from price_history import HISTORY_FILENAME, PriceHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 快照按爬取日期分区: snapshots/scrape_date=YYYY-MM-DD/diskprices_data_YYYYMMDD_HHMMSS.parquet
+SNAPSHOT_DIR = 'snapshots'
+# 2: 增加 capacity_tb 和 currency 列
+SCHEMA_VERSION = 2
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# 与 API 简化数据一致的文本列
+TEXT_COLUMNS = [
+    'product_name', 'product_url', 'capacity', 'price', 'price_per_tb',
+    'interface', 'form_factor', 'seller', 'rating', 'seller_url'
+]
+# 取值较少的列以字典编码（category）存储
+CATEGORY_COLUMNS = ['interface', 'form_factor', 'seller', 'currency']
+# 由文本列解析出的数值列，见 normalize.normalize_frame
+NUMERIC_COLUMNS = {'price': 'price_value', 'price_per_tb': 'price_per_tb_value', 'capacity': 'capacity_tb'}
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("列式快照需要 pyarrow，请运行: pip install pyarrow")
+
+def flatten_records(records):
+    """展开记录中嵌套的 details 字典"""
+    flat_data = []
+    for item in records:
+        flat_item = item.copy()
+        if 'details' in flat_item:
+            details = flat_item.pop('details')
+            for k, v in details.items():
+                flat_item[k] = v
+        flat_data.append(flat_item)
+    return flat_data
+
+def to_snapshot_frame(data):
+    """把爬虫记录列表或简化数据 DataFrame 转换为带类型的快照 DataFrame"""
+    df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(flatten_records(data))
+    for column in TEXT_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+
+    for column in TEXT_COLUMNS:
+        df[column] = df[column].astype('string')
+    # 入库时一次性解析价格、容量和货币，读取快照的程序不必再解析文本
+    df = normalize.normalize_frame(df)
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    if 'date_scraped' in df.columns:
+        df['date_scraped'] = pd.to_datetime(df['date_scraped'], errors='coerce')
+    return df
+
+def snapshot_path(root=SNAPSHOT_DIR, timestamp=None, fmt='parquet', prefix='diskprices_data'):
+    """返回快照文件路径，按日期分区"""
+    timestamp = timestamp or datetime.now()
+    partition = os.path.join(root, f"scrape_date={timestamp.strftime('%Y-%m-%d')}")
+    return os.path.join(partition, f"{prefix}_{timestamp.strftime('%Y%m%d_%H%M%S')}{FORMATS[fmt]}")
+
+def write_snapshot(data, root=SNAPSHOT_DIR, fmt='parquet', prefix='diskprices_data', timestamp=None):
+    """写入压缩的列式快照（Parquet 或 Arrow IPC），返回文件路径"""
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的快照格式: {fmt}，可选: {', '.join(FORMATS)}")
+
+    df = to_snapshot_frame(data)
+    timestamp = timestamp or datetime.now()
+    path = snapshot_path(root, timestamp, fmt, prefix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'schema_version': str(SCHEMA_VERSION).encode()
+    })
+    if fmt == 'parquet':
+        pq.write_table(table, path, compression='zstd')
+    else:
+        feather.write_feather(table, path, compression='zstd')
+    print(f"快照已保存到 {path} ({len(df)} 行)")
+    register_snapshot(path, df, root)
+    record_history(df, root, prefix, timestamp)
+    record_cube(df, path, root, timestamp)
+    return path
+
+def _scraped_range(values):
+    """返回爬取时间的 (最早, 最晚) 字符串"""
+    values = pd.to_datetime(pd.Series(values), errors='coerce').dropna()
+    if values.empty:
+        return None, None
+    return values.min().strftime('%Y-%m-%d %H:%M:%S'), values.max().strftime('%Y-%m-%d %H:%M:%S')
+
+def register_snapshot(path, df, root=SNAPSHOT_DIR):
+    """在快照目录的 catalog.sqlite 中登记快照的行数、schema 版本和时间范围"""
+    try:
+        min_scraped, max_scraped = _scraped_range(df['date_scraped']) if 'date_scraped' in df.columns else (None, None)
+        catalog = DataCatalog(os.path.join(root, CATALOG_FILENAME))
+        try:
+            catalog.register(path, row_count=len(df), schema_version=SCHEMA_VERSION,
+                             min_scraped=min_scraped, max_scraped=max_scraped)
+        finally:
+            catalog.close()
+    except Exception as e:
+        # 登记失败不影响快照本身，API 启动时会重新扫描
+        print(f"登记快照到目录失败: {e}")
+
+def record_history(df, root=SNAPSHOT_DIR, prefix='diskprices_data', timestamp=None):
+    """把本次快照的价格追加到快照目录的 price_history.sqlite"""
+    try:
+        columns = [c for c in ('product_url', 'product_name', 'seller', 'price_value', 'price_per_tb_value') if c in df.columns]
+        subset = df[columns]
+        records = subset.astype(object).where(subset.notna(), None).to_dict(orient='records')
+        history = PriceHistory(os.path.join(root, HISTORY_FILENAME))
+        try:
+            added = history.append(records, observed_at=timestamp, source=prefix)
+        finally:
+            history.close()
+        print(f"历史价格库新增 {added} 条观测值")
+    except Exception as e:
+        print(f"写入历史价格库失败: {e}")
+
+def record_cube(df, path, root=SNAPSHOT_DIR, timestamp=None):
+    """计算本次快照的汇总并保存到快照目录的 analytics_cube.sqlite"""
+    try:
+        store = CubeStore(os.path.join(root, CUBE_FILENAME))
+        try:
+            store.add(os.path.basename(path), build_cube(df), scraped_at=timestamp)
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"保存汇总失败: {e}")
+
+def snapshot_info(path):
+    """只读取文件元数据（和时间列）得到行数、schema 版本和时间范围，用于补登记已有快照"""
+    _require_pyarrow()
+    if path.endswith(FORMATS['arrow']):
+        reader = ipc.open_file(path)
+        schema = reader.schema
+        batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+        row_count = sum(batch.num_rows for batch in batches)
+        scraped = pd.Series(dtype='object')
+        if 'date_scraped' in schema.names and batches:
+            scraped = pd.concat([batch.column('date_scraped').to_pandas() for batch in batches])
+    else:
+        parquet = pq.ParquetFile(path)
+        schema = parquet.schema_arrow
+        row_count = parquet.metadata.num_rows
+        scraped = pd.Series(dtype='object')
+        if 'date_scraped' in schema.names:
+            # 使用每个 row group 的统计信息，不读取数据页
+            column = schema.names.index('date_scraped')
+            bounds = []
+            for i in range(parquet.metadata.num_row_groups):
+                stats = parquet.metadata.row_group(i).column(column).statistics
+                if stats is not None and stats.has_min_max:
+                    bounds.extend([stats.min, stats.max])
+            scraped = pd.Series(bounds, dtype='object')
+    version = (schema.metadata or {}).get(b'schema_version')
+    min_scraped, max_scraped = _scraped_range(scraped)
+    return {
+        'row_count': row_count,
+        'schema_version': int(version) if version else None,
+        'min_scraped': min_scraped,
+        'max_scraped': max_scraped
+    }
+
+def read_snapshot(path, columns=None):
+    """读取快照，columns 指定时只读取需要的列"""
+    _require_pyarrow()
+    if path.endswith(FORMATS['arrow']):
+        return feather.read_feather(path, columns=columns)
+    return pq.read_table(path, columns=columns).to_pandas()
+
+def list_snapshots(root=SNAPSHOT_DIR, prefix='diskprices_data'):
+    """列出所有快照文件，按文件名（时间戳）排序"""
+    files = []
+    for extension in FORMATS.values():
+        files.extend(glob.glob(os.path.join(root, 'scrape_date=*', f'{prefix}_*{extension}')))
+    return sorted(files, key=os.path.basename)
+
+def export_legacy(path, formats=('csv', 'xlsx', 'json'), output_dir='.'):
+    """按需从快照生成旧版的 CSV / Excel / JSON 文件，返回生成的文件路径"""
+    df = read_snapshot(path)
+    # 旧版文件只包含文本列
+    legacy = df.drop(columns=list(normalize.DERIVED_COLUMNS), errors='ignore')
+    if 'date_scraped' in legacy.columns:
+        legacy['date_scraped'] = legacy['date_scraped'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    base = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = []
+    for fmt in formats:
+        output = os.path.join(output_dir, f"{base}.{fmt}")
+        if fmt == 'csv':
+            legacy.to_csv(output, index=False, encoding='utf-8')
+        elif fmt == 'xlsx':
+            legacy.to_excel(output, index=False)
+        elif fmt == 'json':
+            records = legacy.astype(object).where(legacy.notna(), None).to_dict(orient='records')
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        else:
+            print(f"不支持的导出格式: {fmt}")
+            continue
+        outputs.append(output)
+        print(f"已导出 {output}")
+    return outputs
+
+def main():
+    # 用法: python snapshot_store.py list
+    #       python snapshot_store.py export <快照文件> [csv,xlsx,json]
+    if len(sys.argv) < 2 or sys.argv[1] == 'list':
+        for path in list_snapshots():
+            print(path)
+    elif sys.argv[1] == 'export' and len(sys.argv) > 2:
+        formats = sys.argv[3].split(',') if len(sys.argv) > 3 else ('csv', 'xlsx', 'json')
+        export_legacy(sys.argv[2], formats)
+    else:
+        print("用法: python snapshot_store.py [list | export <快照文件> [csv,xlsx,json]]")
+
+if __name__ == "__main__":
+    main()
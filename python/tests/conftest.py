@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 模块都在 python/ 目录下，以脚本方式互相导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
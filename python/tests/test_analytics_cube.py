@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import analytics_cube
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    size = 200
+    capacity = rng.choice([0.5, 2, 4, 8, 16, 22, np.nan], size)
+    price = np.round(rng.uniform(20, 600, size), 2)
+    return pd.DataFrame({
+        'seller': rng.choice(['Amazon', 'Newegg', ' Amazon ', None, ''], size),
+        'interface': rng.choice(['SATA', 'NVMe', None], size),
+        'form_factor': rng.choice(['3.5"', '2.5"', 'M.2'], size),
+        'price_value': price,
+        'price_per_tb_value': np.where(rng.random(size) < 0.1, np.nan, price / np.nan_to_num(capacity, nan=1.0)),
+        'capacity_tb': capacity,
+    })
+
+def plain_groupby(df, dims):
+    """不经过汇总，直接对原始行分组"""
+    labelled = df.assign(
+        seller=analytics_cube.dimension_labels(df['seller']),
+        interface=analytics_cube.dimension_labels(df['interface']),
+        form_factor=analytics_cube.dimension_labels(df['form_factor']),
+        capacity_bucket=analytics_cube.capacity_bucket(df['capacity_tb']),
+    )
+    return labelled.groupby(dims).agg(
+        count=('price_value', 'size'),
+        mean_price=('price_value', 'mean'),
+        median_price_per_tb=('price_per_tb_value', 'median'),
+    )
+
+@pytest.mark.parametrize('dims', [['seller'], ['interface', 'capacity_bucket'], list(analytics_cube.DIMENSIONS)])
+def test_rollup_matches_plain_groupby(frame, dims):
+    cube = analytics_cube.build_cube(frame)
+    result = analytics_cube.rollup(cube, dims).set_index(dims).sort_index()
+    expected = plain_groupby(frame, dims).sort_index()
+    assert list(result.index) == list(expected.index)
+    assert list(result['count']) == list(expected['count'])
+    np.testing.assert_allclose(result['mean_price'], expected['mean_price'])
+    np.testing.assert_allclose(result['median_price_per_tb'], expected['median_price_per_tb'])
+
+def test_rollup_total_and_filters(frame):
+    cube = analytics_cube.build_cube(frame)
+    total = analytics_cube.rollup(cube)
+    assert len(total) == 1 and total.loc[0, 'count'] == len(frame)
+    assert total.loc[0, 'mean_price'] == pytest.approx(frame['price_value'].mean())
+
+    filtered = analytics_cube.rollup(cube, ['capacity_bucket'], {'interface': 'NVMe'})
+    expected = plain_groupby(frame[frame['interface'] == 'NVMe'], ['capacity_bucket'])
+    assert filtered['count'].sum() == expected['count'].sum()
+    assert dict(zip(filtered['capacity_bucket'], filtered['count'])) == expected['count'].to_dict()
+
+def test_capacity_bucket_edges():
+    labels = analytics_cube.capacity_bucket([0.5, 1, 1.99, 4, 20, 22, np.nan])
+    assert list(labels) == ['<1TB', '1-2TB', '1-2TB', '4-8TB', '20TB+', '20TB+', analytics_cube.UNKNOWN]
+
+def test_store_round_trip(tmp_path, frame):
+    cube = analytics_cube.build_cube(frame)
+    store = analytics_cube.CubeStore(str(tmp_path / analytics_cube.CUBE_FILENAME))
+    try:
+        store.add('snap-1', cube, pd.Timestamp('2024-01-02 03:04:05'))
+        store.add('snap-1', cube, pd.Timestamp('2024-01-02 03:04:05'))
+        assert store.has('snap-1') and not store.has('snap-2')
+        assert store.latest_snapshot() == 'snap-1'
+
+        rows = store.query('snap-1', ['seller'])
+        expected = analytics_cube.rollup(cube, ['seller'])
+        assert {row['seller']: row['count'] for row in rows} == dict(zip(expected['seller'], expected['count']))
+
+        filtered = store.query('snap-1', ['form_factor'], {'seller': 'Amazon'})
+        expected = analytics_cube.rollup(cube, ['form_factor'], {'seller': 'Amazon'})
+        assert sum(row['count'] for row in filtered) == expected['count'].sum()
+    finally:
+        store.close()
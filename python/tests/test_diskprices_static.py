@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+import pytest
+
+import diskprices_static
+
+NO_TBODY_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'diskprices_no_tbody.html')
+
+EXPECTED_ENHANCED = [
+    ['Seagate Bench Disk 8TB', '8 TB', '$129.99', '$16.25', 'SATA', '3.5"', 'Amazon',
+     'https://www.amazon.com/dp/B000000001', 'https://example.com/seller/1'],
+    ['WD Bench Disk 2TB', '2 TB', '$59.00', '$29.50', 'USB 3.0', 'External', 'Newegg',
+     'https://www.amazon.com/dp/B000000002', 'https://example.com/seller/2'],
+]
+
+def test_rows_without_tbody_count_as_body_rows():
+    rows = diskprices_static.parse_rows(NO_TBODY_PAGE)
+    by_text = {row.cells[0].text: row for row in rows if row.cells}
+    assert by_text['Seagate Bench Disk 8TB'].in_tbody
+    assert by_text['Filter'].in_tbody
+    assert not by_text['Product'].in_tbody
+    assert not by_text['Total'].in_tbody
+
+def test_static_records_without_tbody():
+    rows = diskprices_static.parse_rows(NO_TBODY_PAGE)
+    assert diskprices_static.to_enhanced_rows(rows) == EXPECTED_ENHANCED
+    assert diskprices_static.to_simple_records(rows) == [
+        {'product': row[0], 'capacity': row[1], 'price': row[2]} for row in EXPECTED_ENHANCED
+    ]
+    assert len(diskprices_static.to_detailed_rows(rows)) == 2
+
+def test_static_matches_browser_without_tbody():
+    async_api = pytest.importorskip('playwright.async_api')
+    import diskprices_enhanced
+    import diskprices_simple
+
+    async def browser_records():
+        async with async_api.async_playwright() as p:
+            try:
+                browser = await p.chromium.launch()
+            except Exception as e:
+                pytest.skip(f"无法启动浏览器: {e}")
+            try:
+                page = await browser.new_page()
+                with open(NO_TBODY_PAGE, encoding='utf-8') as f:
+                    await page.set_content(f.read())
+                enhanced = await page.evaluate(diskprices_enhanced.BULK_EXTRACT_SCRIPT, 'table.disktable')
+                simple = await diskprices_simple.collect_table_rows((await page.query_selector_all('table'))[0])
+                return enhanced, simple
+            finally:
+                await browser.close()
+
+    enhanced, simple = asyncio.run(browser_records())
+    rows = diskprices_static.parse_rows(NO_TBODY_PAGE)
+    assert diskprices_static.to_enhanced_rows(rows) == enhanced
+    assert diskprices_static.to_simple_records(rows) == simple
@@ -0,0 +1,63 @@
+import json
+
+from fingerprint_store import FingerprintStore, append_delta
+
+def record(url, price, seller='Amazon', name='Disk'):
+    return {'product_url': url, 'price': price, 'seller': seller, 'product_name': name}
+
+def test_first_run_inserts_everything(tmp_path):
+    store = FingerprintStore(str(tmp_path / 'fingerprints.json'))
+    delta = store.compute_delta([record('u1', '$10'), record('u2', '$20')])
+    assert len(delta['inserted']) == 2
+    assert delta['changed'] == [] and delta['removed'] == [] and delta['unchanged'] == 0
+
+def test_delta_after_commit(tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    store = FingerprintStore(path)
+    store.compute_delta([record('u1', '$10'), record('u2', '$20'), record('u3', '$30')])
+    store.commit()
+
+    # 重新打开，确认指纹已写入文件
+    store = FingerprintStore(path)
+    delta = store.compute_delta([record('u1', '$10'), record('u2', '$25'), record('u4', '$40')])
+    assert [r['product_url'] for r in delta['inserted']] == ['u4']
+    assert [r['product_url'] for r in delta['changed']] == ['u2']
+    assert [r['product_url'] for r in delta['removed']] == ['u3']
+    assert delta['unchanged'] == 1
+
+def test_delta_is_not_saved_without_commit(tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    store = FingerprintStore(path)
+    store.compute_delta([record('u1', '$10')])
+    assert FingerprintStore(path).entries == {}
+    delta = store.compute_delta([record('u1', '$10')])
+    assert len(delta['inserted']) == 1
+
+def test_partial_crawl_keeps_unseen_products(tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    store = FingerprintStore(path)
+    store.compute_delta([record('u1', '$10'), record('u2', '$20')])
+    store.commit()
+
+    delta = store.compute_delta([record('u1', '$10')], detect_removed=False)
+    assert delta['removed'] == []
+    store.commit()
+    delta = FingerprintStore(path).compute_delta([record('u1', '$10'), record('u2', '$20')])
+    assert delta['unchanged'] == 2
+
+def test_row_key_falls_back_to_name_without_url(tmp_path):
+    store = FingerprintStore(str(tmp_path / 'fingerprints.json'))
+    assert store.row_key(record('N/A', '$10', name='A')) != store.row_key(record('N/A', '$10', name='B'))
+    assert store.row_key(record(None, '$10', name='A')) == store.row_key(record('', '$99', name='A'))
+    assert store.row_key(record('u1', '$10', seller='Amazon')) != store.row_key(record('u1', '$10', seller='Newegg'))
+
+def test_append_delta_writes_one_line_per_record(tmp_path):
+    path = str(tmp_path / 'delta.jsonl')
+    delta = {'inserted': [record('u1', '$10')], 'changed': [record('u2', '$20')],
+             'removed': [record('u3', '$30')], 'unchanged': 5}
+    assert append_delta(delta, path) == 3
+    assert append_delta({'inserted': [], 'changed': [], 'removed': [record('u4', '$1')], 'unchanged': 0}, path) == 1
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['op'] for line in lines] == ['inserted', 'changed', 'removed', 'removed']
+    assert lines[1]['record']['product_url'] == 'u2'
@@ -0,0 +1,52 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pq = pytest.importorskip('pyarrow.parquet')
+pa = pytest.importorskip('pyarrow')
+
+import analytics_cube
+import history_analysis
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'seller': ['Amazon', 'Amazon', None, ' ', 'Newegg'],
+        'interface': ['SATA', None, 'NVMe', 'SATA', 'SATA'],
+        'price_value': [100.0, 50.0, 80.0, None, 120.0],
+        'price_per_tb_value': [25.0, 50.0, 40.0, 30.0, None],
+    })
+
+def test_chunked_partials_merge_matches_single_pass(frame, tmp_path):
+    path = str(tmp_path / 'diskprices_data_20240102_030405.parquet')
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path, row_group_size=2)
+
+    merged = history_analysis.chunked_partials([path], chunk_rows=2)['seller']
+    single = history_analysis._merge_partials([history_analysis._partial_stats(frame, 'seller')])
+    pd.testing.assert_frame_equal(merged.sort_index(), single.sort_index(), check_dtype=False)
+
+def test_missing_dimensions_count_as_unknown_like_the_cube(frame):
+    stats = history_analysis._finalize(history_analysis._merge_partials(
+        [history_analysis._partial_stats(frame.iloc[:3], 'seller'),
+         history_analysis._partial_stats(frame.iloc[3:], 'seller')]))
+    cube = analytics_cube.rollup(analytics_cube.build_cube(frame.assign(capacity_tb=4.0)), ['seller'])
+
+    assert stats['产品数量'].sum() == len(frame)
+    assert stats['产品数量'].to_dict() == dict(zip(cube['seller'], cube['count']))
+    assert stats.loc['Unknown', '产品数量'] == 2
+    assert stats.loc['Amazon', '平均价格'] == pytest.approx(75.0)
+    assert cube.set_index('seller').loc['Amazon', 'mean_price'] == pytest.approx(75.0)
+
+def test_dimension_labels():
+    labels = analytics_cube.dimension_labels(pd.Series(['  SATA ', None, '', float('nan')]))
+    assert list(labels) == ['SATA', 'Unknown', 'Unknown', 'Unknown']
+
+def test_duckdb_partials_use_the_same_unknown_rule(frame, tmp_path):
+    pytest.importorskip('duckdb')
+    path = str(tmp_path / 'diskprices_data_20240102_030405.parquet')
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path)
+
+    for dimension in history_analysis.GROUP_DIMENSIONS:
+        duck = history_analysis.duckdb_partials([path])[dimension]
+        chunked = history_analysis.chunked_partials([path])[dimension]
+        pd.testing.assert_frame_equal(duck.sort_index(), chunked.sort_index(), check_dtype=False,
+                                      check_names=False, check_index_type=False)
@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.bench_item_attributes import build_corpus, legacy_extract
+from item_attributes import UNKNOWN, extract_attributes
+
+def _same(expected, actual):
+    if expected[1:] != tuple(actual)[1:]:
+        return False
+    if expected[0] is None or actual.capacity_tb is None:
+        return expected[0] is actual.capacity_tb
+    return abs(expected[0] - actual.capacity_tb) < 1e-9
+
+def test_matches_legacy_extractors_on_corpus():
+    corpus = build_corpus(2000, seed=1)
+    assert [texts for texts in corpus if not _same(legacy_extract(texts), extract_attributes(texts))] == []
+
+@pytest.mark.parametrize('texts', [
+    ['Seagate 12.5TB Hard Drive'],
+    ['Samsung 3.5TB drive', 'USB 3.0'],
+    ['no size', 'WD 4 TB external drive with USB-C and SATA bridge'],
+    ['1TB NVMe SSD with 256MB cache and 6Gb/s SATA fallback'],
+    ['', 'PCIe Gen4', 'M.2 2280 form factor 2 TB'],
+    ['İ 2TB', 'Thunderbolt 3'],
+])
+def test_matches_legacy_extractors(texts):
+    assert _same(legacy_extract(texts), extract_attributes(texts))
+
+def test_first_segment_with_attribute_wins():
+    result = extract_attributes(['Crucial SSD 500GB', 'Built for 2TB workloads over USB', 'SATA III, 3.5" bay'])
+    assert result.capacity_tb == pytest.approx(0.5)
+    assert result.interface == 'USB'
+    assert result.form_factor == '3.5"'
+
+def test_tb_preferred_over_gb_within_segment():
+    assert extract_attributes(['256GB cache, 8TB capacity']).capacity_tb == pytest.approx(8.0)
+
+def test_empty_input():
+    assert tuple(extract_attributes([])) == (None, UNKNOWN, UNKNOWN)
+    assert tuple(extract_attributes(['plain text'])) == (None, UNKNOWN, UNKNOWN)
@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import normalize
+
+@pytest.mark.parametrize('text, expected', [
+    ('$1,234.56', 1234.56),
+    ('$15.00/TB', 15.0),
+    ('€ 99', 99.0),
+    ('USD 12.5', 12.5),
+])
+def test_price_value(text, expected):
+    assert normalize.price_value(text) == pytest.approx(expected)
+
+@pytest.mark.parametrize('text', ['N/A', '', None])
+def test_price_value_missing(text):
+    assert math.isnan(normalize.price_value(text))
+
+@pytest.mark.parametrize('text, expected', [('$5', 'USD'), ('€ 5', 'EUR'), ('gbp 5', 'GBP'), ('5', 'USD'), ('N/A', None)])
+def test_currency_code(text, expected):
+    assert normalize.currency_code(text) == expected
+
+@pytest.mark.parametrize('text, binary, expected', [
+    ('8 TB', False, 8.0),
+    ('500GB', False, 0.5),
+    ('500GB', True, 500 / 1024),
+    ('2TiB', False, 2 * 1024 ** 4 / 1e12),
+    ('2TiB', True, 2.0),
+    ('1.92TB', False, 1.92),
+    ('1,000 GB', False, 1.0),
+    ('2,000GB', False, 2.0),
+    ('1,234.5 GB', False, 1.2345),
+    ('2,048 GiB', True, 2.0),
+    ('Pack of 2, 500GB', False, 0.5),
+])
+def test_capacity_tb(text, binary, expected):
+    assert normalize.capacity_tb(text, binary) == pytest.approx(expected)
+
+def test_find_capacity_prefers_tb_within_first_text_that_has_one():
+    assert normalize.find_capacity_tb(['256MB cache, 4TB drive', '8TB']) == pytest.approx(4.0)
+    assert normalize.find_capacity_tb(['no size here', '960 GB SSD']) == pytest.approx(0.96)
+    assert normalize.find_capacity_tb(['nothing']) is None
+    assert normalize.find_capacity_tb(['256MB cache', '12,000 GB NAS drive']) == pytest.approx(0.000256)
+    assert normalize.find_capacity_tb(['2,000GB HDD with 256MB cache']) == pytest.approx(2.0)
+
+def test_item_attributes_accepts_thousands_separators():
+    import item_attributes
+    assert item_attributes.extract_attributes(['WD 2,000GB SATA Hard Drive']).capacity_tb == pytest.approx(2.0)
+
+def test_vectorised_parsing_matches_scalar():
+    prices = pd.Series(['$10.00', None, '$10.00', 'N/A', '€ 3,000'])
+    parsed = normalize.parse_price(prices)
+    expected = [normalize.price_value(value) for value in prices]
+    assert all((math.isnan(a) and math.isnan(b)) or a == b for a, b in zip(parsed, expected))
+    assert list(normalize.parse_currency(prices)) == ['USD', None, 'USD', None, 'EUR']
+
+def test_normalize_frame_adds_derived_columns():
+    df = pd.DataFrame({'price': ['$100'], 'price_per_tb': ['$25.00/TB'], 'capacity': ['4 TB']})
+    result = normalize.normalize_frame(df)
+    assert set(normalize.DERIVED_COLUMNS) <= set(result.columns)
+    assert result.loc[0, 'price_value'] == 100.0 and result.loc[0, 'capacity_tb'] == 4.0
+    assert 'price_value' not in df.columns
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('playwright.async_api')
+pytest.importorskip('pandas')
+
+import diskprices_enhanced
+import diskprices_enhanced_v2
+import diskprices_simple
+from rate_limit import HostRateLimiter
+
+class FakePage:
+    """只实现爬虫用到的方法；fail=True 时 goto 抛出异常，模拟崩溃或卡住的页面"""
+
+    def __init__(self, fail):
+        self.fail = fail
+
+    async def goto(self, url, timeout=None):
+        if self.fail:
+            raise RuntimeError("net::ERR_CONNECTION_RESET")
+
+    async def wait_for_load_state(self, state=None):
+        pass
+
+    async def screenshot(self, path=None):
+        pass
+
+    async def content(self):
+        return '<html></html>'
+
+    async def query_selector_all(self, selector):
+        return []
+
+    def on(self, event, handler):
+        pass
+
+    def remove_listener(self, event, handler):
+        pass
+
+class FakeLease:
+    def __init__(self, fail):
+        self.page = FakePage(fail)
+        self.context = None
+
+class FakePool:
+    """记录每次归还时的 healthy 标记"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.released = []
+
+    async def acquire(self):
+        return FakeLease(self.fail)
+
+    async def release(self, lease, healthy=True):
+        self.released.append(healthy)
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    # 出错时爬虫会在当前目录保存截图和HTML
+    monkeypatch.chdir(tmp_path)
+
+@pytest.mark.parametrize('fail', [True, False])
+def test_simple_scraper_reports_health(fail):
+    pool = FakePool(fail)
+    asyncio.run(diskprices_simple.scrape_diskprices(pool=pool))
+    assert pool.released == [not fail]
+
+def test_detailed_scraper_reports_failure():
+    pool = FakePool(fail=True)
+    assert asyncio.run(diskprices_enhanced_v2.scrape_rows_with_browser(pool=pool)) == []
+    assert pool.released == [False]
+
+@pytest.mark.parametrize('fail', [True, False])
+def test_enhanced_scraper_reports_health(fail):
+    pool = FakePool(fail)
+    scraper = diskprices_enhanced.EnhancedDiskPricesScraper(pool=pool, rate_limiter=HostRateLimiter(min_interval=0))
+
+    async def run():
+        await scraper.initialize()
+        if fail:
+            await scraper.scrape(max_pages=1, save_intermediate=False)
+        await scraper.close()
+
+    asyncio.run(run())
+    assert pool.released == [not fail]
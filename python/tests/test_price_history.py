@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from price_history import ALL_PRODUCTS, PriceHistory, product_key, snapshot_timestamp
+
+@pytest.fixture
+def history(tmp_path):
+    store = PriceHistory(str(tmp_path / 'price_history.sqlite'))
+    yield store
+    store.close()
+
+def test_product_key_prefers_url():
+    assert product_key({'product_url': ' https://a/1 ', 'product_name': 'Disk'}) == 'https://a/1'
+
+@pytest.mark.parametrize('url', [None, '', '   ', 'N/A', 'n/a'])
+def test_product_key_falls_back_to_name_when_url_missing(url):
+    assert product_key({'product_url': url, 'product_name': ' Disk A '}) == 'Disk A'
+
+def test_product_key_none_when_nothing_usable():
+    assert product_key({'product_url': 'N/A', 'product_name': 'N/A'}) is None
+
+def test_products_without_urls_from_same_seller_are_all_kept(history):
+    records = [
+        {'product_url': 'N/A', 'product_name': 'Disk A', 'seller': 'Amazon', 'price_value': 50.0},
+        {'product_url': 'N/A', 'product_name': 'Disk B', 'seller': 'Amazon', 'price_value': 70.0},
+    ]
+    observed_at = datetime(2024, 1, 2, 3, 4, 5)
+    assert history.append(records, observed_at=observed_at) == 2
+    assert {row['product_key'] for row in history.products()} == {'Disk A', 'Disk B'}
+
+def test_append_is_idempotent_for_same_time(history):
+    records = [{'product_url': 'https://a/1', 'seller': 'Amazon', 'price_value': 50.0, 'price_per_tb_value': 25.0}]
+    observed_at = datetime(2024, 1, 2, 3, 4, 5)
+    assert history.append(records, observed_at=observed_at) == 1
+    assert history.append(records, observed_at=observed_at) == 0
+    assert len(history.history('https://a/1')) == 1
+
+def test_daily_rollup(history):
+    day = datetime(2024, 1, 2, 8)
+    history.append([{'product_url': 'u1', 'price_value': 10.0, 'price_per_tb_value': 5.0},
+                    {'product_url': 'u2', 'price_value': 30.0, 'price_per_tb_value': 15.0}], observed_at=day)
+    history.append([{'product_url': 'u1', 'price_value': 20.0, 'price_per_tb_value': 10.0}],
+                   observed_at=day.replace(hour=20))
+    total = history.daily(ALL_PRODUCTS)
+    assert total == [{'day': '2024-01-02', 'observations': 3, 'min_price': 10.0, 'median_price': 20.0,
+                      'min_price_per_tb': 5.0, 'median_price_per_tb': 10.0}]
+    assert history.daily('u1')[0]['median_price'] == 15.0
+
+def test_snapshot_timestamp():
+    assert snapshot_timestamp('x/scrape_date=2024-01-02/diskprices_data_20240102_030405.parquet') == \
+        datetime(2024, 1, 2, 3, 4, 5)
+    assert snapshot_timestamp('x/scrape_date=2024-01-02/renamed.parquet') is None
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from response_cache import ResponseCache, cache_key, http_meta
+
+@pytest.fixture
+def cache(tmp_path):
+    store = ResponseCache(str(tmp_path / 'cache'), ttl=60, max_bytes=1000)
+    yield store
+    store.close()
+
+def test_cache_key_ignores_dict_order():
+    assert cache_key('paapi', {'a': 1, 'b': 2}) == cache_key('paapi', {'b': 2, 'a': 1})
+    assert cache_key('GET', 'https://a/') != cache_key('GET', 'https://b/')
+
+def test_put_and_get_roundtrip(cache):
+    assert cache.put('k', b'body', {'status': 200})
+    cached = cache.get('k')
+    assert cached.body == b'body' and cached.meta == {'status': 200}
+    assert cache.hits == 1 and cache.get('missing') is None and cache.misses == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'), ttl=0.05)
+    cache.put('k', b'body')
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert len(cache) == 0 and cache.total_bytes() == 0
+    cache.close()
+
+def test_identical_bodies_are_stored_once(cache):
+    cache.put('a', b'x' * 100)
+    cache.put('b', b'x' * 100)
+    assert len(cache) == 2 and cache.total_bytes() == 100
+
+def test_lru_eviction_keeps_recently_used(cache):
+    cache.put('a', b'a' * 400)
+    cache.put('b', b'b' * 400)
+    cache.get('a')
+    cache.put('c', b'c' * 400)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.total_bytes() == 800
+
+def test_oversized_body_is_not_cached_and_keeps_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'), max_bytes=100)
+    cache.put('small', b's' * 50)
+    assert cache.put('big', b'b' * 200) is False
+    assert len(cache) == 1 and cache.get('small') is not None
+    cache.close()
+
+def test_total_survives_reopen(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    cache.put('a', b'a' * 10)
+    cache.put('a', b'b' * 20)
+    cache.close()
+    reopened = ResponseCache(str(tmp_path / 'cache'))
+    assert reopened.total_bytes() == 20 and reopened.get('a').body == b'b' * 20
+    reopened.close()
+
+def test_objects_roundtrip(cache):
+    cache.put_object('obj', {'items': [1, 2]})
+    assert cache.get_object('obj') == {'items': [1, 2]}
+
+def test_http_meta_drops_transport_headers_and_reads_charset():
+    meta = http_meta('https://a/', 200, {'Content-Type': 'text/html; charset=ISO-8859-1',
+                                         'Content-Encoding': 'gzip', 'Content-Length': '10'})
+    assert meta == {'url': 'https://a/', 'status': 200, 'headers': {'content-type': 'text/html; charset=ISO-8859-1'},
+                    'charset': 'iso-8859-1'}
+
+def test_static_engine_stores_browser_compatible_meta(cache, tmp_path):
+    import functools
+    import threading
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    import diskprices_static
+
+    (tmp_path / 'page.html').write_text('<table><tbody><tr class="disk"><td>a</td></tr></tbody></table>')
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/page.html"
+        first = ''.join(diskprices_static.iter_html_chunks(url, cache=cache))
+        server.shutdown()
+        # 服务器关闭后从缓存回放
+        assert ''.join(diskprices_static.iter_html_chunks(url, cache=cache)) == first
+    finally:
+        server.server_close()
+    meta = cache.get(cache_key('GET', url)).meta
+    assert meta['status'] == 200 and meta['headers']['content-type'].startswith('text/html')